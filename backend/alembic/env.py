@@ -0,0 +1,60 @@
+"""
+Alembic迁移环境配置
+"""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from app.core.config import settings
+from app.core.database import Base, engine_options, to_sync_url
+import app.models.todo  # noqa: F401  注册模型到Base.metadata
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def get_url() -> str:
+    """
+    获取迁移使用的数据库URL
+    优先使用alembic.ini中的sqlalchemy.url，否则使用应用配置；异步驱动的URL转换为同步驱动
+    """
+    return to_sync_url(config.get_main_option("sqlalchemy.url") or settings.database_url)
+
+
+def run_migrations_offline() -> None:
+    """离线模式：只生成SQL，不连接数据库"""
+    context.configure(
+        url=get_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """在线模式：连接数据库执行迁移"""
+    url = get_url()
+    connectable = create_engine(url, **engine_options(url))
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+    connectable.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,72 @@
+"""为todos表添加所有者、变更版本号和软删除列，以及以所有者开头的索引
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEFAULT_OWNER = "default"
+
+MODIFIED_AT = sa.text("coalesce(updated_at, created_at)")
+
+NOT_DELETED = "deleted_at IS NULL"
+
+# 列表和排序索引，只包含未删除的记录
+LIST_INDEXES = {
+    "ix_todos_owner_id_id": ["owner_id", "id"],
+    "ix_todos_owner_completed_id": ["owner_id", "completed", "id"],
+    "ix_todos_owner_created_at_id": ["owner_id", "created_at", "id"],
+    "ix_todos_owner_title_id": ["owner_id", "title", "id"],
+    "ix_todos_owner_modified_at_id": ["owner_id", MODIFIED_AT, "id"],
+    "ix_todos_owner_completed_created_at_id": ["owner_id", "completed", "created_at", "id"],
+    "ix_todos_owner_completed_title_id": ["owner_id", "completed", "title", "id"],
+    "ix_todos_owner_completed_modified_at_id": ["owner_id", "completed", MODIFIED_AT, "id"],
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # 新数据库由create_all建表时已包含这些列和索引
+    if "owner_id" in {column["name"] for column in inspector.get_columns("todos")}:
+        return
+    # 最初版本的模型在主键上另建了ix_todos_id索引，主键本身就是索引，只会增加每次写入的开销
+    if "ix_todos_id" in {index["name"] for index in inspector.get_indexes("todos")}:
+        op.drop_index("ix_todos_id", table_name="todos")
+    op.add_column("todos", sa.Column("owner_id", sa.Text(), nullable=False, server_default=DEFAULT_OWNER))
+    op.add_column("todos", sa.Column("change_version", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("todos", sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True))
+    for name, columns in LIST_INDEXES.items():
+        op.create_index(
+            name, "todos", columns, sqlite_where=sa.text(NOT_DELETED), postgresql_where=sa.text(NOT_DELETED)
+        )
+    op.create_index("ix_todos_owner_change_version", "todos", ["owner_id", "change_version"])
+    # 等待清理的软删除记录
+    op.create_index(
+        "ix_todos_deleted_at",
+        "todos",
+        ["deleted_at"],
+        sqlite_where=sa.text("deleted_at IS NOT NULL"),
+        postgresql_where=sa.text("deleted_at IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_todos_deleted_at", table_name="todos")
+    op.drop_index("ix_todos_owner_change_version", table_name="todos")
+    for name in LIST_INDEXES:
+        op.drop_index(name, table_name="todos")
+    op.drop_column("todos", "deleted_at")
+    op.drop_column("todos", "change_version")
+    op.drop_column("todos", "owner_id")
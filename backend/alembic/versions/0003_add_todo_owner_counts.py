@@ -0,0 +1,215 @@
+"""添加按所有者的计数、数据版本号和删除记录，由todos表上的触发器维护
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEFAULT_OWNER = "default"
+
+# SQLite的行级触发器，每种操作对应(所有者, 总数的变化, 已完成数的变化)
+SQLITE_OWNER_CHANGES = {
+    "INSERT": ("new.owner_id", "1", "CASE WHEN new.completed THEN 1 ELSE 0 END"),
+    "UPDATE": (
+        "new.owner_id",
+        "0",
+        "(CASE WHEN new.completed THEN 1 ELSE 0 END) - (CASE WHEN old.completed THEN 1 ELSE 0 END)",
+    ),
+    "DELETE": ("old.owner_id", "-1", "-(CASE WHEN old.completed THEN 1 ELSE 0 END)"),
+    "SOFT_DELETE": ("old.owner_id", "-1", "-(CASE WHEN old.completed THEN 1 ELSE 0 END)"),
+}
+SQLITE_OWNER_VERSION = (
+    "INSERT INTO todo_owner_counts (owner_id, total_count, completed_count, version) "
+    "VALUES ({owner}, {total}, {completed}, 1) "
+    "ON CONFLICT (owner_id) DO UPDATE SET total_count = total_count + excluded.total_count, "
+    "completed_count = completed_count + excluded.completed_count, version = version + 1;"
+)
+# 递增版本号之后记录变更：写入的记录以递增后的版本号作为变更版本号，删除和软删除的记录写入删除记录
+SQLITE_CHANGE_TRACKING = {
+    "INSERT": (
+        "UPDATE todos SET change_version = (SELECT version FROM todo_owner_counts WHERE owner_id = new.owner_id) "
+        "WHERE id = new.id; "
+        "DELETE FROM todo_tombstones WHERE id = new.id;"
+    ),
+    "UPDATE": (
+        "UPDATE todos SET change_version = (SELECT version FROM todo_owner_counts WHERE owner_id = new.owner_id) "
+        "WHERE id = new.id;"
+    ),
+    "DELETE": (
+        "INSERT OR REPLACE INTO todo_tombstones (id, owner_id, change_version, deleted_at) "
+        "VALUES (old.id, old.owner_id, (SELECT version FROM todo_owner_counts WHERE owner_id = old.owner_id), "
+        "CURRENT_TIMESTAMP);"
+    ),
+    "SOFT_DELETE": (
+        "INSERT OR REPLACE INTO todo_tombstones (id, owner_id, change_version, deleted_at) "
+        "VALUES (old.id, old.owner_id, (SELECT version FROM todo_owner_counts WHERE owner_id = old.owner_id), "
+        "CURRENT_TIMESTAMP);"
+    ),
+}
+# 已软删除的记录被清理时不再改变版本号和计数；批量导入的记录以负数的变更版本号插入，由导入对整批一次性维护
+SQLITE_TRIGGER_EVENTS = {
+    "INSERT": "INSERT ON todos WHEN new.change_version >= 0",
+    "UPDATE": "UPDATE OF title, description, completed, created_at, updated_at ON todos WHEN old.deleted_at IS NULL",
+    "DELETE": "DELETE ON todos WHEN old.deleted_at IS NULL",
+    "SOFT_DELETE": "UPDATE OF deleted_at ON todos WHEN old.deleted_at IS NULL AND new.deleted_at IS NOT NULL",
+}
+# PostgreSQL在写入每条记录之前递增该所有者的版本号作为变更版本号，并持有计数行的行锁直到提交
+POSTGRESQL_CHANGE_VERSION_FUNCTION = (
+    "CREATE FUNCTION todos_set_change_version() RETURNS trigger AS $$ "
+    "BEGIN "
+    "INSERT INTO todo_owner_counts (owner_id, version) VALUES (NEW.owner_id, 1) "
+    "ON CONFLICT (owner_id) DO UPDATE SET version = todo_owner_counts.version + 1 "
+    "RETURNING version INTO NEW.change_version; "
+    "IF TG_OP = 'INSERT' THEN DELETE FROM todo_tombstones WHERE id = NEW.id; END IF; "
+    "RETURN NEW; "
+    "END; $$ LANGUAGE plpgsql"
+)
+# 删除未软删除的记录和软删除记录时写入删除记录
+POSTGRESQL_TOMBSTONES_FUNCTION = (
+    "CREATE FUNCTION todos_record_tombstones() RETURNS trigger AS $$ "
+    "BEGIN "
+    "IF TG_OP = 'DELETE' THEN "
+    "WITH versions AS ("
+    "UPDATE todo_owner_counts SET version = version + 1 "
+    "WHERE owner_id IN (SELECT owner_id FROM old_rows WHERE deleted_at IS NULL) RETURNING owner_id, version) "
+    "INSERT INTO todo_tombstones (id, owner_id, change_version, deleted_at) "
+    "SELECT old_rows.id, old_rows.owner_id, versions.version, now() "
+    "FROM old_rows JOIN versions ON versions.owner_id = old_rows.owner_id WHERE old_rows.deleted_at IS NULL "
+    "ON CONFLICT (id) DO UPDATE SET owner_id = EXCLUDED.owner_id, change_version = EXCLUDED.change_version, "
+    "deleted_at = EXCLUDED.deleted_at; "
+    "ELSE "
+    "INSERT INTO todo_tombstones (id, owner_id, change_version, deleted_at) "
+    "SELECT new_rows.id, new_rows.owner_id, todo_owner_counts.version, now() "
+    "FROM new_rows JOIN old_rows ON old_rows.id = new_rows.id "
+    "JOIN todo_owner_counts ON todo_owner_counts.owner_id = new_rows.owner_id "
+    "WHERE new_rows.deleted_at IS NOT NULL AND old_rows.deleted_at IS NULL "
+    "ON CONFLICT (id) DO UPDATE SET owner_id = EXCLUDED.owner_id, change_version = EXCLUDED.change_version, "
+    "deleted_at = EXCLUDED.deleted_at; "
+    "END IF; "
+    "RETURN NULL; "
+    "END; $$ LANGUAGE plpgsql"
+)
+POSTGRESQL_CHANGE_TRIGGERS = (
+    "CREATE TRIGGER todos_change_version BEFORE INSERT OR UPDATE ON todos "
+    "FOR EACH ROW EXECUTE FUNCTION todos_set_change_version()",
+    "CREATE TRIGGER todos_tombstones AFTER DELETE ON todos "
+    "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION todos_record_tombstones()",
+    "CREATE TRIGGER todos_tombstones_update AFTER UPDATE ON todos "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT "
+    "EXECUTE FUNCTION todos_record_tombstones()",
+)
+# 语句级触发器通过过渡表按所有者汇总整条语句对计数的影响
+POSTGRESQL_OWNER_COUNTS_UPDATE = (
+    "UPDATE todo_owner_counts SET total_count = todo_owner_counts.total_count + changes.total, "
+    "completed_count = todo_owner_counts.completed_count + changes.completed "
+    "FROM (SELECT owner_id, sum(total) AS total, sum(completed) AS completed FROM ({changes}) deltas "
+    "GROUP BY owner_id) changes WHERE todo_owner_counts.owner_id = changes.owner_id; "
+)
+POSTGRESQL_OWNER_DELETED = (
+    "SELECT owner_id, -1 AS total, CASE WHEN completed THEN -1 ELSE 0 END AS completed "
+    "FROM old_rows WHERE deleted_at IS NULL"
+)
+POSTGRESQL_OWNER_UPDATED = (
+    "SELECT owner_id, 1 AS total, CASE WHEN completed THEN 1 ELSE 0 END AS completed "
+    "FROM new_rows WHERE deleted_at IS NULL "
+    f"UNION ALL {POSTGRESQL_OWNER_DELETED}"
+)
+POSTGRESQL_COUNTS_FUNCTION = (
+    "CREATE FUNCTION todos_update_counts() RETURNS trigger AS $$ "
+    "BEGIN "
+    "IF TG_OP = 'INSERT' THEN "
+    "INSERT INTO todo_owner_counts (owner_id, total_count, completed_count) "
+    "SELECT owner_id, count(*), count(*) FILTER (WHERE completed) FROM new_rows GROUP BY owner_id "
+    "ON CONFLICT (owner_id) DO UPDATE SET total_count = todo_owner_counts.total_count + EXCLUDED.total_count, "
+    "completed_count = todo_owner_counts.completed_count + EXCLUDED.completed_count; "
+    "ELSIF TG_OP = 'DELETE' THEN "
+    f"{POSTGRESQL_OWNER_COUNTS_UPDATE.format(changes=POSTGRESQL_OWNER_DELETED)}"
+    "ELSE "
+    f"{POSTGRESQL_OWNER_COUNTS_UPDATE.format(changes=POSTGRESQL_OWNER_UPDATED)}"
+    "END IF; "
+    "RETURN NULL; "
+    "END; $$ LANGUAGE plpgsql"
+)
+POSTGRESQL_COUNTS_TRIGGERS = {
+    "INSERT": "NEW TABLE AS new_rows",
+    "UPDATE": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "DELETE": "OLD TABLE AS old_rows",
+}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # 新数据库由create_all建表时已包含这些表和触发器
+    if sa.inspect(bind).has_table("todo_owner_counts"):
+        return
+    op.create_table(
+        "todo_owner_counts",
+        sa.Column("owner_id", sa.Text(), nullable=False),
+        sa.Column("total_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("completed_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("compacted_version", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("owner_id"),
+    )
+    op.create_table(
+        "todo_tombstones",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("owner_id", sa.Text(), nullable=False, server_default=DEFAULT_OWNER),
+        sa.Column("change_version", sa.Integer(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_todo_tombstones_change_version", "todo_tombstones", ["change_version"])
+    op.create_index("ix_todo_tombstones_owner_change_version", "todo_tombstones", ["owner_id", "change_version"])
+
+    # 统计已有数据，每个已有记录的所有者从版本号1开始，已有记录的变更版本号都为1；之后的写入由触发器维护
+    op.execute(
+        "INSERT INTO todo_owner_counts (owner_id, total_count, completed_count, version) "
+        "SELECT owner_id, count(*), sum(CASE WHEN completed THEN 1 ELSE 0 END), 1 FROM todos "
+        "WHERE deleted_at IS NULL GROUP BY owner_id"
+    )
+    op.execute("UPDATE todos SET change_version = 1")
+
+    if bind.dialect.name == "postgresql":
+        for statement in (POSTGRESQL_CHANGE_VERSION_FUNCTION, POSTGRESQL_TOMBSTONES_FUNCTION, *POSTGRESQL_CHANGE_TRIGGERS):
+            op.execute(statement)
+        op.execute(POSTGRESQL_COUNTS_FUNCTION)
+        for operation, transition in POSTGRESQL_COUNTS_TRIGGERS.items():
+            op.execute(
+                f"CREATE TRIGGER todos_counts_{operation.lower()} AFTER {operation} ON todos "
+                f"REFERENCING {transition} FOR EACH STATEMENT EXECUTE FUNCTION todos_update_counts()"
+            )
+        return
+    for operation, (owner, total, completed) in SQLITE_OWNER_CHANGES.items():
+        op.execute(
+            f"CREATE TRIGGER todos_version_{operation.lower()} AFTER {SQLITE_TRIGGER_EVENTS[operation]} "
+            f"BEGIN {SQLITE_OWNER_VERSION.format(owner=owner, total=total, completed=completed)} "
+            f"{SQLITE_CHANGE_TRACKING[operation]} END"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        for operation in POSTGRESQL_COUNTS_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS todos_counts_{operation.lower()} ON todos")
+        for trigger in ("todos_change_version", "todos_tombstones", "todos_tombstones_update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger} ON todos")
+        for function in ("todos_update_counts", "todos_record_tombstones", "todos_set_change_version"):
+            op.execute(f"DROP FUNCTION IF EXISTS {function}()")
+    else:
+        for operation in SQLITE_OWNER_CHANGES:
+            op.execute(f"DROP TRIGGER IF EXISTS todos_version_{operation.lower()}")
+    op.drop_table("todo_tombstones")
+    op.drop_table("todo_owner_counts")
@@ -0,0 +1,70 @@
+"""添加待办事项全文搜索索引，索引中包含所有者
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# PostgreSQL: 所有者ID作为权重A的词素，标题和描述为默认的权重D
+SEARCH_DOCUMENT = (
+    "(setweight(array_to_tsvector(ARRAY[owner_id]), 'A') "
+    "|| to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, '')))"
+)
+
+# SQLite: 无内容的FTS5表，owner_key为带定界符的所有者ID
+FTS_INSERT = (
+    "INSERT INTO todos_fts(rowid, title, description, owner_key) "
+    "VALUES (new.id, new.title, new.description, '<' || new.owner_id || '>');"
+)
+FTS_DELETE = (
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description, owner_key) "
+    "VALUES ('delete', old.id, old.title, old.description, '<' || old.owner_id || '>');"
+)
+FTS_TRIGGERS = {
+    "insert": ("AFTER INSERT ON todos WHEN new.change_version >= 0", FTS_INSERT),
+    "delete": ("AFTER DELETE ON todos", FTS_DELETE),
+    "update": ("AFTER UPDATE OF title, description ON todos", f"{FTS_DELETE} {FTS_INSERT}"),
+}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_todos_search ON todos USING gin ({SEARCH_DOCUMENT})")
+        return
+    # 新数据库由create_all建表时已创建全文索引表和触发器
+    if sa.inspect(bind).has_table("todos_fts"):
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE todos_fts USING fts5(title, description, owner_key, content='', tokenize='trigram')"
+    )
+    # 相关度只按标题和描述计算
+    op.execute("INSERT INTO todos_fts(todos_fts, rank) VALUES ('rank', 'bm25(1.0, 1.0, 0.0)')")
+    for name, (timing, body) in FTS_TRIGGERS.items():
+        op.execute(f"CREATE TRIGGER todos_fts_{name} {timing} BEGIN {body} END")
+    # 为已有数据建立索引
+    op.execute(
+        "INSERT INTO todos_fts(rowid, title, description, owner_key) "
+        "SELECT id, title, description, '<' || owner_id || '>' FROM todos"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_todos_search")
+        return
+    for name in FTS_TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS todos_fts_{name}")
+    op.execute("DROP TABLE IF EXISTS todos_fts")
@@ -1,4 +1,4 @@
 """
 API v1模块初始化文件
+同步路由（todos）和异步路由（todos_async）由app.main按数据库驱动导入其中之一，这里不预先导入
 """
-from . import todos
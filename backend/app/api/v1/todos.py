@@ -1,90 +1,1058 @@
 """
 待办事项API路由
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+import codecs
+import csv
+import io
+import time
+from datetime import datetime
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Path, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from anyio import from_thread
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.crud.todo import todo_crud
-from app.schemas.todo import TodoCreate, TodoUpdate, TodoResponse
-from app.core.database import get_db
+from typing import Annotated, Any, AsyncIterator, Callable, Iterator, List, Optional, Tuple, Union
+from app.crud.todo import todo_completion_writer, todo_crud
+from app.models.todo import Todo
+from app.schemas.todo import (
+    TodoBatchItemResult,
+    TodoBatchResponse,
+    TodoBatchUpdate,
+    TodoChanges,
+    TodoCreate,
+    TodoImportError,
+    TodoImportResponse,
+    TodoResponse,
+    TodoRow,
+    TodoStats,
+    TodoUpdate,
+    todo_changes_adapter,
+    todo_row_adapter,
+    todo_rows_adapter,
+)
+from app.core.cache import todo_cache
+from app.core.config import settings
+from app.core.etag import etag_matches, list_etag, todo_etag
+from app.core.events import Event, encode_event, todo_events
+from app.core.pagination import MAX_ID, MIN_ID, InvalidCursorError, decode_cursor, encode_cursor, is_valid_id
+from app.core.profiling import ProfiledRoute
+from app.core.replicas import get_read_db, is_sticky_read
+from app.core.tenancy import get_owner, get_owner_db, owner_session
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+# 筛选条件对应的完成状态，all不筛选
+FILTER_COMPLETED = {"active": False, "completed": True}
+
+# 导出格式对应的媒体类型
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+# 路径中的待办事项ID，超出数据库整数范围时返回422，不会带入查询
+TodoId = Annotated[int, Path(ge=MIN_ID, le=MAX_ID, description="待办事项ID")]
+
+
+def _parse_cursor(cursor: str, sort: str = "id", order: str = "asc") -> Tuple[int, Any]:
+    """
+    解析列表分页游标
+    
+    Args:
+        cursor: 客户端传入的游标
+        sort: 本次请求的排序字段，需与生成游标时一致
+        order: 本次请求的排序方向，需与生成游标时一致
+        
+    Returns:
+        Tuple[int, Any]: 游标对应的最后一条记录ID和排序值，按id排序时排序值为None
+        
+    Raises:
+        HTTPException: 游标无效或与排序参数不一致时抛出400错误
+    """
+    try:
+        values = decode_cursor(cursor)
+    except InvalidCursorError:
+        values = {}
+    after_id, after_value = values.get("id"), values.get("value")
+    valid = (
+        is_valid_id(after_id)
+        and values.get("sort", "id") == sort and values.get("order", "asc") == order
+    )
+    if valid and sort != "id":
+        valid = isinstance(after_value, str)
+    if valid and sort in ("created_at", "updated_at"):
+        try:
+            after_value = datetime.fromisoformat(after_value)
+        except ValueError:
+            valid = False
+    if not valid:
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+    return after_id, after_value if sort != "id" else None
+
+
+def _list_cursor(row: dict, sort: str, order: str) -> str:
+    """
+    生成列表下一页的游标
+    
+    Args:
+        row: 本页最后一条记录
+        sort: 排序字段
+        order: 排序方向
+        
+    Returns:
+        str: 游标，包含排序参数、排序值和ID
+    """
+    if sort == "id" and order == "asc":
+        return encode_cursor({"id": row["id"]})
+    values = {"sort": sort, "order": order, "id": row["id"]}
+    if sort == "title":
+        values["value"] = row["title"]
+    elif sort == "created_at":
+        values["value"] = row["created_at"].isoformat()
+    elif sort == "updated_at":
+        # 与排序表达式一致，从未更新过的记录使用创建时间
+        values["value"] = (row["updated_at"] or row["created_at"]).isoformat()
+    return encode_cursor(values)
+
+
+def _not_modified(etag: str) -> Response:
+    """
+    生成304响应
+    
+    Args:
+        etag: 当前资源的ETag
+        
+    Returns:
+        Response: 不含响应体的304响应
+    """
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def _parse_search_cursor(cursor: str) -> Tuple[float, int]:
+    """
+    解析搜索结果的分页游标
+    
+    Args:
+        cursor: 客户端传入的游标
+        
+    Returns:
+        Tuple[float, int]: 上一页最后一条记录的相关度分数和ID
+        
+    Raises:
+        HTTPException: 游标无效时抛出400错误
+    """
+    try:
+        values = decode_cursor(cursor)
+    except InvalidCursorError:
+        values = {}
+    score, after_id = values.get("score"), values.get("id")
+    if (
+        not isinstance(score, (int, float)) or isinstance(score, bool)
+        or not is_valid_id(after_id)
+    ):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+    return float(score), after_id
+
+
+def _cached_rows_response(
+    db: Session,
+    owner_id: str,
+    if_none_match: Optional[str],
+    cache_name: str,
+    cache_params: tuple,
+    load_page: Callable[[], Tuple[List[dict], Optional[str]]],
+) -> Response:
+    """
+    返回经过读缓存和ETag校验的列表响应
+    缓存键和ETag都包含所有者的数据版本号。版本号在本进程内缓存cache_version_ttl秒，
+    期间ETag匹配或缓存命中的请求不访问数据库；其他进程的写操作会递增版本号，最多在该时间后可见
+    
+    Args:
+        db: 数据库会话
+        owner_id: 所有者，ETag由该所有者的数据版本号生成
+        if_none_match: 条件请求头
+        cache_name: 缓存的数据类别，如list、search
+        cache_params: 查询参数
+        load_page: 查询本页记录，返回记录列表和下一页游标
+        
+    Returns:
+        Response: 列表的JSON响应，数据未变化时返回304响应
+    """
+    # 写后读使用主库时不读取缓存，缓存中可能是副本在复制完成前查询到的旧数据
+    sticky = is_sticky_read(db)
+    version = None if sticky else todo_cache.get_version(owner_id)
+    cached = None
+    if version is not None:
+        etag = list_etag(version, owner_id)
+        if etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+        cached = todo_cache.get(todo_cache.key(cache_name, (version, *cache_params)))
+    if cached is None:
+        # 先读取版本号再查询列表，二者在同一事务中，ETag与内容对应同一份数据
+        loaded_at = time.time()
+        version = todo_crud.get_version(db, owner_id)
+        todo_cache.set_version(owner_id, version, loaded_at)
+        etag = list_etag(version, owner_id)
+        if etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+        rows, next_cursor = load_page()
+        # 直接查询列值并由pydantic-core编码为JSON字节，跳过逐行的模型校验和标准库JSON编码
+        cached = (etag, todo_rows_adapter.dump_json(rows), next_cursor)
+        if not sticky:
+            todo_cache.set(todo_cache.key(cache_name, (version, *cache_params)), cached)
+    
+    return _rows_response(cached)
+
+
+def _rows_response(cached: Tuple[str, bytes, Optional[str]]) -> Response:
+    """
+    由缓存的列表数据生成响应，同步和异步路由共用
+    
+    Args:
+        cached: ETag、编码后的响应体和下一页游标
+        
+    Returns:
+        Response: 列表的JSON响应
+    """
+    etag, body, next_cursor = cached
+    headers = {"ETag": etag}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _check_if_match(db: Session, todo_id: int, if_match: Optional[str], owner_id: str) -> Optional[Todo]:
+    """
+    检查If-Match前置条件
+    
+    Args:
+        db: 数据库会话
+        todo_id: 待办事项ID
+        if_match: If-Match请求头，未提供时不检查
+        owner_id: 所有者
+        
+    Returns:
+        Optional[Todo]: 提供If-Match时返回当前的待办事项，用于后续的条件写入
+        
+    Raises:
+        HTTPException: 待办事项不存在时抛出404错误，ETag不匹配时抛出412错误
+    """
+    if if_match is None:
+        return None
+    db_todo = todo_crud.get_todo(db, todo_id=todo_id, owner_id=owner_id)
+    if not db_todo:
+        raise HTTPException(status_code=404, detail="待办事项不存在")
+    if not etag_matches(if_match, todo_etag(db_todo), weak=False):
+        raise HTTPException(status_code=412, detail="待办事项已被修改")
+    return db_todo
+
+
+def _update_todo(
+    db: Session, response: Response, todo_id: int, todo: TodoUpdate, if_match: Optional[str], owner_id: str
+) -> Todo:
+    """
+    更新待办事项，提供If-Match时只有记录未被修改才更新
+    
+    Args:
+        db: 数据库会话
+        response: 响应对象，用于设置ETag响应头
+        todo_id: 待办事项ID
+        todo: 更新的待办事项数据
+        if_match: If-Match请求头
+        owner_id: 所有者
+        
+    Returns:
+        Todo: 更新后的待办事项
+        
+    Raises:
+        HTTPException: 待办事项不存在时抛出404错误，已被修改时抛出412错误
+    """
+    expected = _check_if_match(db, todo_id, if_match, owner_id)
+    db_todo = todo_crud.update_todo(db, todo_id=todo_id, todo=todo, expected=expected, owner_id=owner_id)
+    if not db_todo:
+        if expected is not None:
+            raise HTTPException(status_code=412, detail="待办事项已被修改")
+        raise HTTPException(status_code=404, detail="待办事项不存在")
+    response.headers["ETag"] = todo_etag(db_todo)
+    return db_todo
+
+
+def _set_completed(
+    db: Session, response: Response, todo_id: int, completed: bool, if_match: Optional[str], owner_id: str
+) -> Union[Todo, Any]:
+    """
+    修改待办事项的完成状态
+    启用合并提交时交给写入器，与其他请求的状态切换在同一个事务中提交，否则与普通更新相同
+    
+    Args:
+        db: 数据库会话
+        response: 响应对象，用于设置ETag响应头
+        todo_id: 待办事项ID
+        completed: 完成状态
+        if_match: If-Match请求头
+        owner_id: 所有者
+        
+    Returns:
+        Union[Todo, Any]: 更新后的待办事项（ORM对象或查询结果行）
+        
+    Raises:
+        HTTPException: 待办事项不存在时抛出404错误，已被修改时抛出412错误
+    """
+    if not todo_completion_writer.enabled:
+        return _update_todo(db, response, todo_id, TodoUpdate(completed=completed), if_match, owner_id)
+    expected = _check_if_match(db, todo_id, if_match, owner_id)
+    # 等待写入器之前归还连接，否则所有连接都被等待中的请求占用时写入器无法取得连接
+    db.close()
+    row = todo_completion_writer.submit((todo_id, completed, expected, owner_id))
+    if row is None:
+        if expected is not None:
+            raise HTTPException(status_code=412, detail="待办事项已被修改")
+        raise HTTPException(status_code=404, detail="待办事项不存在")
+    response.headers["ETag"] = todo_etag(row)
+    return row
 
 
 @router.get("/todos", response_model=List[TodoResponse])
 def get_todos(
-    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None, description="上次响应的ETag，数据未变化时返回304"),
+    db: Session = Depends(get_read_db),
+    owner_id: str = Depends(get_owner),
     filter: str = Query("all", description="筛选条件：all全部、active未完成、completed已完成"),
+    sort: str = Query("id", pattern="^(id|created_at|updated_at|title)$", description="排序字段：id、created_at、updated_at、title"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="排序方向：asc升序、desc降序"),
     skip: int = Query(0, ge=0, description="跳过的记录数"),
-    limit: int = Query(100, ge=1, le=1000, description="返回的记录数限制")
+    limit: int = Query(100, ge=1, le=1000, description="返回的记录数限制"),
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页响应头X-Next-Cursor，提供时忽略skip")
 ):
     """
     获取待办事项列表
     
+    结果按排序字段排序，排序值相同时按ID排序（与排序方向一致）。每种排序都有对应的索引，
+    排序在数据库中完成。updated_at排序时，从未更新过的记录按创建时间参与排序。
+    当本页已满时，响应头X-Next-Cursor包含下一页的游标，使用游标翻页时查询耗时与翻页深度无关，
+    翻页期间新增或删除的记录也不会使后续页面重复或遗漏记录。游标只能用于生成它的排序参数。
+    查询结果经过读缓存，本进程的写操作后立即失效，其他工作进程的写操作最多在cache_version_ttl秒后可见。
+    配置了只读副本时查询在副本上执行，客户端写操作后的一段时间内使用主库。
+    响应头ETag由所有者的数据版本号生成，请求头If-None-Match与之匹配时直接返回304，不执行列表查询。
+    列表直接查询列值并编码为JSON，缓存中保存编码后的响应体，响应格式与TodoResponse一致。
+    
     Args:
+        if_none_match: 条件请求头
         db: 数据库会话
+        owner_id: 所有者，取自X-Owner-ID请求头
         filter: 筛选条件
+        sort: 排序字段
+        order: 排序方向
         skip: 分页偏移量
         limit: 分页大小
+        cursor: 键集分页游标
+        
+    Returns:
+        Response: 待办事项列表的JSON响应，数据未变化时返回304响应
+        
+    Raises:
+        HTTPException: 游标无效时抛出400错误
+    """
+    after_id = after_value = None
+    if cursor is not None:
+        after_id, after_value = _parse_cursor(cursor, sort, order)
+        skip = 0
+    if filter not in ("active", "completed"):
+        filter = "all"
+    
+    completed = FILTER_COMPLETED.get(filter)
+    
+    def load_page() -> tuple:
+        rows = todo_crud.get_todo_rows(
+            db,
+            completed=completed,
+            skip=skip,
+            limit=limit,
+            after_id=after_id,
+            sort=sort,
+            descending=order == "desc",
+            after_value=after_value,
+            owner_id=owner_id,
+        )
+        next_cursor = _list_cursor(rows[-1], sort, order) if len(rows) == limit else None
+        return rows, next_cursor
+    
+    return _cached_rows_response(
+        db, owner_id, if_none_match, "list", (owner_id, filter, sort, order, skip, limit, after_id, after_value), load_page
+    )
+
+
+@router.get("/todos/search", response_model=List[TodoResponse])
+def search_todos(
+    q: str = Query(..., min_length=1, max_length=200, description="搜索内容，多个搜索词以空格分隔"),
+    if_none_match: Optional[str] = Header(None, description="上次响应的ETag，数据未变化时返回304"),
+    db: Session = Depends(get_owner_db),
+    owner_id: str = Depends(get_owner),
+    filter: str = Query("all", description="筛选条件：all全部、active未完成、completed已完成"),
+    limit: int = Query(100, ge=1, le=1000, description="返回的记录数限制"),
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页响应头X-Next-Cursor")
+):
+    """
+    搜索待办事项的标题和描述
+    
+    记录需要包含全部搜索词，结果按相关度排序，相关度相同时按ID升序。
+    SQLite下按子串匹配（不少于三个字符的搜索词使用全文索引），PostgreSQL下按词前缀匹配。
+    分页、ETag和读缓存的行为与列表接口一致。
+    
+    Args:
+        q: 搜索内容
+        if_none_match: 条件请求头
+        db: 数据库会话
+        owner_id: 所有者，取自X-Owner-ID请求头
+        filter: 筛选条件
+        limit: 分页大小
+        cursor: 键集分页游标
         
     Returns:
-        List[TodoResponse]: 待办事项列表
+        Response: 匹配的待办事项列表的JSON响应，数据未变化时返回304响应
+        
+    Raises:
+        HTTPException: 游标无效时抛出400错误
     """
-    if filter == "active":
-        return todo_crud.get_active_todos(db, skip=skip, limit=limit)
-    elif filter == "completed":
-        return todo_crud.get_completed_todos(db, skip=skip, limit=limit)
-    else:
-        return todo_crud.get_todos(db, skip=skip, limit=limit)
+    after = _parse_search_cursor(cursor) if cursor is not None else None
+    if filter not in ("active", "completed"):
+        filter = "all"
+    
+    def load_page() -> tuple:
+        rows = todo_crud.search_todo_rows(
+            db, q, completed=FILTER_COMPLETED.get(filter), limit=limit, after=after, owner_id=owner_id
+        )
+        next_cursor = None
+        if len(rows) == limit:
+            next_cursor = encode_cursor({"score": rows[-1]["score"], "id": rows[-1]["id"]})
+        for row in rows:
+            del row["score"]
+        return rows, next_cursor
+    
+    return _cached_rows_response(db, owner_id, if_none_match, "search", (owner_id, q, filter, limit, after), load_page)
+
+
+def _check_batch_size(items: list) -> None:
+    """
+    检查批量请求的项数
+    
+    Args:
+        items: 批量请求中的项
+        
+    Raises:
+        HTTPException: 项数超过配置上限时抛出400错误
+    """
+    if len(items) > settings.batch_max_size:
+        raise HTTPException(
+            status_code=400,
+            detail=f"批量操作最多支持 {settings.batch_max_size} 项"
+        )
+
+
+@router.get("/todos/stats", response_model=TodoStats)
+def get_todo_stats(db: Session = Depends(get_owner_db), owner_id: str = Depends(get_owner)):
+    """
+    获取待办事项的总数、未完成数和已完成数
+    
+    计数由数据库触发器在每次写入的同一事务中维护，接口只读取一行记录，耗时与数据量无关。
+    
+    Args:
+        db: 数据库会话
+        owner_id: 所有者，取自X-Owner-ID请求头
+        
+    Returns:
+        TodoStats: 待办事项计数
+    """
+    return todo_crud.get_stats(db, owner_id=owner_id)
+
+
+@router.get("/todos/changes", response_model=TodoChanges)
+def get_todo_changes(
+    db: Session = Depends(get_owner_db),
+    owner_id: str = Depends(get_owner),
+    since: int = Query(0, ge=0, le=MAX_ID, description="上次同步得到的版本号，0表示获取全部待办事项"),
+    limit: int = Query(1000, ge=1, le=10000, description="本次最多返回的变更数，todos和deleted合计")
+):
+    """
+    增量同步：获取指定版本之后新建、修改和删除的待办事项
+    
+    客户端保存响应中的version，重新连接时以since传回，只需传输这段时间内的变更，
+    耗时与变更数量有关，与待办事项总数无关。多次修改的记录只返回最新内容，
+    todos和deleted按变更顺序排列。变更多于limit条时分页返回，has_more为True，
+    客户端以响应中的version作为since继续请求，直到has_more为False。删除记录保留settings.tombstone_retention秒
+    （环境变量TOMBSTONE_RETENTION）后被清理，更早的版本无法增量同步，返回410，客户端应以since=0重新获取完整列表。
+    
+    Args:
+        db: 数据库会话
+        owner_id: 所有者，取自X-Owner-ID请求头
+        since: 上次同步得到的版本号
+        limit: 本次最多返回的变更数
+        
+    Returns:
+        Response: 本次同步到的版本号version、变更后的待办事项todos、已删除的ID列表deleted和是否还有后续变更has_more
+        
+    Raises:
+        HTTPException: 版本号过旧或无效时抛出410错误
+    """
+    changes = todo_crud.get_changes(db, since=since, owner_id=owner_id, limit=limit)
+    if changes is None:
+        raise HTTPException(status_code=410, detail="变更记录已清理，请重新获取完整列表")
+    return Response(content=todo_changes_adapter.dump_json(changes), media_type="application/json")
+
+
+# 批量操作路由需要注册在/todos/{todo_id}之前，否则batch会被当作todo_id匹配
+@router.post("/todos/batch", response_model=TodoBatchResponse)
+def create_todos_batch(
+    todos: List[TodoCreate],
+    db: Session = Depends(get_owner_db),
+    owner_id: str = Depends(get_owner)
+):
+    """
+    批量创建待办事项
+    整批在一个事务中通过一条INSERT语句写入
+    
+    Args:
+        todos: 待创建的待办事项数据列表
+        db: 数据库会话
+        owner_id: 所有者，取自X-Owner-ID请求头
+        
+    Returns:
+        TodoBatchResponse: 每一项的创建结果
+        
+    Raises:
+        HTTPException: 项数超过上限时抛出400错误
+    """
+    _check_batch_size(todos)
+    rows = todo_crud.create_todos(db, todos=todos, owner_id=owner_id)
+    return TodoBatchResponse(results=[
+        TodoBatchItemResult(index=index, id=row.id, status="created", todo=TodoResponse.model_validate(row))
+        for index, row in enumerate(rows)
+    ])
+
+
+@router.patch("/todos/batch", response_model=TodoBatchResponse)
+def update_todos_batch(
+    todos: List[TodoBatchUpdate],
+    db: Session = Depends(get_owner_db),
+    owner_id: str = Depends(get_owner)
+):
+    """
+    批量更新待办事项
+    整批在一个事务中按主键批量更新，不存在的ID返回not_found
+    
+    Args:
+        todos: 待更新的待办事项数据列表，每项包含ID和要修改的字段
+        db: 数据库会话
+        owner_id: 所有者，取自X-Owner-ID请求头
+        
+    Returns:
+        TodoBatchResponse: 每一项的更新结果
+        
+    Raises:
+        HTTPException: 项数超过上限时抛出400错误
+    """
+    _check_batch_size(todos)
+    rows = todo_crud.update_todos(db, todos=todos, owner_id=owner_id)
+    results = []
+    for index, todo in enumerate(todos):
+        row = rows.get(todo.id)
+        if row is None:
+            results.append(TodoBatchItemResult(index=index, id=todo.id, status="not_found"))
+        else:
+            results.append(TodoBatchItemResult(
+                index=index, id=todo.id, status="updated", todo=TodoResponse.model_validate(row)
+            ))
+    return TodoBatchResponse(results=results)
+
+
+@router.delete("/todos/batch", response_model=TodoBatchResponse)
+def delete_todos_batch(
+    todo_ids: List[int] = Body(..., description="待删除的待办事项ID列表"),
+    db: Session = Depends(get_owner_db),
+    owner_id: str = Depends(get_owner)
+):
+    """
+    批量删除待办事项
+    整批在一个事务中通过一条DELETE语句删除，不存在的ID返回not_found
+    
+    Args:
+        todo_ids: 待删除的待办事项ID列表
+        db: 数据库会话
+        owner_id: 所有者，取自X-Owner-ID请求头
+        
+    Returns:
+        TodoBatchResponse: 每一项的删除结果
+        
+    Raises:
+        HTTPException: 项数超过上限或ID超出范围时抛出400错误
+    """
+    _check_batch_size(todo_ids)
+    if not all(map(is_valid_id, todo_ids)):
+        raise HTTPException(status_code=400, detail="待办事项ID超出范围")
+    deleted = todo_crud.delete_todos(db, todo_ids=todo_ids, owner_id=owner_id)
+    return TodoBatchResponse(results=[
+        TodoBatchItemResult(
+            index=index, id=todo_id, status="deleted" if todo_id in deleted else "not_found"
+        )
+        for index, todo_id in enumerate(todo_ids)
+    ])
+
+
+# 需要注册在DELETE /todos/{todo_id}之前，否则completed会被当作todo_id匹配
+@router.delete("/todos/completed")
+def delete_completed_todos(
+    db: Session = Depends(get_owner_db),
+    owner_id: str = Depends(get_owner)
+):
+    """
+    删除所有已完成的待办事项
+    
+    Args:
+        db: 数据库会话
+        owner_id: 所有者，取自X-Owner-ID请求头
+        
+    Returns:
+        dict: 删除成功信息，包含删除的记录数
+    """
+    deleted_count = todo_crud.delete_completed_todos(db, owner_id=owner_id)
+    return {"message": f"成功删除 {deleted_count} 个已完成的待办事项"}
+
+
+def _export_ndjson(batches: Iterator[List[dict]]) -> Iterator[bytes]:
+    """
+    将记录批次编码为NDJSON，每行一个待办事项
+    
+    Args:
+        batches: 记录批次
+        
+    Yields:
+        bytes: 一批记录编码后的内容
+    """
+    for batch in batches:
+        yield b"".join(todo_row_adapter.dump_json(row) + b"\n" for row in batch)
+
+
+def _export_csv(batches: Iterator[List[dict]]) -> Iterator[bytes]:
+    """
+    将记录批次编码为CSV，首行为列名
+    
+    Args:
+        batches: 记录批次
+        
+    Yields:
+        bytes: 表头或一批记录编码后的内容
+    """
+    fields = list(TodoRow.__annotations__)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+    for batch in batches:
+        writer.writerows(todo_row_adapter.dump_python(row, mode="json") for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # 没有任何记录时只输出表头
+        yield buffer.getvalue().encode("utf-8")
+
+
+@router.get("/todos/export")
+def export_todos(
+    filter: str = Query("all", description="筛选条件：all全部、active未完成、completed已完成"),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="导出格式：ndjson或csv"),
+    owner_id: str = Depends(get_owner)
+):
+    """
+    导出待办事项
+    
+    按ID升序流式输出所有符合条件的待办事项。数据库结果按批读取、按批编码输出，
+    内存占用与表的大小无关，适用于备份和数据分析。
+    
+    Args:
+        filter: 筛选条件
+        format: 导出格式
+        owner_id: 所有者，取自X-Owner-ID请求头
+        
+    Returns:
+        StreamingResponse: 流式响应，NDJSON每行一个待办事项，CSV首行为列名
+    """
+    completed = FILTER_COMPLETED.get(filter)
+    
+    def generate() -> Iterator[bytes]:
+        # 响应体在路由函数返回后才生成，因此在生成器内自行管理数据库会话，
+        # 整个导出在同一个读事务中完成
+        with owner_session(owner_id) as db:
+            batches = todo_crud.iter_todo_batches(
+                db, completed=completed, batch_size=settings.export_batch_size, owner_id=owner_id
+            )
+            encode = _export_csv if format == "csv" else _export_ndjson
+            yield from encode(batches)
+    
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="todos.{format}"'},
+    )
+
+
+def _iter_lines(chunks: Iterator[bytes]) -> Iterator[str]:
+    """
+    将请求体的字节块增量解码并拆分为文本行
+    
+    Args:
+        chunks: 请求体字节块
+        
+    Yields:
+        str: 以换行符结尾的文本行（最后一行可能没有换行符）
+        
+    Raises:
+        UnicodeDecodeError: 请求体不是有效的UTF-8编码
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    """
+    将校验错误格式化为一行文本
+    
+    Args:
+        error: pydantic校验错误
+        
+    Returns:
+        str: 错误描述，多个错误以分号分隔
+    """
+    return "; ".join(
+        f"{'.'.join(map(str, item['loc']))}: {item['msg']}" if item["loc"] else item["msg"]
+        for item in error.errors()
+    )
+
+
+def _parse_ndjson(lines: Iterator[str]) -> Iterator[Tuple[int, Union[TodoCreate, str]]]:
+    """
+    逐行解析NDJSON并校验为TodoCreate，跳过空行
+    
+    Args:
+        lines: 文本行
+        
+    Yields:
+        Tuple[int, Union[TodoCreate, str]]: 行号，以及校验后的数据或错误描述
+    """
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, TodoCreate.model_validate_json(line)
+        except ValidationError as e:
+            yield line_number, _format_validation_error(e)
+
+
+def _parse_csv(lines: Iterator[str]) -> Iterator[Tuple[int, Union[TodoCreate, str]]]:
+    """
+    逐行解析CSV并校验为TodoCreate
+    首行为列名，忽略TodoCreate之外的列（如导出文件中的id、created_at），空单元格视为未提供
+    
+    Args:
+        lines: 文本行
+        
+    Yields:
+        Tuple[int, Union[TodoCreate, str]]: 记录结束的行号，以及校验后的数据或错误描述
+    """
+    reader = csv.DictReader(lines)
+    fields = TodoCreate.model_fields
+    for record in reader:
+        data = {key: value for key, value in record.items() if key in fields and value != ""}
+        try:
+            yield reader.line_num, TodoCreate.model_validate(data)
+        except ValidationError as e:
+            yield reader.line_num, _format_validation_error(e)
+
+
+def _import_todos(chunks: Iterator[bytes], format: str, owner_id: str) -> TodoImportResponse:
+    """
+    解析请求体并分批导入待办事项
+    每累计import_chunk_size条有效记录执行一次批量插入并提交，内存占用与上传大小无关
+    
+    Args:
+        chunks: 请求体字节块
+        format: 导入格式
+        owner_id: 所有者
+        
+    Returns:
+        TodoImportResponse: 导入结果
+        
+    Raises:
+        HTTPException: 请求体不是有效的UTF-8编码时抛出400错误，此前已提交的批次不会回滚
+    """
+    parse = _parse_csv if format == "csv" else _parse_ndjson
+    imported = failed = 0
+    errors: List[TodoImportError] = []
+    chunk: List[TodoCreate] = []
+    with owner_session(owner_id) as db:
+        try:
+            for line_number, result in parse(_iter_lines(chunks)):
+                if isinstance(result, str):
+                    failed += 1
+                    if len(errors) < settings.import_max_errors:
+                        errors.append(TodoImportError(line=line_number, error=result))
+                    continue
+                chunk.append(result)
+                if len(chunk) >= settings.import_chunk_size:
+                    imported += todo_crud.import_todos(db, chunk, owner_id=owner_id)
+                    chunk = []
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail=f"请求体不是有效的UTF-8编码，已导入{imported}条")
+        imported += todo_crud.import_todos(db, chunk, owner_id=owner_id)
+    return TodoImportResponse(imported=imported, failed=failed, errors=errors)
+
+
+@router.post("/todos/import", response_model=TodoImportResponse)
+async def import_todos(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="导入格式：ndjson或csv"),
+    owner_id: str = Depends(get_owner)
+):
+    """
+    导入待办事项
+    
+    请求体为NDJSON（每行一个待办事项）或CSV（首行为列名），格式与导出接口一致，
+    导出文件中的id和时间字段会被忽略。请求体边接收边解析，有效记录分批插入，
+    每批在一个事务中提交；无效的行被跳过并在响应中报告行号和原因。
+    
+    Args:
+        request: 请求对象，用于流式读取请求体
+        format: 导入格式
+        owner_id: 所有者，取自X-Owner-ID请求头
+        
+    Returns:
+        TodoImportResponse: 导入成功和失败的行数，以及前import_max_errors个错误
+        
+    Raises:
+        HTTPException: 请求体不是有效的UTF-8编码时抛出400错误
+    """
+    stream = request.stream()
+    
+    async def next_chunk() -> Optional[bytes]:
+        try:
+            return await stream.__anext__()
+        except StopAsyncIteration:
+            return None
+    
+    def chunks() -> Iterator[bytes]:
+        # 解析和数据库写入在线程池中执行，从线程中回到事件循环读取下一个字节块
+        while (chunk := from_thread.run(next_chunk)) is not None:
+            yield chunk
+    
+    return await run_in_threadpool(_import_todos, chunks(), format, owner_id)
+
+
+def _format_event(event: Event) -> bytes:
+    """
+    编码为Server-Sent Events格式
+    
+    Args:
+        event: 待发送的事件
+        
+    Returns:
+        bytes: 包含id、event和data字段的事件文本
+    """
+    return f"id: {event.id}\nevent: {event.type}\ndata: {event.data}\n\n".encode("utf-8")
+
+
+def _owner_version(owner_id: str) -> int:
+    """
+    读取所有者当前的数据版本号
+    
+    Args:
+        owner_id: 所有者
+        
+    Returns:
+        int: 数据版本号
+    """
+    with owner_session(owner_id) as db:
+        return todo_crud.get_version(db, owner_id)
+
+
+def _change_events(owner_id: str, since: int) -> Tuple[int, Optional[List[Tuple[int, str, Any]]]]:
+    """
+    查询所有者在指定版本之后的变更事件，用于断线重连后的补发
+    
+    Args:
+        owner_id: 所有者
+        since: 客户端最后收到的事件ID对应的数据版本号
+        
+    Returns:
+        tuple: 当前数据版本号和变更事件，无法补发时变更事件为None
+    """
+    with owner_session(owner_id) as db:
+        return todo_crud.get_change_events(db, since, owner_id, settings.stream_batch_limit)
+
+
+async def _event_stream(last_event_id: Optional[str], owner_id: str) -> AsyncIterator[bytes]:
+    """
+    订阅所有者的变更事件并逐条编码输出，连接断开或应用关闭时取消订阅
+    先订阅再从数据库补发最后收到的事件（未提供时为订阅时的版本号）之后的变更，
+    补发期间中继任务发布的事件与补发的事件重叠，重叠的部分不再发送
+    
+    Args:
+        last_event_id: 客户端最后收到的事件ID
+        owner_id: 所有者
+        
+    Yields:
+        bytes: 事件或心跳注释
+    """
+    current = await run_in_threadpool(_owner_version, owner_id)
+    subscription = todo_events.subscribe(owner_id, after=current)
+    try:
+        since: Optional[int] = current
+        if last_event_id is None:
+            # 只有id字段的消息不会触发客户端的事件，但会更新其最后的事件ID，
+            # 之后断线重连时从订阅时的版本号开始补发
+            yield f"id: {current}\n\n".encode("utf-8")
+        elif last_event_id.isascii() and last_event_id.isdigit() and int(last_event_id) <= current:
+            since = int(last_event_id)
+        else:
+            # 事件ID无效或来自其他数据库
+            since = None
+        version, events = (current, None) if since is None else await run_in_threadpool(_change_events, owner_id, since)
+        if events is None:
+            # 无法补发全部错过的变更，通知客户端重新获取列表
+            yield _format_event(encode_event("reset", {"reason": "expired"}, owner_id, version))
+        for change_version, event_type, data in events or []:
+            yield _format_event(encode_event(event_type, data, owner_id, change_version))
+        subscription.after = max(subscription.after, version)
+        while True:
+            try:
+                event = await subscription.get(timeout=settings.stream_keepalive)
+            except asyncio.TimeoutError:
+                # 心跳注释使代理不会因连接空闲而断开
+                yield b": keepalive\n\n"
+                continue
+            if event is None:
+                break
+            yield _format_event(event)
+    finally:
+        subscription.close()
+
+
+@router.get("/todos/stream")
+async def stream_todos(
+    last_event_id: Optional[str] = Header(None, description="最后收到的事件ID，浏览器EventSource重连时自动发送"),
+    since: Optional[str] = Query(None, description="最后收到的事件ID，用于无法设置请求头的首次连接"),
+    owner_id: str = Depends(get_owner)
+):
+    """
+    以Server-Sent Events推送待办事项的变更，替代轮询列表接口
+    
+    事件类型：created/updated（data为待办事项）、deleted（data为{"id": ...}）、
+    reset（无法补发错过的变更或一次变更过多，客户端应重新获取列表）。
+    事件来自数据库中的变更记录，任何工作进程或实例的写操作都会推送给连接到任意进程的客户端：
+    本进程的写操作立即推送，其他进程的写操作最多在stream_poll_interval秒后推送。
+    事件ID为变更后所有者的数据版本号，断线重连时携带Last-Event-ID请求头，
+    从数据库中补发之后的变更，可以重连到任意工作进程；变更超过stream_batch_limit条时推送reset。
+    消费过慢的连接会被断开，客户端重连后继续补发。
+    
+    Args:
+        last_event_id: Last-Event-ID请求头
+        since: 查询参数形式的最后事件ID，请求头优先
+        owner_id: 所有者，取自X-Owner-ID请求头
+        
+    Returns:
+        StreamingResponse: text/event-stream响应
+    """
+    return StreamingResponse(
+        _event_stream(last_event_id or since, owner_id),
+        media_type="text/event-stream",
+        # 禁止缓存，并关闭Nginx等反向代理对响应的缓冲
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/todos/{todo_id}", response_model=TodoResponse)
 def get_todo(
-    todo_id: int,
-    db: Session = Depends(get_db)
+    todo_id: TodoId,
+    response: Response,
+    if_none_match: Optional[str] = Header(None, description="上次响应的ETag，数据未变化时返回304"),
+    db: Session = Depends(get_read_db),
+    owner_id: str = Depends(get_owner)
 ):
     """
     获取单个待办事项
     
+    配置了只读副本时查询在副本上执行，客户端写操作后的一段时间内使用主库。
+    本进程缓存了所有者的数据版本号时（如刚读取过列表）查询结果经过读缓存。
+    
     Args:
         todo_id: 待办事项ID
+        response: 响应对象，用于设置ETag响应头
+        if_none_match: 条件请求头
         db: 数据库会话
+        owner_id: 所有者，取自X-Owner-ID请求头
         
     Returns:
-        TodoResponse: 待办事项详情
+        TodoResponse: 待办事项详情，数据未变化时返回304响应
         
     Raises:
         HTTPException: 当待办事项不存在时抛出404错误
     """
-    db_todo = todo_crud.get_todo(db, todo_id=todo_id)
-    if not db_todo:
-        raise HTTPException(status_code=404, detail="待办事项不存在")
-    return db_todo
+    # 本进程缓存了所有者的数据版本号时才使用读缓存，缓存键包含版本号；否则按主键查询一次
+    version = None if is_sticky_read(db) else todo_cache.get_version(owner_id)
+    cache_key = todo_cache.key("item", (version, owner_id, todo_id))
+    cached = None if version is None else todo_cache.get(cache_key)
+    if cached is None:
+        db_todo = todo_crud.get_todo(db, todo_id=todo_id, owner_id=owner_id)
+        if not db_todo:
+            raise HTTPException(status_code=404, detail="待办事项不存在")
+        cached = (todo_etag(db_todo), TodoResponse.model_validate(db_todo))
+        if version is not None:
+            todo_cache.set(cache_key, cached)
+    etag, todo = cached
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    response.headers["ETag"] = etag
+    return todo
 
 
 @router.post("/todos", response_model=TodoResponse)
 def create_todo(
     todo: TodoCreate,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: Session = Depends(get_owner_db),
+    owner_id: str = Depends(get_owner)
 ):
     """
     创建新的待办事项
     
     Args:
         todo: 待创建的待办事项数据
+        response: 响应对象，用于设置ETag响应头
         db: 数据库会话
+        owner_id: 所有者，取自X-Owner-ID请求头
         
     Returns:
         TodoResponse: 创建成功的待办事项详情
     """
-    return todo_crud.create_todo(db=db, todo=todo)
+    db_todo = todo_crud.create_todo(db=db, todo=todo, owner_id=owner_id)
+    response.headers["ETag"] = todo_etag(db_todo)
+    return db_todo
 
 
 @router.put("/todos/{todo_id}", response_model=TodoResponse)
 def update_todo(
-    todo_id: int,
+    todo_id: TodoId,
     todo: TodoUpdate,
-    db: Session = Depends(get_db)
+    response: Response,
+    if_match: Optional[str] = Header(None, description="读取时的ETag，记录已被修改时返回412"),
+    db: Session = Depends(get_owner_db),
+    owner_id: str = Depends(get_owner)
 ):
     """
     更新待办事项
@@ -92,125 +1060,119 @@ def update_todo(
     Args:
         todo_id: 待办事项ID
         todo: 更新的待办事项数据
+        response: 响应对象，用于设置ETag响应头
+        if_match: 乐观并发控制的条件请求头
         db: 数据库会话
+        owner_id: 所有者，取自X-Owner-ID请求头
         
     Returns:
         TodoResponse: 更新后的待办事项详情
         
     Raises:
-        HTTPException: 当待办事项不存在时抛出404错误
+        HTTPException: 当待办事项不存在时抛出404错误，If-Match不匹配时抛出412错误
     """
-    db_todo = todo_crud.update_todo(db, todo_id=todo_id, todo=todo)
-    if not db_todo:
-        raise HTTPException(status_code=404, detail="待办事项不存在")
-    return db_todo
+    return _update_todo(db, response, todo_id, todo, if_match, owner_id)
 
 
 @router.delete("/todos/{todo_id}")
 def delete_todo(
-    todo_id: int,
-    db: Session = Depends(get_db)
+    todo_id: TodoId,
+    if_match: Optional[str] = Header(None, description="读取时的ETag，记录已被修改时返回412"),
+    db: Session = Depends(get_owner_db),
+    owner_id: str = Depends(get_owner)
 ):
     """
     删除待办事项
     
     Args:
         todo_id: 待办事项ID
+        if_match: 乐观并发控制的条件请求头
         db: 数据库会话
+        owner_id: 所有者，取自X-Owner-ID请求头
         
     Returns:
         dict: 删除成功信息
         
     Raises:
-        HTTPException: 当待办事项不存在时抛出404错误
+        HTTPException: 当待办事项不存在时抛出404错误，If-Match不匹配时抛出412错误
     """
-    success = todo_crud.delete_todo(db, todo_id=todo_id)
+    expected = _check_if_match(db, todo_id, if_match, owner_id)
+    success = todo_crud.delete_todo(db, todo_id=todo_id, expected=expected, owner_id=owner_id)
     if not success:
+        if expected is not None:
+            raise HTTPException(status_code=412, detail="待办事项已被修改")
         raise HTTPException(status_code=404, detail="待办事项不存在")
     return {"message": "待办事项删除成功"}
 
 
-@router.put("/todos/{todo_id}/complete")
+@router.put("/todos/{todo_id}/complete", response_model=TodoResponse)
 def complete_todo(
-    todo_id: int,
-    db: Session = Depends(get_db)
+    todo_id: TodoId,
+    response: Response,
+    if_match: Optional[str] = Header(None, description="读取时的ETag，记录已被修改时返回412"),
+    db: Session = Depends(get_owner_db),
+    owner_id: str = Depends(get_owner)
 ):
     """
     标记待办事项为完成状态
     
     Args:
         todo_id: 待办事项ID
+        response: 响应对象，用于设置ETag响应头
+        if_match: 乐观并发控制的条件请求头
         db: 数据库会话
+        owner_id: 所有者，取自X-Owner-ID请求头
         
     Returns:
         TodoResponse: 更新后的待办事项详情
         
     Raises:
-        HTTPException: 当待办事项不存在时抛出404错误
+        HTTPException: 当待办事项不存在时抛出404错误，If-Match不匹配时抛出412错误
     """
-    from app.schemas.todo import TodoUpdate
-    update_data = TodoUpdate(completed=True)
-    db_todo = todo_crud.update_todo(db, todo_id=todo_id, todo=update_data)
-    if not db_todo:
-        raise HTTPException(status_code=404, detail="待办事项不存在")
-    return db_todo
+    return _set_completed(db, response, todo_id, True, if_match, owner_id)
 
 
-@router.put("/todos/{todo_id}/uncomplete")
+@router.put("/todos/{todo_id}/uncomplete", response_model=TodoResponse)
 def uncomplete_todo(
-    todo_id: int,
-    db: Session = Depends(get_db)
+    todo_id: TodoId,
+    response: Response,
+    if_match: Optional[str] = Header(None, description="读取时的ETag，记录已被修改时返回412"),
+    db: Session = Depends(get_owner_db),
+    owner_id: str = Depends(get_owner)
 ):
     """
     标记待办事项为未完成状态
     
     Args:
         todo_id: 待办事项ID
+        response: 响应对象，用于设置ETag响应头
+        if_match: 乐观并发控制的条件请求头
         db: 数据库会话
+        owner_id: 所有者，取自X-Owner-ID请求头
         
     Returns:
         TodoResponse: 更新后的待办事项详情
         
     Raises:
-        HTTPException: 当待办事项不存在时抛出404错误
-    """
-    from app.schemas.todo import TodoUpdate
-    update_data = TodoUpdate(completed=False)
-    db_todo = todo_crud.update_todo(db, todo_id=todo_id, todo=update_data)
-    if not db_todo:
-        raise HTTPException(status_code=404, detail="待办事项不存在")
-    return db_todo
-
-
-@router.delete("/todos/completed")
-def delete_completed_todos(
-    db: Session = Depends(get_db)
-):
+        HTTPException: 当待办事项不存在时抛出404错误，If-Match不匹配时抛出412错误
     """
-    删除所有已完成的待办事项
-    
-    Args:
-        db: 数据库会话
-        
-    Returns:
-        dict: 删除成功信息，包含删除的记录数
-    """
-    deleted_count = todo_crud.delete_completed_todos(db)
-    return {"message": f"成功删除 {deleted_count} 个已完成的待办事项"}
+    return _set_completed(db, response, todo_id, False, if_match, owner_id)
 
 
 @router.delete("/todos")
 def delete_all_todos(
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_owner_db),
+    owner_id: str = Depends(get_owner)
 ):
     """
     删除所有待办事项
     
     Args:
         db: 数据库会话
+        owner_id: 所有者，取自X-Owner-ID请求头
         
     Returns:
         dict: 删除成功信息，包含删除的记录数
     """
-    deleted_count = todo_crud.delete_all_todos(db)
+    deleted_count = todo_crud.delete_all_todos(db, owner_id=owner_id)
     return {"message": f"成功删除 {deleted_count} 个待办事项"}
@@ -0,0 +1,335 @@
+"""
+待办事项异步API路由
+数据库URL使用异步驱动时替代同步路由注册
+
+请求路径上的路由（单条记录的增删改查、完成状态切换、列表、搜索和计数）有各自的异步实现，
+通过AsyncTodoCRUD在异步驱动上执行语句，等待数据库时不占用线程，单个进程可以同时处理大量请求；
+参数声明、响应格式、ETag和读缓存的行为与同步路由相同。
+其余路由（批量操作、导入导出、增量同步等）复用todos模块中同步路由的实现，处理函数在AsyncSession.run_sync中执行。
+"""
+import inspect
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1 import todos as sync_todos
+from app.api.v1.todos import (
+    FILTER_COMPLETED,
+    _list_cursor,
+    _not_modified,
+    _parse_cursor,
+    _parse_search_cursor,
+    _rows_response,
+)
+from app.core.cache import todo_cache
+from app.core.database import get_async_db
+from app.core.etag import etag_matches, list_etag, todo_etag
+from app.core.pagination import encode_cursor
+from app.core.profiling import ProfiledRoute
+from app.crud.todo import async_todo_crud
+from app.models.todo import Todo
+from app.schemas.todo import TodoResponse, TodoUpdate, todo_rows_adapter
+
+router = APIRouter(route_class=ProfiledRoute)
+
+# 同步路由函数名到其异步实现的映射
+ASYNC_ENDPOINTS: Dict[str, Callable] = {}
+
+
+def _async_signature(endpoint: Callable) -> inspect.Signature:
+    """
+    将同步路由函数的签名中的db参数改为依赖get_async_db
+
+    Args:
+        endpoint: 同步路由函数，通过db参数接收数据库会话
+
+    Returns:
+        inspect.Signature: 其他参数的声明（校验规则、依赖）不变的签名
+    """
+    signature = inspect.signature(endpoint)
+    parameters = [
+        param.replace(default=Depends(get_async_db), annotation=AsyncSession)
+        if param.name == "db" else param
+        for param in signature.parameters.values()
+    ]
+    return signature.replace(parameters=parameters)
+
+
+def _as_async_endpoint(endpoint: Callable) -> Callable:
+    """
+    将依赖数据库会话的同步路由函数包装为异步路由函数
+
+    Args:
+        endpoint: 同步路由函数，通过db参数接收数据库会话
+
+    Returns:
+        Callable: 异步路由函数，db参数改为依赖get_async_db
+    """
+    async def async_endpoint(db: AsyncSession, **kwargs):
+        return await db.run_sync(lambda session: endpoint(db=session, **kwargs))
+
+    async_endpoint.__signature__ = _async_signature(endpoint)
+    async_endpoint.__name__ = endpoint.__name__
+    async_endpoint.__doc__ = endpoint.__doc__
+    return async_endpoint
+
+
+def _implements(endpoint: Callable) -> Callable[[Callable], Callable]:
+    """
+    将被装饰的函数注册为同步路由函数的异步实现，参数声明沿用同步路由函数
+
+    Args:
+        endpoint: 同步路由函数
+
+    Returns:
+        Callable: 装饰器
+    """
+    def decorate(async_endpoint: Callable) -> Callable:
+        async_endpoint.__signature__ = _async_signature(endpoint)
+        ASYNC_ENDPOINTS[endpoint.__name__] = async_endpoint
+        return async_endpoint
+
+    return decorate
+
+
+async def _cached_rows_response(
+    db: AsyncSession,
+    owner_id: str,
+    if_none_match: Optional[str],
+    cache_name: str,
+    cache_params: tuple,
+    load_page: Callable[[], Awaitable[Tuple[List[dict], Optional[str]]]],
+) -> Response:
+    """
+    返回经过读缓存和ETag校验的列表响应，与同步路由的_cached_rows_response相同；
+    异步模式不使用只读副本，没有写后读的主库会话
+
+    Args:
+        db: 异步数据库会话
+        owner_id: 所有者
+        if_none_match: 条件请求头
+        cache_name: 缓存的数据类别，如list、search
+        cache_params: 查询参数
+        load_page: 查询本页记录，返回记录列表和下一页游标
+
+    Returns:
+        Response: 列表的JSON响应，数据未变化时返回304响应
+    """
+    version = todo_cache.get_version(owner_id)
+    cached = None
+    if version is not None:
+        etag = list_etag(version, owner_id)
+        if etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+        cached = todo_cache.get(todo_cache.key(cache_name, (version, *cache_params)))
+    if cached is None:
+        # 先读取版本号再查询列表，二者在同一事务中
+        loaded_at = time.time()
+        version = await async_todo_crud.get_version(db, owner_id)
+        todo_cache.set_version(owner_id, version, loaded_at)
+        etag = list_etag(version, owner_id)
+        if etag_matches(if_none_match, etag):
+            return _not_modified(etag)
+        rows, next_cursor = await load_page()
+        cached = (etag, todo_rows_adapter.dump_json(rows), next_cursor)
+        todo_cache.set(todo_cache.key(cache_name, (version, *cache_params)), cached)
+    return _rows_response(cached)
+
+
+async def _check_if_match(db: AsyncSession, todo_id: int, if_match: Optional[str], owner_id: str) -> Optional[Todo]:
+    """
+    检查If-Match前置条件
+
+    Args:
+        db: 异步数据库会话
+        todo_id: 待办事项ID
+        if_match: If-Match请求头，未提供时不检查
+        owner_id: 所有者
+
+    Returns:
+        Optional[Todo]: 提供If-Match时返回当前的待办事项，用于后续的条件写入
+
+    Raises:
+        HTTPException: 待办事项不存在时抛出404错误，ETag不匹配时抛出412错误
+    """
+    if if_match is None:
+        return None
+    db_todo = await async_todo_crud.get_todo(db, todo_id=todo_id, owner_id=owner_id)
+    if not db_todo:
+        raise HTTPException(status_code=404, detail="待办事项不存在")
+    if not etag_matches(if_match, todo_etag(db_todo), weak=False):
+        raise HTTPException(status_code=412, detail="待办事项已被修改")
+    return db_todo
+
+
+async def _update_todo(
+    db: AsyncSession, response: Response, todo_id: int, todo: TodoUpdate, if_match: Optional[str], owner_id: str
+) -> Todo:
+    """
+    更新待办事项，提供If-Match时只有记录未被修改才更新
+
+    Args:
+        db: 异步数据库会话
+        response: 响应对象，用于设置ETag响应头
+        todo_id: 待办事项ID
+        todo: 更新的待办事项数据
+        if_match: If-Match请求头
+        owner_id: 所有者
+
+    Returns:
+        Todo: 更新后的待办事项
+
+    Raises:
+        HTTPException: 待办事项不存在时抛出404错误，已被修改时抛出412错误
+    """
+    expected = await _check_if_match(db, todo_id, if_match, owner_id)
+    db_todo = await async_todo_crud.update_todo(db, todo_id=todo_id, todo=todo, expected=expected, owner_id=owner_id)
+    if not db_todo:
+        if expected is not None:
+            raise HTTPException(status_code=412, detail="待办事项已被修改")
+        raise HTTPException(status_code=404, detail="待办事项不存在")
+    response.headers["ETag"] = todo_etag(db_todo)
+    return db_todo
+
+
+@_implements(sync_todos.get_todos)
+async def get_todos(if_none_match, db, owner_id, filter, sort, order, skip, limit, cursor):
+    """获取待办事项列表的异步实现"""
+    after_id = after_value = None
+    if cursor is not None:
+        after_id, after_value = _parse_cursor(cursor, sort, order)
+        skip = 0
+    if filter not in ("active", "completed"):
+        filter = "all"
+
+    async def load_page() -> tuple:
+        rows = await async_todo_crud.get_todo_rows(
+            db,
+            completed=FILTER_COMPLETED.get(filter),
+            skip=skip,
+            limit=limit,
+            after_id=after_id,
+            sort=sort,
+            descending=order == "desc",
+            after_value=after_value,
+            owner_id=owner_id,
+        )
+        next_cursor = _list_cursor(rows[-1], sort, order) if len(rows) == limit else None
+        return rows, next_cursor
+
+    return await _cached_rows_response(
+        db, owner_id, if_none_match, "list", (owner_id, filter, sort, order, skip, limit, after_id, after_value), load_page
+    )
+
+
+@_implements(sync_todos.search_todos)
+async def search_todos(q, if_none_match, db, owner_id, filter, limit, cursor):
+    """搜索待办事项的异步实现"""
+    after = _parse_search_cursor(cursor) if cursor is not None else None
+    if filter not in ("active", "completed"):
+        filter = "all"
+
+    async def load_page() -> tuple:
+        rows = await async_todo_crud.search_todo_rows(
+            db, q, completed=FILTER_COMPLETED.get(filter), limit=limit, after=after, owner_id=owner_id
+        )
+        next_cursor = None
+        if len(rows) == limit:
+            next_cursor = encode_cursor({"score": rows[-1]["score"], "id": rows[-1]["id"]})
+        for row in rows:
+            del row["score"]
+        return rows, next_cursor
+
+    return await _cached_rows_response(db, owner_id, if_none_match, "search", (owner_id, q, filter, limit, after), load_page)
+
+
+@_implements(sync_todos.get_todo_stats)
+async def get_todo_stats(db, owner_id):
+    """获取待办事项计数的异步实现"""
+    return await async_todo_crud.get_stats(db, owner_id=owner_id)
+
+
+@_implements(sync_todos.get_todo)
+async def get_todo(todo_id, response, if_none_match, db, owner_id):
+    """获取单个待办事项的异步实现"""
+    version = todo_cache.get_version(owner_id)
+    cache_key = todo_cache.key("item", (version, owner_id, todo_id))
+    cached = None if version is None else todo_cache.get(cache_key)
+    if cached is None:
+        db_todo = await async_todo_crud.get_todo(db, todo_id=todo_id, owner_id=owner_id)
+        if not db_todo:
+            raise HTTPException(status_code=404, detail="待办事项不存在")
+        cached = (todo_etag(db_todo), TodoResponse.model_validate(db_todo))
+        if version is not None:
+            todo_cache.set(cache_key, cached)
+    etag, todo = cached
+    if etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    response.headers["ETag"] = etag
+    return todo
+
+
+@_implements(sync_todos.create_todo)
+async def create_todo(todo, response, db, owner_id):
+    """创建待办事项的异步实现"""
+    db_todo = await async_todo_crud.create_todo(db, todo=todo, owner_id=owner_id)
+    response.headers["ETag"] = todo_etag(db_todo)
+    return db_todo
+
+
+@_implements(sync_todos.update_todo)
+async def update_todo(todo_id, todo, response, if_match, db, owner_id):
+    """更新待办事项的异步实现"""
+    return await _update_todo(db, response, todo_id, todo, if_match, owner_id)
+
+
+@_implements(sync_todos.delete_todo)
+async def delete_todo(todo_id, if_match, db, owner_id):
+    """删除待办事项的异步实现"""
+    expected = await _check_if_match(db, todo_id, if_match, owner_id)
+    success = await async_todo_crud.delete_todo(db, todo_id=todo_id, expected=expected, owner_id=owner_id)
+    if not success:
+        if expected is not None:
+            raise HTTPException(status_code=412, detail="待办事项已被修改")
+        raise HTTPException(status_code=404, detail="待办事项不存在")
+    return {"message": "待办事项删除成功"}
+
+
+# 异步模式不启用合并提交，完成状态的切换与普通更新相同
+@_implements(sync_todos.complete_todo)
+async def complete_todo(todo_id, response, if_match, db, owner_id):
+    """标记待办事项为完成状态的异步实现"""
+    return await _update_todo(db, response, todo_id, TodoUpdate(completed=True), if_match, owner_id)
+
+
+@_implements(sync_todos.uncomplete_todo)
+async def uncomplete_todo(todo_id, response, if_match, db, owner_id):
+    """标记待办事项为未完成状态的异步实现"""
+    return await _update_todo(db, response, todo_id, TodoUpdate(completed=False), if_match, owner_id)
+
+
+# 按同步路由的顺序注册，/todos/stats等固定路径仍在/todos/{todo_id}之前
+for route in sync_todos.router.routes:
+    if not isinstance(route, APIRoute):
+        continue
+    endpoint = ASYNC_ENDPOINTS.get(route.endpoint.__name__, route.endpoint)
+    # 没有异步实现且依赖数据库会话的路由在run_sync中执行；
+    # 不依赖数据库会话的路由（自行管理会话或本身就是异步的）原样注册
+    if endpoint is route.endpoint and "db" in inspect.signature(endpoint).parameters:
+        endpoint = _as_async_endpoint(endpoint)
+    router.add_api_route(
+        route.path,
+        endpoint,
+        methods=list(route.methods),
+        response_model=route.response_model,
+        status_code=route.status_code,
+        name=route.name,
+        summary=route.summary,
+        description=route.description,
+        responses=route.responses,
+        response_class=route.response_class,
+        include_in_schema=route.include_in_schema,
+    )
@@ -0,0 +1,216 @@
+"""
+读缓存
+为待办事项的读接口提供带过期时间的LRU缓存，缓存键包含所有者的数据版本号，
+版本号在本进程内按所有者缓存一小段时间，缓存命中时不访问数据库
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from app.core.config import settings
+from app.core.metrics import observe_cache
+
+
+class CacheBackend(ABC):
+    """
+    缓存后端接口
+    默认使用进程内的MemoryCacheBackend；多进程部署需要共享缓存时，
+    可以基于Redis等实现该接口（get/set对应GET/SETEX）
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存，不存在或已过期时返回None"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """写入缓存，ttl为过期时间（秒）"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """清空所有缓存项"""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    进程内缓存后端
+    超过容量时淘汰最久未使用的缓存项，读取时检查过期时间
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TodoCache:
+    """
+    待办事项读缓存
+    缓存键包含所有者的数据版本号，任何进程的写操作都会递增版本号，旧的缓存项不再被读取，
+    随后被LRU淘汰或过期清除。版本号本身在本进程内缓存version_ttl秒：
+    本进程的写操作调用invalidate立即使该所有者缓存的版本号失效，
+    其他进程的写操作最多在version_ttl秒后可见，期间命中缓存的请求不访问数据库
+    """
+
+    def __init__(
+        self, backend: CacheBackend, ttl: float, version_ttl: float, enabled: bool = True, name: str = "todos"
+    ):
+        self.backend = backend
+        # 监控指标中的缓存名称
+        self.name = name
+        self.ttl = ttl
+        self.version_ttl = version_ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, name: str, params: Hashable) -> str:
+        """
+        生成缓存键
+        params中应包含所有者和数据版本号，版本号变化后旧的缓存项不再被读取
+
+        Args:
+            name: 缓存的数据类别，如list、item
+            params: 查询参数
+
+        Returns:
+            str: 缓存键
+        """
+        return f"todos:{name}:{params!r}"
+
+    def get_version(self, owner_id: str) -> Optional[int]:
+        """
+        读取本进程缓存的所有者数据版本号
+
+        Args:
+            owner_id: 所有者
+
+        Returns:
+            Optional[int]: 数据版本号，未启用缓存、未缓存、已超过version_ttl
+                或读取之后本进程有过该所有者的写操作时返回None
+        """
+        if not self.enabled:
+            return None
+        entry = self.backend.get(f"todos:version:{owner_id}")
+        if entry is None:
+            return None
+        version, loaded_at = entry
+        invalidated_at = self.backend.get(f"todos:invalidated:{owner_id}")
+        if time.time() - loaded_at >= self.version_ttl or (invalidated_at is not None and invalidated_at >= loaded_at):
+            return None
+        return version
+
+    def set_version(self, owner_id: str, version: int, loaded_at: float) -> None:
+        """
+        缓存所有者的数据版本号
+
+        Args:
+            owner_id: 所有者
+            version: 从数据库读取的数据版本号
+            loaded_at: 开始读取版本号之前的time.time()，读取期间发生的写操作使本次结果不被使用
+        """
+        if self.enabled:
+            self.backend.set(f"todos:version:{owner_id}", (version, loaded_at), self.version_ttl)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        读取缓存并记录命中情况，同时计入监控指标cache_requests_total
+
+        Args:
+            key: key()生成的缓存键
+
+        Returns:
+            Optional[Any]: 缓存的数据，未启用缓存或未命中时返回None
+        """
+        if not self.enabled:
+            return None
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        observe_cache(self.name, value is not None)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        写入缓存，value为None时不缓存
+
+        Args:
+            key: key()生成的缓存键
+            value: 待缓存的数据
+        """
+        if self.enabled and value is not None:
+            self.backend.set(key, value, self.ttl)
+
+    def invalidate(self, owner_id: str) -> None:
+        """
+        使本进程缓存的所有者数据版本号失效，由写操作在提交后调用
+        只影响该所有者，其他所有者的缓存项继续有效；
+        失效时间只需保留version_ttl秒，更早读取的版本号已经过期
+
+        Args:
+            owner_id: 所有者
+        """
+        self.backend.set(f"todos:invalidated:{owner_id}", time.time(), self.version_ttl)
+
+    def clear(self) -> None:
+        """清空所有缓存项和缓存的版本号，用于绕过CRUD直接修改数据之后"""
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        """
+        获取缓存统计信息
+
+        Returns:
+            dict: 命中次数、未命中次数、命中率和版本号的缓存时间
+        """
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "enabled": self.enabled,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / total if total else 0.0,
+            "version_ttl": self.version_ttl,
+        }
+
+
+# 创建全局缓存实例
+todo_cache = TodoCache(
+    backend=MemoryCacheBackend(max_entries=settings.cache_max_entries),
+    ttl=settings.cache_ttl,
+    version_ttl=settings.cache_version_ttl,
+    enabled=settings.cache_enabled,
+)
@@ -1,6 +1,8 @@
 """
 应用配置
 """
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -16,16 +18,111 @@ class Settings(BaseSettings):
     
     # 数据库配置
     database_url: str = "sqlite:///./todos.db"
+    # 应用启动时的表结构处理：create（创建缺少的表）、check（只检查表是否存在，由Alembic迁移管理表结构时使用）、
+    # skip（不访问数据库，启动最快）
+    db_schema_setup: str = "create"
+    
+    # 数据库连接池配置（内存SQLite数据库不使用连接池参数）
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800  # 连接回收时间（秒），-1表示不回收
+    db_pool_pre_ping: bool = True
+    
+    # SQLite连接参数，每个新连接建立时通过PRAGMA设置
+    sqlite_journal_mode: str = "WAL"  # WAL模式下读写互不阻塞
+    sqlite_synchronous: str = "NORMAL"  # WAL模式下NORMAL可保证一致性，并减少fsync
+    sqlite_mmap_size: int = 268435456  # 内存映射大小（字节），256MB
+    sqlite_cache_size: int = -65536  # 页缓存大小，负数表示KB，即64MB
+    sqlite_busy_timeout: int = 5000  # 数据库被锁定时的等待时间（毫秒）
+    
+    # 只读副本配置，为空时所有查询都使用database_url对应的主库
+    # 列表和详情接口的查询分配到只读副本，写操作和其他接口使用主库；异步数据库模式下不生效
+    database_read_urls: list = []
+    db_replica_selection: str = "round_robin"  # round_robin（轮询）或least_connections（选择进行中请求最少的副本）
+    read_your_writes_window: float = 5.0  # 客户端写操作后该时间（秒）内的读请求使用主库，应大于副本的复制延迟
+    
+    # 多租户配置：每个待办事项属于一个所有者，请求通过X-Owner-ID请求头指定所有者，只能读写该所有者的待办事项
+    # 请求头应由负责认证的网关设置，应用本身不校验所有者身份
+    owner_header_required: bool = False  # 为False时未携带请求头的请求使用default所有者
+    tenant_shard_dir: Optional[str] = None  # 按所有者分片的SQLite数据库目录，每个所有者一个数据库文件，为空时所有所有者共用主库
+    tenant_shard_max_open: int = 64  # 同时打开的分片数，超过时关闭最久未访问的分片的连接池
+    tenant_shard_pool_size: int = 2  # 每个分片的连接池大小，不允许溢出
+    tenant_shard_cache_size: int = -2048  # 分片连接的页缓存大小，负数表示KB，即2MB
+    tenant_shard_mmap_size: int = 0  # 分片连接的内存映射大小（字节），0表示不使用内存映射
+    
+    # 服务启动配置（run.py / app.main.start_app）
+    # development: 单进程，监视文件变化自动重载；production: 多个工作进程，不重载
+    server_mode: str = "development"
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    server_workers: int = 0  # 生产模式的工作进程数，0表示使用CPU核数
+    server_loop: str = "auto"  # 事件循环实现：auto（已安装uvloop时使用uvloop）、uvloop、asyncio
+    server_http: str = "auto"  # HTTP协议实现：auto（已安装httptools时使用httptools）、httptools、h11
+    server_backlog: int = 2048  # 监听socket等待accept的连接队列长度
+    server_keepalive: int = 5  # 空闲keep-alive连接的保持时间（秒），位于负载均衡之后时应大于其空闲超时
+    server_graceful_timeout: Optional[int] = 30  # 关闭时等待进行中请求完成的最长时间（秒），为空表示一直等待
+    server_limit_max_requests: int = 0  # 每个工作进程处理该数量的请求后重启，0表示不重启
+    server_access_log: bool = True  # 是否输出uvicorn访问日志
     
     # CORS配置
     backend_cors_origins: list = ["http://localhost:3000", "http://localhost:8000"]
     
     # API配置
     api_prefix: str = "/api/v1"
+    openapi_file: Optional[str] = None  # 预先生成的OpenAPI文档路径（python -m app.openapi），为空时在首次请求时生成
+    batch_max_size: int = 1000  # 批量接口单次请求最多处理的项数
+    export_batch_size: int = 1000  # 导出接口每批从数据库读取的记录数
+    import_chunk_size: int = 5000  # 导入接口每个事务插入的记录数
+    import_max_errors: int = 100  # 导入接口响应中最多返回的错误行数
+    clear_batch_size: int = 1000  # 删除已完成和删除全部接口每个事务软删除的记录数
+    
+    # 合并提交配置：并发的完成/未完成状态切换合并到一个事务中提交，减少SQLite的fsync次数
+    # 异步数据库模式下不生效
+    group_commit_enabled: bool = False
+    group_commit_window: float = 0.002  # 收到第一个写操作后等待更多写操作的时间（秒），0表示只合并已在排队的写操作
+    group_commit_max_batch: int = 256  # 每次提交最多合并的写操作数
+    
+    # 读缓存配置
+    # 默认缓存为进程内缓存，缓存键包含所有者的数据版本号，其他进程的写操作也会使缓存项不再被读取
+    cache_enabled: bool = True
+    cache_ttl: float = 5.0  # 缓存过期时间（秒）
+    cache_version_ttl: float = 1.0  # 所有者数据版本号在本进程内的缓存时间（秒），其他进程的写操作最多延迟该时间可见
+    cache_max_entries: int = 1024  # 最多缓存的查询结果数
+    
+    # 监控配置
+    metrics_enabled: bool = True  # 是否统计请求和数据库查询指标
+    
+    # 日志与诊断配置
+    log_level: str = "INFO"
+    log_json: bool = True  # 输出JSON格式日志，False时输出便于阅读的控制台格式
+    slow_query_ms: float = 0.0  # 慢查询阈值（毫秒），超过时记录日志，0表示关闭
+    slow_query_explain: bool = True  # 慢查询日志是否包含执行计划
+    profile_sample_rate: float = 0.0  # 随机剖析的请求比例，0表示关闭
+    profile_token: str = ""  # 请求头X-Profile等于该值时剖析该请求，为空时不接受请求头触发
+    profile_top: int = 30  # 剖析日志中输出的函数数量
+    profile_dir: Optional[str] = None  # 保存.prof剖析文件的目录，为空时只输出日志
+    
+    # 变更事件流配置
+    # 事件来自数据库中的变更记录，每个工作进程各自中继，多个工作进程时同样可用
+    stream_queue_size: int = 256  # 每个连接未发送事件的上限，超过时断开该连接
+    stream_poll_interval: float = 1.0  # 读取订阅的所有者数据版本号的间隔（秒），其他进程的写操作最多延迟该时间推送
+    stream_batch_limit: int = 100  # 一次推送或补发的最多变更数，超过时推送reset事件
+    stream_keepalive: float = 15.0  # 没有事件时发送心跳注释的间隔（秒）
+    
+    # 后台维护任务配置，间隔为0表示不运行
+    # 多个工作进程和实例中只有持有任务租约的进程运行任务，租约时长为任务间隔的两倍且不少于task_lease_min秒
+    task_lease_min: float = 30.0
+    stats_reconcile_interval: float = 3600.0  # 重新统计待办事项计数的间隔（秒）
+    tombstone_compact_interval: float = 3600.0  # 清理过期删除记录的间隔（秒）
+    purge_interval: float = 1.0  # 清理软删除记录的间隔（秒）
+    purge_batch_size: int = 500  # 每个事务清理的软删除记录数
+    purge_time_budget: float = 0.1  # 每次清理的最长运行时间（秒），用完后等待下一次运行
+    tombstone_retention: float = 604800.0  # 删除记录的保留时间（秒），超过该时间未同步的客户端需要重新获取完整列表
     
     class Config:
         env_file = ".env"
-        case_sensitive = True
+        case_sensitive = False
 
 
 # 创建全局配置实例
@@ -0,0 +1,65 @@
+"""
+HTTP条件请求工具
+生成待办事项的ETag，并按RFC 9110比较If-None-Match/If-Match请求头
+"""
+import hashlib
+from typing import Any, Optional
+
+
+def list_etag(version: int, owner_id: str) -> str:
+    """
+    生成列表的ETag
+    同一URL的列表内容只取决于所有者和该所有者的数据版本号，版本号在该所有者每次写入时递增；
+    不同所有者的版本号可能相同，ETag中包含所有者ID
+
+    Args:
+        version: 所有者的数据版本号
+        owner_id: 所有者ID
+
+    Returns:
+        str: 带引号的ETag
+    """
+    return f'"{owner_id}-v{version}"'
+
+
+def todo_etag(todo: Any) -> str:
+    """
+    生成单个待办事项的ETag
+    数据库时间戳只精确到秒，因此使用全部字段的摘要而不是updated_at
+
+    Args:
+        todo: 具有待办事项字段属性的对象（ORM对象、查询结果行或TodoResponse）
+
+    Returns:
+        str: 带引号的ETag
+    """
+    fields = (todo.id, todo.title, todo.description, todo.completed, todo.created_at, todo.updated_at)
+    digest = hashlib.sha1(repr(fields).encode("utf-8")).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = True) -> bool:
+    """
+    判断条件请求头是否匹配ETag
+
+    Args:
+        header: If-None-Match或If-Match请求头的值
+        etag: 当前资源的ETag
+        weak: 是否使用弱比较（If-None-Match使用弱比较，If-Match使用强比较）
+
+    Returns:
+        bool: 请求头为*或包含匹配的ETag时返回True
+    """
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
@@ -0,0 +1,276 @@
+"""
+待办事项变更事件广播
+事件来自数据库中的变更记录：每个工作进程的中继任务定期读取有订阅者的所有者的数据版本号，
+版本号增加时查询之后的变更并发布给本进程的订阅者（/todos/stream的连接）。任何进程的写操作都会递增版本号，
+因此连接到任意工作进程的订阅者都能收到所有写操作的事件；本进程的写操作提交后调用notify立即唤醒中继任务。
+事件ID为变更后的数据版本号，在所有工作进程中一致，客户端重新连接到任意进程时都可以从最后收到的事件继续接收。
+每个订阅者有容量固定的队列，消费过慢的订阅者会被断开，中继任务永远不会被阻塞
+"""
+import asyncio
+import json
+import threading
+from typing import Any, Callable, Dict, NamedTuple, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("app.events")
+
+
+class Event(NamedTuple):
+    """
+    一条已编码的事件
+    """
+    # 事件ID，为变更后所有者的数据版本号，所有工作进程一致
+    id: str
+    # 变更后所有者的数据版本号
+    version: int
+    # 事件类型，如created、updated、deleted
+    type: str
+    # JSON编码后的事件数据，所有订阅者共享同一份
+    data: str
+    # 事件所属的所有者，只分发给订阅了该所有者的订阅者
+    owner: str
+
+
+def encode_event(event_type: str, data: Any, owner: str, version: int) -> Event:
+    """
+    编码一条事件
+
+    Args:
+        event_type: 事件类型
+        data: 事件数据，可以是JSON字符串或可JSON编码的对象
+        owner: 事件所属的所有者
+        version: 变更后所有者的数据版本号
+
+    Returns:
+        Event: 编码后的事件
+    """
+    encoded = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return Event(str(version), version, event_type, encoded, owner)
+
+
+class Subscription:
+    """
+    一个订阅者
+    消费过慢导致队列已满时被标记为溢出并断开，客户端重新连接后从最后收到的事件继续
+    """
+
+    def __init__(self, broadcaster: "EventBroadcaster", queue_size: int, owner: str, after: int):
+        self.broadcaster = broadcaster
+        # 只接收该所有者的事件
+        self.owner = owner
+        self.queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue(maxsize=queue_size)
+        # 已发送到的数据版本号，不大于该版本的事件已从数据库补发，不再发送
+        self.after = after
+        # 队列溢出，订阅者已错过事件
+        self.overflowed = False
+
+    def deliver(self, event: Optional[Event]) -> None:
+        """在事件循环线程中放入事件，None表示关闭订阅"""
+        if self.overflowed or (event is not None and (event.owner != self.owner or event.version <= self.after)):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self.broadcaster.unsubscribe(self)
+            # 丢弃队列中尚未发送的事件并结束连接，客户端重新连接后从最后收到的事件开始补发，
+            # 不会跳过事件
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """
+        等待下一条事件，跳过放入队列之后才从数据库补发的事件
+
+        Args:
+            timeout: 最长等待时间（秒），超时抛出asyncio.TimeoutError
+
+        Returns:
+            Optional[Event]: 下一条事件，订阅已关闭时返回None
+        """
+        while True:
+            if timeout is None:
+                event = await self.queue.get()
+            else:
+                event = await asyncio.wait_for(self.queue.get(), timeout)
+            if event is None or event.version > self.after:
+                return event
+
+    def close(self) -> None:
+        """取消订阅"""
+        self.broadcaster.unsubscribe(self)
+
+
+class EventBroadcaster:
+    """
+    事件广播器
+    中继任务在线程池中查询变更并发布事件，事件由事件循环线程分发给本进程的订阅者；
+    每个有订阅者的所有者记录中继已发布到的数据版本号，下一次只查询之后的变更
+    """
+
+    def __init__(self, queue_size: int = 256, poll_interval: float = 1.0):
+        """
+        Args:
+            queue_size: 每个订阅者队列的容量
+            poll_interval: 中继任务读取数据版本号的间隔（秒），即其他进程的写操作推送的最长延迟
+        """
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        # 有订阅者的所有者及中继已发布到的数据版本号
+        self._versions: Dict[str, int] = {}
+        self._subscribers: Set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+    @property
+    def subscriber_count(self) -> int:
+        """当前的订阅者数量"""
+        return len(self._subscribers)
+
+    def cursors(self) -> Dict[str, int]:
+        """
+        有订阅者的所有者及中继已发布到的数据版本号
+
+        Returns:
+            Dict[str, int]: 所有者到数据版本号的映射
+        """
+        with self._lock:
+            return dict(self._versions)
+
+    def publish(self, event_type: str, data: Any, owner: str, version: int) -> Event:
+        """
+        发布事件，由中继任务按版本号顺序调用，不等待订阅者接收
+
+        Args:
+            event_type: 事件类型
+            data: 事件数据，可以是JSON字符串或可JSON编码的对象
+            owner: 事件所属的所有者
+            version: 变更后所有者的数据版本号
+
+        Returns:
+            Event: 发布的事件
+        """
+        event = encode_event(event_type, data, owner, version)
+        with self._lock:
+            loop = self._loop if self._subscribers else None
+            if loop is not None and not loop.is_closed():
+                loop.call_soon_threadsafe(self._dispatch, event)
+            # 先安排分发再记录版本号，看到版本号已发布之后调用close时事件一定先送达
+            if owner in self._versions:
+                self._versions[owner] = max(self._versions[owner], version)
+        return event
+
+    def _dispatch(self, event: Optional[Event]) -> None:
+        for subscription in list(self._subscribers):
+            subscription.deliver(event)
+
+    def notify(self, owner: str) -> None:
+        """
+        本进程的写操作提交后调用，该所有者有订阅者时立即唤醒中继任务，可以在任意线程中调用
+
+        Args:
+            owner: 写入的所有者
+        """
+        with self._lock:
+            loop = self._loop if owner in self._versions else None
+            wakeup = self._wakeup
+        if loop is not None and wakeup is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wakeup.set)
+
+    def subscribe(self, owner: str, after: int) -> Subscription:
+        """
+        在当前事件循环中订阅所有者的事件
+
+        Args:
+            owner: 订阅的所有者
+            after: 订阅时所有者的数据版本号，只接收之后的事件
+
+        Returns:
+            Subscription: 订阅
+        """
+        with self._lock:
+            subscription = Subscription(self, self.queue_size, owner, after)
+            self._loop = asyncio.get_running_loop()
+            self._subscribers.add(subscription)
+            # 所有者的第一个订阅者从订阅时的版本号开始中继
+            self._versions.setdefault(owner, after)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """取消订阅，所有者没有其他订阅者时不再中继该所有者的变更"""
+        with self._lock:
+            self._subscribers.discard(subscription)
+            if not any(other.owner == subscription.owner for other in self._subscribers):
+                self._versions.pop(subscription.owner, None)
+
+    def start(self, relay: Callable[[Dict[str, int]], object]) -> None:
+        """
+        在当前事件循环中启动中继任务，间隔不大于0或已启动时不做任何操作
+
+        Args:
+            relay: 中继函数，在线程池中执行，参数为cursors()的返回值，
+                查询每个所有者在对应版本号之后的变更并按顺序调用publish
+        """
+        if self.poll_interval > 0 and self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._relay_loop(relay), name="event_relay")
+
+    async def _relay_loop(self, relay: Callable[[Dict[str, int]], object]) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            cursors = self.cursors()
+            if not cursors:
+                continue
+            try:
+                await run_in_threadpool(relay, cursors)
+            except Exception:
+                logger.exception("event_relay_failed")
+
+    async def stop(self) -> None:
+        """停止中继任务"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._wakeup = None
+
+    def close(self) -> None:
+        """关闭所有订阅，用于应用关闭时结束所有流式响应，可以在任意线程中调用"""
+        with self._lock:
+            loop = self._loop if self._subscribers else None
+        if loop is not None and not loop.is_closed():
+            # 与事件分发在同一个事件循环中按顺序执行，之前已发布但尚未分发的事件先送达订阅者
+            loop.call_soon_threadsafe(self._close_subscriptions)
+        else:
+            # 事件循环已关闭，订阅者已不存在
+            with self._lock:
+                self._subscribers.clear()
+                self._versions.clear()
+
+    def _close_subscriptions(self) -> None:
+        with self._lock:
+            subscriptions = list(self._subscribers)
+            self._subscribers.clear()
+            self._versions.clear()
+        for subscription in subscriptions:
+            subscription.deliver(None)
+
+
+# 全局事件广播器实例
+todo_events = EventBroadcaster(settings.stream_queue_size, settings.stream_poll_interval)
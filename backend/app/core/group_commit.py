@@ -0,0 +1,125 @@
+"""
+合并提交写入器
+并发请求的小写操作交给同一个写入线程，写入线程收集一小段时间内到达的写操作，在一个事务中依次执行后只提交一次。
+SQLite每次提交都要fsync，逐个提交时写吞吐量受限于fsync速率；合并后一次fsync完成一批写操作
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Generic, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.orm import Session
+
+from app.core.logging import get_logger
+from app.core.metrics import observe_group_commit
+
+logger = get_logger("app.group_commit")
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class GroupCommitWriter(Generic[T, R]):
+    """
+    合并提交写入器
+    submit在调用线程中阻塞等待，直到写操作所在的批次提交，返回该写操作自己的结果；
+    写入线程在第一次提交写操作时启动
+    """
+
+    def __init__(
+        self,
+        name: str,
+        apply: Callable[[Session, List[T]], List[R]],
+        session_factory: Callable[[], Session],
+        enabled: bool = False,
+        window: float = 0.002,
+        max_batch: int = 256,
+    ):
+        """
+        Args:
+            name: 写入器名称，用于日志和写入线程名
+            apply: 批量执行函数，在一个事务中按顺序执行写操作并提交，返回与输入一一对应的结果
+            session_factory: 创建数据库会话的函数，每批使用一个新会话
+            enabled: 是否启用，未启用时调用方应直接逐个写入
+            window: 收到第一个写操作后继续等待其他写操作的时间（秒），0表示只合并已在排队的写操作
+            max_batch: 每批最多的写操作数
+        """
+        self.name = name
+        self.apply = apply
+        self.session_factory = session_factory
+        self.enabled = enabled
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Optional[Tuple[T, Future]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, item: T) -> R:
+        """
+        提交一个写操作并等待所在批次提交
+
+        Args:
+            item: 写操作，原样传给apply
+
+        Returns:
+            R: apply返回的该写操作的结果
+
+        Raises:
+            Exception: 该写操作执行失败时抛出apply中的异常，不影响同批的其他写操作
+        """
+        future: Future = Future()
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"group-commit-{self.name}", daemon=True)
+                self._thread.start()
+            self._queue.put((item, future))
+        return future.result()
+
+    def close(self) -> None:
+        """执行完已提交的写操作后停止写入线程，之后再次提交时重新启动"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._queue.put(None)
+        thread.join()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            stopping = False
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stopping:
+                return
+
+    def _commit(self, batch: List[Tuple[T, Future]]) -> None:
+        try:
+            with self.session_factory() as db:
+                results = self.apply(db, [item for item, _ in batch])
+        except Exception as exc:
+            if len(batch) > 1:
+                # 整批失败时逐个重新执行，只有出错的写操作返回异常
+                logger.warning("group_commit_batch_failed", writer=self.name, size=len(batch), error=repr(exc))
+                for entry in batch:
+                    self._commit([entry])
+            else:
+                batch[0][1].set_exception(exc)
+            return
+        observe_group_commit(self.name, len(batch))
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
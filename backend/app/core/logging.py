@@ -0,0 +1,90 @@
+"""
+结构化日志
+使用structlog输出JSON格式的日志，并为每个请求分配请求ID，同一请求中输出的日志都带有request_id字段
+"""
+import logging
+import re
+import sys
+import uuid
+
+import structlog
+from structlog.typing import FilteringBoundLogger
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+# 请求ID请求头/响应头
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# 接受客户端传入的请求ID的格式，不符合时重新生成，避免日志注入
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._\-]{1,128}$")
+
+
+def configure_logging() -> None:
+    """
+    配置structlog
+    日志级别由LOG_LEVEL决定，LOG_JSON=False时输出便于阅读的控制台格式
+    """
+    renderer = structlog.processors.JSONRenderer() if settings.log_json else structlog.dev.ConsoleRenderer()
+    structlog.configure(
+        processors=[
+            structlog.contextvars.merge_contextvars,
+            structlog.processors.add_log_level,
+            structlog.processors.TimeStamper(fmt="iso", utc=True),
+            structlog.processors.format_exc_info,
+            renderer,
+        ],
+        wrapper_class=structlog.make_filtering_bound_logger(
+            logging.getLevelName(settings.log_level.upper())
+        ),
+        logger_factory=structlog.WriteLoggerFactory(file=sys.stderr),
+        cache_logger_on_first_use=True,
+    )
+
+
+def get_logger(name: str) -> FilteringBoundLogger:
+    """
+    获取结构化日志记录器
+
+    Args:
+        name: 记录器名称，输出为logger_name字段
+
+    Returns:
+        FilteringBoundLogger: 日志记录器
+    """
+    # 使用惰性代理，在首次输出日志时才按configure_logging的配置创建记录器
+    return structlog.get_logger(logger_name=name)
+
+
+class RequestIdMiddleware:
+    """
+    请求ID中间件
+    优先使用请求头X-Request-ID中的请求ID，否则生成新的ID；
+    请求ID绑定到structlog的上下文变量中，并通过响应头X-Request-ID返回
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        if request_id is None or not _REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        with structlog.contextvars.bound_contextvars(request_id=request_id):
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,267 @@
+"""
+Prometheus监控指标
+按路由模板统计请求耗时、进行中的请求数和响应大小，通过SQLAlchemy引擎事件统计每个请求的数据库查询次数和耗时
+"""
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.responses import Response
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 未匹配任何路由的请求统一使用该标签，避免原始路径导致标签数量无限增长
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP请求耗时（秒）",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "正在处理的HTTP请求数",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "HTTP响应体大小（字节）",
+    ["method", "route"],
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, float("inf")),
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "每个HTTP请求执行的数据库查询数",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, float("inf")),
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds",
+    "每个HTTP请求的数据库查询总耗时（秒）",
+    ["method", "route"],
+)
+DB_QUERIES = Counter(
+    "db_queries_total",
+    "数据库查询次数",
+    ["operation"],
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "单条数据库查询耗时（秒）",
+    ["operation"],
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "从连接池获取连接的等待时间（秒）",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, float("inf")),
+)
+
+DB_GROUP_COMMIT_BATCH_SIZE = Histogram(
+    "db_group_commit_batch_size",
+    "合并提交写入器每次提交的写操作数",
+    ["writer"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, float("inf")),
+)
+
+DB_READ_ROUTES = Counter(
+    "db_read_routes_total",
+    "读请求使用的数据库：primary（未配置副本）、sticky（写后读使用主库）、fallback（副本不可用）或副本编号",
+    ["target"],
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "读缓存的读取次数，result为hit（命中）或miss（未命中）",
+    ["cache", "result"],
+)
+
+
+
+class RequestDbStats:
+    """
+    单个请求的数据库查询统计
+    由中间件在请求开始时创建并放入上下文变量，引擎事件在查询结束后累加
+    """
+
+    __slots__ = ("queries", "duration")
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+
+# 当前请求的数据库查询统计
+# 线程池和run_sync都会复制上下文，同步路由和流式响应中的查询同样计入当前请求
+_request_db_stats: ContextVar[Optional[RequestDbStats]] = ContextVar("request_db_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+    DB_QUERIES.labels(operation).inc()
+    DB_QUERY_DURATION.labels(operation).observe(elapsed)
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.duration += elapsed
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    为数据库引擎注册查询统计事件
+
+    Args:
+        engine: 同步引擎，异步引擎传入其sync_engine
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def observe_pool_wait(seconds: float) -> None:
+    """
+    记录从连接池获取连接的等待时间
+
+    Args:
+        seconds: 等待时间（秒）
+    """
+    DB_POOL_WAIT.observe(seconds)
+
+
+def observe_group_commit(writer: str, size: int) -> None:
+    """
+    记录合并提交的批次大小
+
+    Args:
+        writer: 写入器名称
+        size: 本次提交的写操作数
+    """
+    DB_GROUP_COMMIT_BATCH_SIZE.labels(writer).observe(size)
+
+
+def observe_read_route(target: str) -> None:
+    """
+    记录读请求使用的数据库
+
+    Args:
+        target: primary、sticky、fallback或replica-<编号>
+    """
+    DB_READ_ROUTES.labels(target).inc()
+
+
+def observe_cache(cache: str, hit: bool) -> None:
+    """
+    记录一次读缓存的读取
+
+    Args:
+        cache: 缓存名称
+        hit: 是否命中
+    """
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def route_template(scope: Scope) -> str:
+    """
+    获取请求匹配的路由模板，如/api/v1/todos/{todo_id}
+
+    Args:
+        scope: ASGI请求范围
+
+    Returns:
+        str: 路由模板，未匹配任何路由时返回UNMATCHED_ROUTE
+    """
+    app = scope.get("app")
+    partial = None
+    for route in getattr(app, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            # 路径匹配但请求方法不匹配（405）
+            partial = route.path
+    return partial or UNMATCHED_ROUTE
+
+
+class PrometheusMiddleware:
+    """
+    请求监控中间件
+    以ASGI中间件实现，不缓冲响应体，流式响应的耗时统计到响应体发送完毕为止
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        stats = RequestDbStats()
+        token = _request_db_stats.set(stats)
+        in_progress = REQUESTS_IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_DURATION.labels(method, route, str(status)).observe(time.perf_counter() - start)
+            in_progress.dec()
+            RESPONSE_SIZE.labels(method, route).observe(size)
+            REQUEST_DB_QUERIES.labels(method, route).observe(stats.queries)
+            REQUEST_DB_DURATION.labels(method, route).observe(stats.duration)
+            _request_db_stats.reset(token)
+
+
+def metrics_response() -> Response:
+    """
+    生成Prometheus文本格式的指标响应
+    设置了PROMETHEUS_MULTIPROC_DIR环境变量（多进程部署）时汇总所有工作进程的指标
+
+    Returns:
+        Response: 指标响应
+    """
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_worker_exited() -> None:
+    """
+    多进程部署时标记当前工作进程已退出，由应用关闭时调用
+    livesum类型的指标（如进行中的请求数）不再计入该进程的值
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
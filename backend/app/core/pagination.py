@@ -0,0 +1,69 @@
+"""
+分页游标工具
+游标对客户端是不透明的字符串，内部为URL安全的base64编码JSON
+"""
+import base64
+import binascii
+import json
+from typing import Any, Dict
+
+# 数据库整数列（SQLite INTEGER、PostgreSQL BIGINT）能表示的范围，超出范围的ID无法作为查询参数
+MIN_ID = -2 ** 63
+MAX_ID = 2 ** 63 - 1
+
+
+class InvalidCursorError(ValueError):
+    """
+    分页游标无效
+    游标无法解码或内容格式不正确时抛出
+    """
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """
+    将游标内容编码为不透明字符串
+    
+    Args:
+        values: 游标内容，如 {"id": 42}
+        
+    Returns:
+        str: 编码后的游标
+    """
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    解码游标字符串
+    
+    Args:
+        cursor: encode_cursor生成的游标
+        
+    Returns:
+        Dict[str, Any]: 游标内容
+        
+    Raises:
+        InvalidCursorError: 游标无法解码时抛出
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError, binascii.Error) as exc:
+        raise InvalidCursorError("无效的分页游标") from exc
+    if not isinstance(values, dict):
+        raise InvalidCursorError("无效的分页游标")
+    return values
+
+
+def is_valid_id(value: Any) -> bool:
+    """
+    判断游标或请求中的值是否为数据库能表示的整数ID
+    
+    Args:
+        value: 待检查的值
+        
+    Returns:
+        bool: 是整数（不含布尔值）且在MIN_ID到MAX_ID之间时返回True
+    """
+    return isinstance(value, int) and not isinstance(value, bool) and MIN_ID <= value <= MAX_ID
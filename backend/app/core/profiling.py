@@ -0,0 +1,234 @@
+"""
+慢查询日志和请求剖析
+慢查询日志记录超过阈值的SQL语句及其执行计划；请求剖析按比例或由请求头触发，
+使用cProfile剖析路由函数并以结构化日志输出耗时最多的函数，均可通过配置开启，无需修改代码
+"""
+import asyncio
+import cProfile
+import os
+import pstats
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, List, Optional
+
+import structlog
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import route_template
+
+logger = get_logger("app.profiling")
+
+# 触发剖析的请求头，值需要等于配置中的profile_token
+PROFILE_HEADER = "X-Profile"
+
+# 慢查询日志中SQL语句和参数的最大长度
+_MAX_LOGGED_LENGTH = 2000
+
+# 当前请求的剖析器，未剖析的请求为None
+_current_profiler: ContextVar[Optional[cProfile.Profile]] = ContextVar("current_profiler", default=None)
+
+
+def _truncate(value: Any) -> str:
+    text = str(value)
+    return text if len(text) <= _MAX_LOGGED_LENGTH else text[:_MAX_LOGGED_LENGTH] + "..."
+
+
+def _explain(conn, statement: str, parameters: Any) -> Optional[List[str]]:
+    """
+    获取语句的执行计划
+    直接使用DBAPI游标执行EXPLAIN，不触发引擎事件，也不会真正执行语句
+
+    Args:
+        conn: SQLAlchemy连接
+        statement: SQL语句
+        parameters: 语句参数
+
+    Returns:
+        Optional[List[str]]: 执行计划的每一行，获取失败时返回None
+    """
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    try:
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return [" ".join(str(column) for column in row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    except Exception as e:
+        logger.debug("explain_failed", error=str(e))
+        return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["slow_query_start_time"].pop()) * 1000
+    if settings.slow_query_ms <= 0 or elapsed_ms < settings.slow_query_ms:
+        return
+    plan = None
+    if settings.slow_query_explain and not executemany:
+        plan = _explain(conn, statement, parameters)
+    logger.warning(
+        "slow_query",
+        duration_ms=round(elapsed_ms, 3),
+        statement=_truncate(statement),
+        parameters=_truncate(parameters),
+        executemany=executemany,
+        plan=plan,
+    )
+
+
+def log_slow_queries(engine: Engine) -> None:
+    """
+    为数据库引擎注册慢查询日志事件
+    阈值在每次查询结束时读取配置，slow_query_ms为0时只记录开始时间，开销可以忽略
+
+    Args:
+        engine: 同步引擎，异步引擎传入其sync_engine
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _profiled(call: Callable) -> Callable:
+    """
+    包装路由函数，当前请求需要剖析时在执行路由函数的线程中启用剖析器
+    同步路由函数在线程池中执行，因此剖析器不能在中间件所在的事件循环线程中启用
+
+    Args:
+        call: 路由函数
+
+    Returns:
+        Callable: 与原函数同为同步或异步的路由函数
+    """
+    if asyncio.iscoroutinefunction(call):
+        @wraps(call)
+        async def async_wrapper(*args, **kwargs):
+            profiler = _current_profiler.get()
+            if profiler is None:
+                return await call(*args, **kwargs)
+            # 异步路由函数在事件循环线程中执行，await期间其他请求的代码也会被计入
+            profiler.enable()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                profiler.disable()
+        return async_wrapper
+
+    @wraps(call)
+    def wrapper(*args, **kwargs):
+        profiler = _current_profiler.get()
+        if profiler is None:
+            return call(*args, **kwargs)
+        return profiler.runcall(call, *args, **kwargs)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    支持请求剖析的路由类
+    通过APIRouter(route_class=ProfiledRoute)使用
+    """
+
+    def get_route_handler(self):
+        self.dependant.call = _profiled(self.dependant.call)
+        return super().get_route_handler()
+
+
+def _profile_stats(profiler: cProfile.Profile, limit: int) -> List[dict]:
+    """
+    汇总剖析结果
+
+    Args:
+        profiler: 剖析器
+        limit: 返回的函数数量
+
+    Returns:
+        List[dict]: 按累计耗时降序排列的函数统计
+    """
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "total_ms": round(total_time * 1000, 3),
+            "cumulative_ms": round(cumulative_time * 1000, 3),
+        }
+        for (filename, line, name), (_, calls, total_time, cumulative_time, _) in rows
+    ]
+
+
+class ProfilingMiddleware:
+    """
+    请求剖析中间件
+    按profile_sample_rate随机选择请求，或在请求头X-Profile等于profile_token时剖析该请求，
+    请求结束后输出request_profile日志，配置了profile_dir时同时保存.prof文件
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    def _should_profile(self, scope: Scope) -> bool:
+        if settings.profile_token:
+            header = PROFILE_HEADER.lower().encode("latin-1")
+            for name, value in scope["headers"]:
+                if name == header and value.decode("latin-1") == settings.profile_token:
+                    return True
+        return settings.profile_sample_rate > 0 and random.random() < settings.profile_sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        profiler = cProfile.Profile()
+        token = _current_profiler.set(profiler)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            _current_profiler.reset(token)
+            self._report(scope, status, duration_ms, profiler)
+
+    def _report(self, scope: Scope, status: int, duration_ms: float, profiler: cProfile.Profile) -> None:
+        try:
+            stats = _profile_stats(profiler, settings.profile_top)
+        except TypeError:
+            # 路由函数没有被执行（如404、校验失败），剖析器中没有数据
+            stats = []
+        profile_file = None
+        if settings.profile_dir and stats:
+            os.makedirs(settings.profile_dir, exist_ok=True)
+            request_id = structlog.contextvars.get_contextvars().get("request_id", time.time_ns())
+            profile_file = os.path.join(settings.profile_dir, f"{request_id}.prof")
+            profiler.dump_stats(profile_file)
+        logger.info(
+            "request_profile",
+            method=scope["method"],
+            path=scope["path"],
+            route=route_template(scope),
+            status=status,
+            duration_ms=round(duration_ms, 3),
+            profile_file=profile_file,
+            stats=stats,
+        )
@@ -0,0 +1,248 @@
+"""
+只读副本读写分离
+写操作和大部分接口使用主库，列表和详情接口的查询按轮询或最少连接分配到只读副本，读取能力可以通过增加副本横向扩展。
+副本存在复制延迟，客户端写操作后的一小段时间内（read_your_writes_window）该客户端的读请求仍使用主库，
+保证能读到自己刚写入的数据（read-your-writes）；写操作时间通过X-Last-Write响应头返回给客户端，
+客户端在之后的请求中原样带上该请求头（跨域请求也可以携带），同源客户端也可以依靠同名Cookie，多个工作进程和实例之间通用
+"""
+import itertools
+import threading
+import time
+from http.cookies import SimpleCookie
+from typing import Iterator, List, Optional, Tuple
+
+from fastapi import Depends, Request
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.database import USE_ASYNC_DB, connect_session, create_sync_engine, to_sync_url
+from app.core.logging import get_logger
+from app.core.metrics import observe_read_route
+from app.core.tenancy import get_owner, owner_session, tenant_shards
+
+logger = get_logger("app.replicas")
+
+# 返回客户端最近一次写操作时间的响应头，客户端在之后的请求中原样带上
+LAST_WRITE_HEADER = "X-Last-Write"
+
+# 记录客户端最近一次写操作时间的Cookie，用于不回传请求头的同源客户端
+LAST_WRITE_COOKIE = "todos_last_write"
+
+# 会话info中的标记，表示本次读请求因写后读使用主库，不读取可能由副本的旧数据填充的读缓存
+STICKY_READ_KEY = "read_your_writes"
+
+REPLICA_SELECTIONS = ("round_robin", "least_connections")
+
+# 不修改数据的请求方法，不更新写操作时间
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReplicaSet:
+    """
+    只读副本集合
+    每个副本一个引擎和会话工厂，使用与主库相同的连接池配置；
+    least_connections按本集合分配出去、尚未归还的会话数选择副本
+    """
+
+    def __init__(self, urls: List[str], selection: str = "round_robin"):
+        """
+        Args:
+            urls: 副本的同步驱动数据库URL，为空表示没有副本
+            selection: 副本选择方式，round_robin或least_connections
+
+        Raises:
+            ValueError: selection不是round_robin或least_connections
+        """
+        if selection not in REPLICA_SELECTIONS:
+            raise ValueError(f"未知的副本选择方式: {selection}，可选值为{'、'.join(REPLICA_SELECTIONS)}")
+        self.selection = selection
+        self.engines = [create_sync_engine(to_sync_url(url)) for url in urls]
+        self.session_factories = [
+            sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=replica_engine)
+            for replica_engine in self.engines
+        ]
+        self.in_flight = [0] * len(self.engines)
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def acquire(self) -> int:
+        """
+        选择一个副本并计入进行中的会话
+
+        Returns:
+            int: 副本编号，使用完毕后需调用release
+        """
+        with self._lock:
+            count = len(self.engines)
+            start = next(self._counter)
+            if self.selection == "least_connections":
+                # 进行中的会话数相同时从轮询位置开始选择，避免总是落到第一个副本
+                index = min(((start + offset) % count for offset in range(count)), key=self.in_flight.__getitem__)
+            else:
+                index = start % count
+            self.in_flight[index] += 1
+            return index
+
+    def release(self, index: int) -> None:
+        """
+        归还副本
+
+        Args:
+            index: acquire返回的副本编号
+        """
+        with self._lock:
+            self.in_flight[index] -= 1
+
+    def dispose(self) -> None:
+        """关闭所有副本的连接池"""
+        for replica_engine in self.engines:
+            replica_engine.dispose()
+
+
+def last_write_time(request: Request) -> Optional[float]:
+    """
+    读取客户端最近一次写操作的时间
+
+    Args:
+        request: 请求对象
+
+    Returns:
+        Optional[float]: X-Last-Write请求头中的时间戳，没有该请求头时使用Cookie中的时间戳，都没有或格式无效时返回None
+    """
+    value = request.headers.get(LAST_WRITE_HEADER)
+    if value is None:
+        value = request.cookies.get(LAST_WRITE_COOKIE)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def reads_own_writes(request: Request) -> bool:
+    """
+    判断请求是否需要读到客户端自己刚写入的数据
+
+    Args:
+        request: 请求对象
+
+    Returns:
+        bool: 客户端在read_your_writes_window内有过写操作时返回True
+    """
+    written_at = last_write_time(request)
+    # 时间戳由客户端回传，晚于当前时间的值视为无效，避免一直使用主库
+    return written_at is not None and 0 <= time.time() - written_at < settings.read_your_writes_window
+
+
+def is_sticky_read(db: Session) -> bool:
+    """
+    判断会话是否因写后读而使用主库
+
+    Args:
+        db: get_read_db返回的数据库会话
+
+    Returns:
+        bool: 是时返回True，调用方不应读取读缓存
+    """
+    return db.info.get(STICKY_READ_KEY, False)
+
+
+def _open_session(request: Request, owner_id: str) -> Tuple[Session, Optional[int]]:
+    """
+    为读请求打开数据库会话
+
+    Args:
+        request: 请求对象
+        owner_id: 所有者
+
+    Returns:
+        Tuple[Session, Optional[int]]: 已获取连接的会话和副本编号，使用主库时副本编号为None
+    """
+    if tenant_shards:
+        # 按所有者分片时分片没有副本，读请求使用所有者的分片
+        target = "shard"
+    elif not read_replicas:
+        target = "primary"
+    elif reads_own_writes(request):
+        target = "sticky"
+    else:
+        index = read_replicas.acquire()
+        db = read_replicas.session_factories[index]()
+        try:
+            connect_session(db)
+        except OperationalError as exc:
+            # 副本不可用时使用主库，不让读请求失败
+            db.close()
+            read_replicas.release(index)
+            logger.warning("replica_unavailable", replica=index, error=repr(exc))
+            target = "fallback"
+        else:
+            observe_read_route(f"replica-{index}")
+            return db, index
+
+    db = owner_session(owner_id)
+    try:
+        connect_session(db)
+    except Exception:
+        db.close()
+        raise
+    db.info[STICKY_READ_KEY] = target == "sticky"
+    observe_read_route(target)
+    return db, None
+
+
+def get_read_db(request: Request, owner_id: str = Depends(get_owner)) -> Iterator[Session]:
+    """
+    获取只读数据库会话的依赖函数
+    配置了只读副本时从副本中选择一个，客户端刚写入过数据或副本不可用时使用主库，按所有者分片时使用所有者的分片；
+    会话只能用于查询，写操作需使用get_owner_db
+    """
+    db, index = _open_session(request, owner_id)
+    try:
+        yield db
+    finally:
+        db.close()
+        if index is not None:
+            read_replicas.release(index)
+
+
+class ReadYourWritesMiddleware:
+    """
+    写后读中间件
+    配置了只读副本时，成功的写请求（非GET/HEAD/OPTIONS且状态码小于400）在响应中通过X-Last-Write响应头和Cookie记录写操作时间，
+    该客户端随后带有该请求头或Cookie的读请求在read_your_writes_window内使用主库
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not read_replicas:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                written_at = f"{time.time():.3f}"
+                cookie = SimpleCookie()
+                cookie[LAST_WRITE_COOKIE] = written_at
+                cookie[LAST_WRITE_COOKIE]["path"] = "/"
+                cookie[LAST_WRITE_COOKIE]["max-age"] = max(1, int(settings.read_your_writes_window + 1))
+                cookie[LAST_WRITE_COOKIE]["httponly"] = True
+                cookie[LAST_WRITE_COOKIE]["samesite"] = "Lax"
+                headers = list(message.get("headers", []))
+                headers.append((LAST_WRITE_HEADER.lower().encode("latin-1"), written_at.encode("latin-1")))
+                headers.append((b"set-cookie", cookie.output(header="").strip().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+# 全局只读副本集合，未配置副本时为空
+# 异步数据库模式下读接口使用异步会话，不创建副本引擎
+read_replicas = ReplicaSet([] if USE_ASYNC_DB else settings.database_read_urls, settings.db_replica_selection)
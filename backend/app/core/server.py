@@ -0,0 +1,111 @@
+"""
+Uvicorn服务启动配置
+开发模式（默认）为单进程并监视文件变化自动重载；生产模式不重载，按配置或CPU核数启动多个工作进程。
+多个工作进程时自动配置Prometheus多进程模式，/metrics汇总所有工作进程的指标
+"""
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+# 应用的导入路径，多进程和自动重载模式下工作进程按该路径导入应用
+APP_IMPORT_PATH = "app.main:app"
+
+# prometheus_client多进程模式的指标文件目录
+PROMETHEUS_MULTIPROC_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+SERVER_MODES = ("development", "production")
+
+
+def worker_count() -> int:
+    """
+    生产模式的工作进程数
+
+    Returns:
+        int: server_workers大于0时为该值，否则为CPU核数
+    """
+    if settings.server_workers > 0:
+        return settings.server_workers
+    return os.cpu_count() or 1
+
+
+def uvicorn_options() -> Dict[str, Any]:
+    """
+    根据配置生成uvicorn.run的参数
+
+    Returns:
+        Dict[str, Any]: 传给uvicorn.run的参数
+
+    Raises:
+        ValueError: server_mode不是development或production
+    """
+    if settings.server_mode not in SERVER_MODES:
+        raise ValueError(f"未知的启动模式: {settings.server_mode}，可选值为{'、'.join(SERVER_MODES)}")
+    options: Dict[str, Any] = {
+        "host": settings.server_host,
+        "port": settings.server_port,
+        "log_level": settings.log_level.lower(),
+        "loop": settings.server_loop,
+        "http": settings.server_http,
+        "backlog": settings.server_backlog,
+        "timeout_keep_alive": settings.server_keepalive,
+        "timeout_graceful_shutdown": settings.server_graceful_timeout,
+        "access_log": settings.server_access_log,
+    }
+    if settings.server_mode == "development":
+        options["reload"] = True
+    else:
+        options["workers"] = worker_count()
+        if settings.server_limit_max_requests > 0:
+            options["limit_max_requests"] = settings.server_limit_max_requests
+    return options
+
+
+def preload() -> None:
+    """
+    在启动工作进程前导入应用并创建数据库表（db_schema_setup为create时）
+    配置或代码错误在主进程中直接报错，不会让每个工作进程反复启动失败；
+    表已存在时工作进程启动时的建表检查不需要等待数据库锁
+    """
+    from app.core.database import init_db
+    from app.main import app  # noqa: F401
+
+    if settings.db_schema_setup == "create":
+        init_db()
+
+
+def configure_multiprocess_metrics(workers: int) -> Optional[str]:
+    """
+    多个工作进程且启用监控时，为prometheus_client创建多进程模式的指标目录
+    需要在导入应用和启动工作进程之前调用，工作进程继承环境变量后将指标写入该目录；
+    已设置PROMETHEUS_MULTIPROC_DIR时使用已有的设置
+
+    Args:
+        workers: 工作进程数
+
+    Returns:
+        Optional[str]: 新创建的目录，服务退出后应删除；不需要或已设置时返回None
+    """
+    if workers <= 1 or not settings.metrics_enabled or PROMETHEUS_MULTIPROC_ENV in os.environ:
+        return None
+    directory = tempfile.mkdtemp(prefix="todos-metrics-")
+    os.environ[PROMETHEUS_MULTIPROC_ENV] = directory
+    return directory
+
+
+def run_server() -> None:
+    """按配置启动uvicorn"""
+    # 只有启动服务时才需要uvicorn，导入应用时不加载
+    import uvicorn
+
+    options = uvicorn_options()
+    metrics_dir = configure_multiprocess_metrics(options.get("workers", 1))
+    try:
+        if settings.server_mode == "production":
+            preload()
+        uvicorn.run(APP_IMPORT_PATH, **options)
+    finally:
+        if metrics_dir is not None:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
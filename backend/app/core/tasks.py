@@ -0,0 +1,144 @@
+"""
+周期性后台任务
+在应用的事件循环中按固定间隔运行同步的维护任务，任务在线程池中执行，不阻塞请求处理；
+多个工作进程和实例共用一个数据库时，通过task_leases表中的租约保证同一时间只有一个进程运行每个任务
+"""
+import asyncio
+import os
+import socket
+import time
+import uuid
+from typing import Callable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.logging import get_logger
+from app.models.todo import TaskLease
+
+logger = get_logger("app.tasks")
+
+# 本进程持有租约时使用的标识，重启后的进程使用新的标识
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+def acquire_lease(name: str, holder: str, duration: float) -> bool:
+    """
+    取得或续期任务租约
+    租约不存在、已过期或已由holder持有时写入新的过期时间，判断和写入在一条语句中完成，
+    多个进程同时取得同一个租约时只有一个成功
+
+    Args:
+        name: 任务名称
+        holder: 取得租约的进程标识
+        duration: 租约时长（秒）
+
+    Returns:
+        bool: holder持有租约时返回True
+    """
+    now = time.time()
+    with SessionLocal() as db:
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        upsert = dialect.insert(TaskLease).values(name=name, holder=holder, expires_at=now + duration)
+        db.execute(upsert.on_conflict_do_update(
+            index_elements=[TaskLease.name],
+            set_={"holder": upsert.excluded.holder, "expires_at": upsert.excluded.expires_at},
+            where=(TaskLease.holder == holder) | (TaskLease.expires_at <= now),
+        ))
+        current = db.scalar(select(TaskLease.holder).where(TaskLease.name == name))
+        db.commit()
+    return current == holder
+
+
+def release_lease(name: str, holder: str) -> None:
+    """
+    释放holder持有的任务租约，其他进程在下一次运行时即可取得
+
+    Args:
+        name: 任务名称
+        holder: 持有租约的进程标识
+    """
+    with SessionLocal() as db:
+        db.execute(delete(TaskLease).where(TaskLease.name == name, TaskLease.holder == holder))
+        db.commit()
+
+
+class PeriodicTask:
+    """
+    周期性任务
+    启动后每隔interval秒运行一次任务函数，任务抛出的异常只记录日志，不影响后续运行；
+    exclusive为True时每次运行前取得或续期租约，没有取得租约（其他进程正在运行该任务）时跳过本次运行
+    """
+
+    def __init__(self, name: str, func: Callable[[], object], interval: float, exclusive: bool = False):
+        """
+        Args:
+            name: 任务名称，用于日志和租约
+            func: 任务函数，在线程池中执行
+            interval: 运行间隔（秒），不大于0时不启动
+            exclusive: 是否只在持有租约的一个进程中运行
+        """
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.exclusive = exclusive
+        # 租约时长为两个运行间隔，持有租约的进程退出后其他进程最多等待该时长接替
+        self.lease_duration = max(interval * 2, settings.task_lease_min)
+        self._leased = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> object:
+        """
+        立即运行一次任务
+
+        Returns:
+            object: 任务函数的返回值，出错时返回None
+        """
+        start = time.perf_counter()
+        try:
+            result = await run_in_threadpool(self.func)
+        except Exception:
+            logger.exception("task_failed", task=self.name)
+            return None
+        logger.debug("task_finished", task=self.name, duration_ms=round((time.perf_counter() - start) * 1000, 3))
+        return result
+
+    async def _acquire_lease(self) -> bool:
+        try:
+            self._leased = await run_in_threadpool(acquire_lease, self.name, WORKER_ID, self.lease_duration)
+        except Exception:
+            logger.exception("task_lease_failed", task=self.name)
+            self._leased = False
+        return self._leased
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            if self.exclusive and not await self._acquire_lease():
+                continue
+            await self.run_once()
+
+    def start(self) -> None:
+        """在当前事件循环中启动任务，间隔不大于0或已启动时不做任何操作"""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop(), name=self.name)
+
+    async def stop(self) -> None:
+        """停止任务，正在线程池中运行的任务函数会运行完毕，持有的租约随后释放"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._leased:
+            self._leased = False
+            try:
+                await run_in_threadpool(release_lease, self.name, WORKER_ID)
+            except Exception:
+                logger.exception("task_lease_failed", task=self.name)
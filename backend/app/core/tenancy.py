@@ -0,0 +1,299 @@
+"""
+多租户
+请求通过X-Owner-ID请求头指定所有者，所有查询都只读写该所有者的待办事项。
+默认所有所有者共用一个数据库，表上的索引都以owner_id开头；配置tenant_shard_dir后每个所有者使用单独的SQLite数据库文件，
+一个所有者的读写不会与其他所有者竞争同一个数据库的写锁，单个数据库文件的大小也只与该所有者的数据量有关
+"""
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, ContextManager, Iterator, List, Optional, Set, Tuple
+from urllib.request import pathname2url
+
+from fastapi import Depends, Header, HTTPException
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.database import USE_ASYNC_DB, SessionLocal, connect_session, create_sync_engine, init_db
+from app.models.todo import DEFAULT_OWNER
+
+OWNER_HEADER = "X-Owner-ID"
+
+# 所有者ID同时用作分片数据库的文件名，只允许字母、数字和少量符号，不能以符号开头
+OWNER_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+# 分片数据库文件的扩展名
+SHARD_SUFFIX = ".db"
+
+# 维护任务中分片数据库名称的前缀，之后为所有者ID
+SHARD_PREFIX = "shard:"
+
+
+def get_owner(
+    x_owner_id: Optional[str] = Header(None, description="所有者ID，只能访问该所有者的待办事项")
+) -> str:
+    """
+    获取请求的所有者的依赖函数
+
+    Args:
+        x_owner_id: X-Owner-ID请求头
+
+    Returns:
+        str: 所有者ID，未携带请求头且不要求携带时为default
+
+    Raises:
+        HTTPException: 要求携带请求头但未携带，或所有者ID格式无效时抛出400错误
+    """
+    if x_owner_id is None:
+        if settings.owner_header_required:
+            raise HTTPException(status_code=400, detail=f"缺少请求头{OWNER_HEADER}")
+        return DEFAULT_OWNER
+    if not OWNER_PATTERN.match(x_owner_id):
+        raise HTTPException(status_code=400, detail="无效的所有者ID")
+    return x_owner_id
+
+
+class TenantShards:
+    """
+    按所有者分片的SQLite数据库
+    每个所有者一个数据库文件，第一次访问时创建引擎并建表，之后复用；
+    每个分片的表结构与主库相同，同样包含owner_id列。
+    同时打开的分片数不超过max_open，超过时关闭最久未访问的分片的连接池，再次访问时重新打开；
+    分片使用小连接池和较小的页缓存，不使用内存映射，打开的分片占用的内存有上限
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_open: int = 64):
+        """
+        Args:
+            directory: 分片数据库文件所在的目录，为空表示不分片
+            max_open: 同时打开的分片数上限
+        """
+        self.directory = directory
+        self.max_open = max_open
+        self._factories: "OrderedDict[str, sessionmaker]" = OrderedDict()
+        # 已建表的分片，关闭后重新打开时不再建表
+        self._initialized: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return self.directory is not None
+
+    def url(self, owner_id: str) -> str:
+        """
+        所有者的分片数据库URL
+
+        Args:
+            owner_id: 所有者ID，需符合OWNER_PATTERN
+
+        Returns:
+            str: SQLite数据库URL
+        """
+        return f"sqlite:///{os.path.join(self.directory, owner_id + SHARD_SUFFIX)}"
+
+    def session_factory(self, owner_id: str) -> sessionmaker:
+        """
+        获取所有者的分片会话工厂，分片不存在时创建数据库文件和表
+
+        Args:
+            owner_id: 所有者ID
+
+        Returns:
+            sessionmaker: 绑定到分片数据库的会话工厂
+        """
+        evicted = []
+        with self._lock:
+            factory = self._factories.get(owner_id)
+            if factory is not None:
+                self._factories.move_to_end(owner_id)
+                return factory
+            os.makedirs(self.directory, exist_ok=True)
+            shard_engine = create_sync_engine(
+                self.url(owner_id),
+                pool_size=settings.tenant_shard_pool_size,
+                sqlite_cache_size=settings.tenant_shard_cache_size,
+                sqlite_mmap_size=settings.tenant_shard_mmap_size,
+            )
+            if owner_id not in self._initialized:
+                init_db(shard_engine)
+                self._initialized.add(owner_id)
+            factory = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=shard_engine)
+            self._factories[owner_id] = factory
+            while len(self._factories) > max(1, self.max_open):
+                evicted.append(self._factories.popitem(last=False)[1])
+        # 已借出的连接在归还时关闭，不影响进行中的请求
+        for old in evicted:
+            old.kw["bind"].dispose()
+        return factory
+
+    @contextmanager
+    def maintenance_session(self, owner_id: str) -> Iterator[Session]:
+        """
+        为维护任务创建分片会话
+        分片已打开时使用其连接池，但不改变最近访问的顺序；未打开时使用单独的引擎，会话结束后关闭，
+        维护任务依次处理所有分片时不会把请求正在使用的分片挤出打开的分片
+
+        Args:
+            owner_id: 所有者ID，分片数据库已存在
+
+        Yields:
+            Session: 分片数据库会话
+        """
+        with self._lock:
+            factory = self._factories.get(owner_id)
+        shard_engine = None
+        if factory is None:
+            shard_engine = create_sync_engine(
+                self.url(owner_id),
+                pool_size=1,
+                sqlite_cache_size=settings.tenant_shard_cache_size,
+                sqlite_mmap_size=settings.tenant_shard_mmap_size,
+            )
+            factory = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=shard_engine)
+        try:
+            with factory() as db:
+                yield db
+        finally:
+            if shard_engine is not None:
+                shard_engine.dispose()
+
+    def has_rows(self, owner_id: str, sql: str, *params: Any) -> bool:
+        """
+        用只读的临时连接检查分片中是否有符合条件的记录，不创建引擎，也不改变最近访问的顺序
+        维护任务据此跳过没有需要处理的记录的分片
+
+        Args:
+            owner_id: 所有者ID，分片数据库已存在
+            sql: 查询语句，返回行表示有需要处理的记录
+            params: 查询参数
+
+        Returns:
+            bool: 查询是否返回了行；分片尚未建表时返回False
+        """
+        path = os.path.abspath(os.path.join(self.directory, owner_id + SHARD_SUFFIX))
+        connection = sqlite3.connect(f"file:{pathname2url(path)}?mode=ro", uri=True)
+        try:
+            return connection.execute(sql, params).fetchone() is not None
+        except sqlite3.OperationalError:
+            # 其他进程刚创建数据库文件，还没有建表
+            return False
+        finally:
+            connection.close()
+
+    def owners(self) -> List[str]:
+        """
+        已有分片数据库的所有者，包括其他进程创建的分片
+
+        Returns:
+            List[str]: 按名称排序的所有者ID
+        """
+        if self.directory is None or not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            name[:-len(SHARD_SUFFIX)] for name in os.listdir(self.directory)
+            if name.endswith(SHARD_SUFFIX) and OWNER_PATTERN.match(name[:-len(SHARD_SUFFIX)])
+        )
+
+    def open_count(self) -> int:
+        """
+        当前打开的分片数
+
+        Returns:
+            int: 持有连接池的分片数
+        """
+        return len(self._factories)
+
+    def dispose(self) -> None:
+        """关闭所有分片的连接池，之后再次访问时重新创建"""
+        with self._lock:
+            factories, self._factories = self._factories, OrderedDict()
+            self._initialized.clear()
+        for factory in factories.values():
+            factory.kw["bind"].dispose()
+
+
+def owner_session(owner_id: str) -> Session:
+    """
+    为所有者创建数据库会话
+
+    Args:
+        owner_id: 所有者ID
+
+    Returns:
+        Session: 启用分片时为所有者的分片数据库会话，否则为主库会话
+    """
+    if tenant_shards:
+        return tenant_shards.session_factory(owner_id)()
+    return SessionLocal()
+
+
+def get_owner_db(owner_id: str = Depends(get_owner)) -> Iterator[Session]:
+    """
+    获取所有者数据库会话的依赖函数
+    未启用分片时与get_db相同
+    """
+    db = owner_session(owner_id)
+    try:
+        connect_session(db)
+        yield db
+    finally:
+        db.close()
+
+
+def database_sessions() -> List[Tuple[str, Callable[[], ContextManager[Session]]]]:
+    """
+    所有数据库的会话工厂，用于需要处理每个数据库的维护任务
+    分片的会话通过maintenance_session创建，调用会话工厂时才连接数据库
+
+    Returns:
+        List[Tuple[str, Callable[[], ContextManager[Session]]]]: 按名称排序的(数据库名称, 会话工厂)列表，
+            主库名称为primary，分片名称为shard:<所有者ID>
+    """
+    databases: List[Tuple[str, Callable[[], ContextManager[Session]]]] = [("primary", SessionLocal)]
+    for owner_id in tenant_shards.owners():
+        databases.append((f"{SHARD_PREFIX}{owner_id}", partial(tenant_shards.maintenance_session, owner_id)))
+    return databases
+
+
+class OwnerVaryMiddleware:
+    """
+    所有者缓存区分中间件
+    待办事项接口的GET/HEAD响应内容取决于X-Owner-ID请求头，响应中加上Vary: X-Owner-ID，
+    避免共享缓存把一个所有者的响应（包括304）返回给另一个所有者
+    """
+
+    def __init__(self, app: ASGIApp, path_prefix: str):
+        """
+        Args:
+            app: ASGI应用
+            path_prefix: 需要添加Vary响应头的路径前缀
+        """
+        self.app = app
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in ("GET", "HEAD")
+            or not scope["path"].startswith(self.path_prefix)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_vary(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"vary", OWNER_HEADER.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_vary)
+
+
+# 全局分片集合，未配置tenant_shard_dir时不分片
+# 异步数据库模式下路由使用异步会话，不创建分片引擎
+tenant_shards = TenantShards(None if USE_ASYNC_DB else settings.tenant_shard_dir, settings.tenant_shard_max_open)
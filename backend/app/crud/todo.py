@@ -1,50 +1,225 @@
 """
 待办事项CRUD操作
 """
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import List, Optional
-from app.models.todo import Todo
-from app.schemas.todo import TodoCreate, TodoUpdate
+from sqlalchemy import (
+    DateTime,
+    Float,
+    and_,
+    cast,
+    delete,
+    func,
+    insert,
+    literal,
+    literal_column,
+    or_,
+    select,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.dialects.postgresql import TSQUERY
+from sqlalchemy.engine import Row
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from app.core.cache import todo_cache
+from app.core.config import settings
+from app.core.database import USE_ASYNC_DB, SessionLocal
+from app.core.events import todo_events
+from app.core.group_commit import GroupCommitWriter
+from app.models.todo import (
+    DEFAULT_OWNER,
+    IMPORT_PENDING_VERSION,
+    SEARCH_DOCUMENT,
+    Todo,
+    TodoOwnerCounts,
+    TodoTombstone,
+    fts_owner_key,
+    todo_deleted,
+    todo_modified_at,
+    todo_not_deleted,
+    todos_change_version,
+    todos_fts,
+    todos_soft_delete,
+)
+from app.schemas.todo import TodoBatchUpdate, TodoCreate, TodoUpdate, todo_row_adapter
+
+
+# 列表支持的排序字段及对应的排序表达式，每个排序都有以(排序值, id)结尾的索引
+SORT_KEYS = {
+    "id": Todo.id,
+    "created_at": Todo.created_at,
+    "updated_at": todo_modified_at,
+    "title": Todo.title,
+}
+
+# 游标中时间值的绑定类型。SQLite中func.now()写入的时间为不含微秒的文本，
+# 按相同格式绑定才能与列值精确比较，默认格式会附加".000000"
+CURSOR_DATETIME = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
+
+# 单次搜索最多使用的搜索词数量
+SEARCH_MAX_TERMS = 16
+
+# trigram分词器能够检索的最短搜索词长度
+FTS_MIN_TERM_LENGTH = 3
 
 
 class TodoCRUD:
     """
     待办事项CRUD操作类
     提供创建、读取、更新、删除待办事项的方法
+    所有方法只读写owner_id所有者的记录，其他所有者的记录如同不存在
+    所有写操作在提交后使读缓存失效
     """
     
-    def create_todo(self, db: Session, todo: TodoCreate) -> Todo:
+    def create_todo(self, db: Session, todo: TodoCreate, owner_id: str = DEFAULT_OWNER) -> Todo:
         """
         创建新的待办事项
         
         Args:
             db: 数据库会话
             todo: 待创建的待办事项数据
+            owner_id: 所有者
             
         Returns:
             Todo: 创建成功的待办事项对象
         """
-        db_todo = Todo(**todo.dict())
+        # INSERT通过RETURNING直接取回ID和创建时间，无需再refresh；
+        # 新建时显式设置updated_at为None，避免访问该属性时再次查询
+        db_todo = Todo(**todo.model_dump(), owner_id=owner_id, updated_at=None)
         db.add(db_todo)
         db.commit()
-        db.refresh(db_todo)
+        todo_cache.invalidate(owner_id)
+        todo_events.notify(owner_id)
         return db_todo
     
-    def get_todo(self, db: Session, todo_id: int) -> Optional[Todo]:
+    def get_todo(self, db: Session, todo_id: int, owner_id: str = DEFAULT_OWNER) -> Optional[Todo]:
         """
         获取单个待办事项
         
         Args:
             db: 数据库会话
             todo_id: 待办事项ID
+            owner_id: 所有者
+            
+        Returns:
+            Optional[Todo]: 找到的待办事项对象，未找到或属于其他所有者则返回None
+        """
+        return db.query(Todo).filter(Todo.id == todo_id, Todo.owner_id == owner_id, todo_not_deleted).first()
+    
+    def _after(self, sort: str, descending: bool, after_id: int, after_value: Any):
+        """
+        生成键集分页的游标条件
+        
+        Args:
+            sort: 排序字段
+            descending: 是否降序
+            after_id: 上一页最后一条记录的ID
+            after_value: 上一页最后一条记录的排序值，按id排序时不使用
+            
+        Returns:
+            游标之后的记录的过滤条件
+        """
+        if sort == "id":
+            return Todo.id < after_id if descending else Todo.id > after_id
+        key = SORT_KEYS[sort]
+        value = literal(after_value, CURSOR_DATETIME if isinstance(key.type, DateTime) else key.type)
+        position, cursor = tuple_(key, Todo.id), tuple_(value, literal(after_id))
+        # 行值比较确定游标之后的位置，单独的范围条件使SQLite能够在表达式索引上直接定位
+        if descending:
+            return and_(key <= value, position < cursor)
+        return and_(key >= value, position > cursor)
+    
+    def _page(
+        self,
+        query,
+        skip: int,
+        limit: int,
+        after_id: Optional[int],
+        sort: str = "id",
+        descending: bool = False,
+        after_value: Any = None,
+    ):
+        """
+        排序并限定分页范围
+        按排序字段和ID排序，排序值相同时顺序仍然确定；
+        提供after_id时使用键集分页（WHERE (排序值, id) > (游标值, 游标ID)），无需扫描并丢弃前面的记录
+        
+        Args:
+            query: 待分页的查询，可以是ORM查询或select语句
+            skip: 跳过的记录数
+            limit: 返回的记录数限制
+            after_id: 游标位置，返回排在该记录之后的记录
+            sort: 排序字段，SORT_KEYS中的键
+            descending: 是否降序
+            after_value: 游标位置记录的排序值，按id排序时不使用
+            
+        Returns:
+            与query类型相同的分页查询
+        """
+        if after_id is not None:
+            query = query.filter(self._after(sort, descending, after_id, after_value))
+        order = [Todo.id] if sort == "id" else [SORT_KEYS[sort], Todo.id]
+        if descending:
+            order = [column.desc() for column in order]
+        return query.order_by(*order).offset(skip).limit(limit)
+    
+    def _paginate(
+        self,
+        query,
+        skip: int,
+        limit: int,
+        after_id: Optional[int],
+        sort: str = "id",
+        descending: bool = False,
+        after_value: Any = None,
+    ) -> List[Todo]:
+        """
+        排序并分页，参数与_page相同
             
         Returns:
-            Optional[Todo]: 找到的待办事项对象，未找到则返回None
+            List[Todo]: 当前页的待办事项列表
         """
-        return db.query(Todo).filter(Todo.id == todo_id).first()
+        return self._page(query, skip, limit, after_id, sort, descending, after_value).all()
     
-    def get_todos(self, db: Session, skip: int = 0, limit: int = 100) -> List[Todo]:
+    def _rows_statement(
+        self,
+        completed: Optional[bool],
+        skip: int,
+        limit: int,
+        after_id: Optional[int],
+        sort: str,
+        descending: bool,
+        after_value: Any,
+        owner_id: str,
+    ):
+        """
+        构造列表轻量记录的查询语句，同步和异步CRUD共用，参数与get_todo_rows相同
+        
+        Returns:
+            Select: 只查询列值的分页语句
+        """
+        statement = select(*Todo.__table__.c).where(Todo.owner_id == owner_id, todo_not_deleted)
+        if completed is not None:
+            statement = statement.where(Todo.completed == completed)
+        return self._page(statement, skip, limit, after_id, sort, descending, after_value)
+    
+    def get_todos(
+        self,
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        sort: str = "id",
+        descending: bool = False,
+        after_value: Any = None,
+        owner_id: str = DEFAULT_OWNER,
+    ) -> List[Todo]:
         """
         获取待办事项列表
         
@@ -52,13 +227,29 @@ class TodoCRUD:
             db: 数据库会话
             skip: 跳过的记录数，用于分页
             limit: 返回的记录数限制
+            after_id: 键集分页游标，只返回排在该记录之后的记录
+            sort: 排序字段：id、created_at、updated_at、title
+            descending: 是否降序
+            after_value: 游标位置记录的排序值
+            owner_id: 所有者
             
         Returns:
             List[Todo]: 待办事项列表
         """
-        return db.query(Todo).offset(skip).limit(limit).all()
+        query = db.query(Todo).filter(Todo.owner_id == owner_id, todo_not_deleted)
+        return self._paginate(query, skip, limit, after_id, sort, descending, after_value)
     
-    def get_active_todos(self, db: Session, skip: int = 0, limit: int = 100) -> List[Todo]:
+    def get_active_todos(
+        self,
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        sort: str = "id",
+        descending: bool = False,
+        after_value: Any = None,
+        owner_id: str = DEFAULT_OWNER,
+    ) -> List[Todo]:
         """
         获取未完成的待办事项
         
@@ -66,13 +257,29 @@ class TodoCRUD:
             db: 数据库会话
             skip: 跳过的记录数，用于分页
             limit: 返回的记录数限制
+            after_id: 键集分页游标，只返回排在该记录之后的记录
+            sort: 排序字段：id、created_at、updated_at、title
+            descending: 是否降序
+            after_value: 游标位置记录的排序值
+            owner_id: 所有者
             
         Returns:
             List[Todo]: 未完成的待办事项列表
         """
-        return db.query(Todo).filter(Todo.completed == False).offset(skip).limit(limit).all()
+        query = db.query(Todo).filter(Todo.owner_id == owner_id, Todo.completed == False, todo_not_deleted)
+        return self._paginate(query, skip, limit, after_id, sort, descending, after_value)
     
-    def get_completed_todos(self, db: Session, skip: int = 0, limit: int = 100) -> List[Todo]:
+    def get_completed_todos(
+        self,
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        sort: str = "id",
+        descending: bool = False,
+        after_value: Any = None,
+        owner_id: str = DEFAULT_OWNER,
+    ) -> List[Todo]:
         """
         获取已完成的待办事项
         
@@ -80,13 +287,508 @@ class TodoCRUD:
             db: 数据库会话
             skip: 跳过的记录数，用于分页
             limit: 返回的记录数限制
+            after_id: 键集分页游标，只返回排在该记录之后的记录
+            sort: 排序字段：id、created_at、updated_at、title
+            descending: 是否降序
+            after_value: 游标位置记录的排序值
+            owner_id: 所有者
             
         Returns:
             List[Todo]: 已完成的待办事项列表
         """
-        return db.query(Todo).filter(Todo.completed == True).offset(skip).limit(limit).all()
+        query = db.query(Todo).filter(Todo.owner_id == owner_id, Todo.completed == True, todo_not_deleted)
+        return self._paginate(query, skip, limit, after_id, sort, descending, after_value)
+    
+    def get_todo_rows(
+        self,
+        db: Session,
+        completed: Optional[bool] = None,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        sort: str = "id",
+        descending: bool = False,
+        after_value: Any = None,
+        owner_id: str = DEFAULT_OWNER,
+    ) -> List[dict]:
+        """
+        获取待办事项列表的轻量记录
+        只查询列值，不创建ORM对象，也不加入会话的标识映射，用于列表接口直接序列化
+        
+        Args:
+            db: 数据库会话
+            completed: 完成状态筛选，None表示不筛选
+            skip: 跳过的记录数，用于分页
+            limit: 返回的记录数限制
+            after_id: 键集分页游标，只返回排在该记录之后的记录
+            sort: 排序字段：id、created_at、updated_at、title
+            descending: 是否降序
+            after_value: 游标位置记录的排序值
+            owner_id: 所有者
+        
+        Returns:
+            List[dict]: 以列名为键的记录列表
+        """
+        statement = self._rows_statement(completed, skip, limit, after_id, sort, descending, after_value, owner_id)
+        return [row._asdict() for row in db.execute(statement)]
+    
+    def _sqlite_search(self, terms: List[str], owner_id: str):
+        """
+        构造SQLite的搜索语句
+        FTS5索引同时匹配所有者和不少于三个字符的搜索词，按bm25排序，只读取该所有者的索引记录；
+        更短的搜索词无法使用trigram索引，改为在该所有者的匹配结果上做LIKE过滤，
+        只有短搜索词时过滤该所有者的全部记录，耗时与该所有者的记录数有关
+        
+        Args:
+            terms: 搜索词列表
+            owner_id: 所有者
+        
+        Returns:
+            tuple: 搜索语句和相关度分数表达式（越小越相关）
+        """
+        def quote(value: str) -> str:
+            # 作为带引号的字符串，不解析FTS5查询语法
+            return '"' + value.replace('"', '""') + '"'
+        
+        # 搜索词只匹配标题和描述，多个词之间为AND
+        match = " ".join(
+            [f"owner_key : {quote(fts_owner_key(owner_id))}"]
+            + ["{title description} : " + quote(term) for term in terms if len(term) >= FTS_MIN_TERM_LENGTH]
+        )
+        score = todos_fts.c.rank
+        statement = (
+            select(*Todo.__table__.c, score.label("score"))
+            .select_from(todos_fts.join(Todo.__table__, Todo.id == todos_fts.c.rowid))
+            .where(literal_column("todos_fts").op("MATCH")(match))
+        )
+        for term in terms:
+            if len(term) >= FTS_MIN_TERM_LENGTH:
+                continue
+            pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            statement = statement.where(
+                or_(Todo.title.like(pattern, escape="\\"), Todo.description.like(pattern, escape="\\"))
+            )
+        return statement, score
+    
+    def _postgresql_search(self, terms: List[str], owner_id: str):
+        """
+        构造PostgreSQL的搜索语句
+        使用与GIN索引相同的tsvector表达式匹配，同时匹配权重A的所有者词素，只读取该所有者的索引记录；
+        每个搜索词按前缀匹配权重D的标题和描述词素，按ts_rank排序
+        
+        Args:
+            terms: 搜索词列表
+            owner_id: 所有者
+        
+        Returns:
+            tuple: 搜索语句和相关度分数表达式（越小越相关）
+        """
+        document = literal_column(SEARCH_DOCUMENT)
+        # 每个搜索词作为带引号的词素并加上前缀匹配标记，不解析tsquery语法
+        query = " & ".join("'" + term.replace("\\", "\\\\").replace("'", "''") + "':*D" for term in terms)
+        # 所有者词素不经分词和大小写转换，与文档中的词素完全一致
+        owner = cast("'" + owner_id + "':A", TSQUERY)
+        tsquery = func.to_tsquery(literal_column("'simple'"), query).op("&&")(owner)
+        # ts_rank返回单精度浮点数，转换为双精度后游标中的分数可以精确比较
+        score = -cast(func.ts_rank(document, tsquery), Float)
+        statement = select(*Todo.__table__.c, score.label("score")).where(document.op("@@")(tsquery))
+        return statement, score
+    
+    def _search_statement(
+        self,
+        dialect: str,
+        query: str,
+        completed: Optional[bool],
+        limit: int,
+        after: Optional[Tuple[float, int]],
+        owner_id: str,
+    ):
+        """
+        构造搜索语句，同步和异步CRUD共用，参数与search_todo_rows相同
+        
+        Args:
+            dialect: 数据库方言名称
+        
+        Returns:
+            Optional[Select]: 搜索语句，没有搜索词时返回None
+        """
+        terms = list(dict.fromkeys(query.split()))[:SEARCH_MAX_TERMS]
+        if not terms:
+            return None
+        if dialect == "postgresql":
+            statement, score = self._postgresql_search(terms, owner_id)
+        else:
+            statement, score = self._sqlite_search(terms, owner_id)
+        statement = statement.where(Todo.owner_id == owner_id, todo_not_deleted)
+        if completed is not None:
+            statement = statement.where(Todo.completed == completed)
+        if after is not None:
+            after_score, after_id = after
+            statement = statement.where(or_(score > after_score, and_(score == after_score, Todo.id > after_id)))
+        return statement.order_by(score, Todo.id).limit(limit)
+    
+    def search_todo_rows(
+        self,
+        db: Session,
+        query: str,
+        completed: Optional[bool] = None,
+        limit: int = 100,
+        after: Optional[Tuple[float, int]] = None,
+        owner_id: str = DEFAULT_OWNER,
+    ) -> List[dict]:
+        """
+        全文搜索待办事项的标题和描述
+        查询按空白拆分为搜索词，记录需要匹配全部搜索词，结果按相关度和ID排序。
+        SQLite使用FTS5索引匹配子串，PostgreSQL使用tsvector的GIN索引匹配词前缀；
+        全文索引中包含所有者，匹配时只读取该所有者的索引记录，耗时与其他所有者的数据量无关
+        
+        Args:
+            db: 数据库会话
+            query: 搜索内容
+            completed: 完成状态筛选，None表示不筛选
+            limit: 返回的记录数限制
+            after: 键集分页游标，上一页最后一条记录的(相关度分数, ID)
+            owner_id: 所有者
+        
+        Returns:
+            List[dict]: 以列名为键的记录列表，score为相关度分数，越小越相关
+        """
+        statement = self._search_statement(
+            db.get_bind().dialect.name, query, completed, limit, after, owner_id
+        )
+        if statement is None:
+            return []
+        return [row._asdict() for row in db.execute(statement)]
+    
+    def iter_todo_batches(
+        self,
+        db: Session,
+        completed: Optional[bool] = None,
+        batch_size: int = 1000,
+        owner_id: str = DEFAULT_OWNER,
+    ) -> Iterator[List[dict]]:
+        """
+        按ID顺序分批遍历待办事项
+        使用yield_per流式读取结果（PostgreSQL下为服务端游标），任意时刻只有一批记录在内存中
+        
+        Args:
+            db: 数据库会话
+            completed: 完成状态筛选，None表示不筛选
+            batch_size: 每批的记录数
+            owner_id: 所有者
+        
+        Yields:
+            List[dict]: 一批以列名为键的记录
+        """
+        statement = (
+            select(*Todo.__table__.c).where(Todo.owner_id == owner_id, todo_not_deleted).order_by(Todo.id)
+        )
+        if completed is not None:
+            statement = statement.where(Todo.completed == completed)
+        result = db.execute(statement.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            yield [row._asdict() for row in partition]
+    
+    def get_version(self, db: Session, owner_id: str = DEFAULT_OWNER) -> int:
+        """
+        获取所有者的待办事项数据版本号
+        该所有者的待办事项每次写入时由触发器递增，用于生成列表的ETag
+        
+        Args:
+            db: 数据库会话
+            owner_id: 所有者
+            
+        Returns:
+            int: 当前数据版本号，所有者还没有写入过时为0
+        """
+        return db.scalar(select(TodoOwnerCounts.version).where(TodoOwnerCounts.owner_id == owner_id)) or 0
+    
+    def get_versions(self, db: Session, owner_ids: List[str]) -> Dict[str, int]:
+        """
+        在一次查询中获取多个所有者的数据版本号，用于事件流的中继任务
+        
+        Args:
+            db: 数据库会话
+            owner_ids: 所有者列表
+            
+        Returns:
+            Dict[str, int]: 所有者到数据版本号的映射，还没有写入过的所有者不包含在内
+        """
+        return dict(db.execute(
+            select(TodoOwnerCounts.owner_id, TodoOwnerCounts.version).where(TodoOwnerCounts.owner_id.in_(owner_ids))
+        ).all())
+    
+    def get_stats(self, db: Session, owner_id: str = DEFAULT_OWNER) -> Dict[str, int]:
+        """
+        获取待办事项计数
+        读取触发器维护的所有者计数行，耗时与数据量无关
+        
+        Args:
+            db: 数据库会话
+            owner_id: 所有者
+            
+        Returns:
+            Dict[str, int]: 总数total、未完成数active和已完成数completed
+        """
+        row = db.execute(
+            select(TodoOwnerCounts.total_count, TodoOwnerCounts.completed_count)
+            .where(TodoOwnerCounts.owner_id == owner_id)
+        ).first()
+        total, completed = row if row is not None else (0, 0)
+        return {"total": total, "active": total - completed, "completed": completed}
+    
+    def get_changes(
+        self, db: Session, since: int = 0, owner_id: str = DEFAULT_OWNER, limit: int = 1000
+    ) -> Optional[Dict[str, Any]]:
+        """
+        获取指定版本之后的变更
+        通过变更版本号和删除记录上的索引查询，耗时与返回的变更数量有关，与数据总量无关。
+        since为0时返回全部记录，作为增量同步的起点。版本号按所有者分别递增。
+        变更超过limit条时按版本号分页，同一版本号的变更（如同一批导入的记录）不会被拆到两页
+        
+        Args:
+            db: 数据库会话
+            since: 客户端上次同步到的数据版本号
+            owner_id: 所有者
+            limit: 本页最多返回的变更数，todos和deleted合计
+            
+        Returns:
+            Optional[Dict[str, Any]]: 本页同步到的版本号version、变更后的记录todos（以列名为键）、
+                已删除的ID列表deleted和是否还有后续变更has_more；所需的删除记录已被清理或版本号无效时返回None
+        """
+        version = self.get_version(db, owner_id)
+        if since > version:
+            return None
+        # 两个来源各取limit + 1条，合并后的前limit + 1条一定在其中
+        changes = self._change_page(db, owner_id, since, limit + 1)
+        if since:
+            # 查询删除记录之后再检查清理位置，查询期间发生的清理也能被发现
+            compacted = db.scalar(
+                select(TodoOwnerCounts.compacted_version).where(TodoOwnerCounts.owner_id == owner_id)
+            ) or 0
+            if since < compacted:
+                return None
+        has_more = len(changes) > limit
+        if has_more:
+            last = changes[limit - 1][0]
+            if changes[limit][0] == last:
+                # 下一条与本页最后一条属于同一版本，该版本的变更整体移到下一页；
+                # 单个版本的变更多于limit条时只能整体返回该版本
+                changes = [change for change in changes[:limit] if change[0] < last]
+                if not changes:
+                    changes = self._change_page(db, owner_id, since, None, at=last)
+                    has_more = bool(self._change_page(db, owner_id, last, 1))
+            else:
+                changes = changes[:limit]
+            version = changes[-1][0]
+        elif changes:
+            # 读取版本号之后提交的写入也可能包含在结果中
+            version = max(version, changes[-1][0])
+        return {
+            "version": version,
+            "todos": [change[2] for change in changes if change[1] == 0],
+            "deleted": [change[2] for change in changes if change[1] == 1],
+            "has_more": has_more,
+        }
+    
+    def get_change_events(
+        self, db: Session, since: int, owner_id: str = DEFAULT_OWNER, limit: int = 100
+    ) -> Tuple[int, Optional[List[Tuple[int, str, Any]]]]:
+        """
+        获取指定版本之后的变更事件，用于事件流的推送和断线重连后的补发
+        与get_changes使用相同的变更记录，每条变更对应一条事件；从未更新过的记录为created，其余为updated
+        
+        Args:
+            db: 数据库会话
+            since: 已推送到的数据版本号
+            owner_id: 所有者
+            limit: 最多返回的事件数
+            
+        Returns:
+            Tuple[int, Optional[List[Tuple[int, str, Any]]]]: 当前数据版本号和按版本号排序的
+                (变更版本号, 事件类型, 数据)列表，created/updated的数据为JSON编码的待办事项，deleted的数据为{"id": ID}；
+                所需的删除记录已被清理、版本号无效或变更多于limit条时列表为None，客户端应重新获取列表
+        """
+        version = self.get_version(db, owner_id)
+        if since >= version:
+            return version, ([] if since == version else None)
+        changes = self._change_page(db, owner_id, since, limit + 1)
+        compacted = db.scalar(
+            select(TodoOwnerCounts.compacted_version).where(TodoOwnerCounts.owner_id == owner_id)
+        ) or 0
+        if since < compacted or len(changes) > limit:
+            return version, None
+        events = [
+            (change_version, "deleted", {"id": content})
+            if kind == 1
+            else (
+                change_version,
+                "created" if content["updated_at"] is None else "updated",
+                todo_row_adapter.dump_json(content).decode(),
+            )
+            for change_version, kind, content in changes
+        ]
+        return version, events
+    
+    def _change_page(
+        self, db: Session, owner_id: str, since: int, limit: Optional[int], at: Optional[int] = None
+    ) -> List[Tuple[int, int, Any]]:
+        """
+        按变更版本号顺序查询所有者的变更记录和删除记录
+        
+        Args:
+            db: 数据库会话
+            owner_id: 所有者
+            since: 只查询该版本之后的变更，为0时不查询删除记录
+            limit: 每个来源最多查询的记录数，为空表示不限制
+            at: 只查询该版本号的变更
+            
+        Returns:
+            List[Tuple[int, int, Any]]: 按(变更版本号, 类型)排序的(变更版本号, 类型, 内容)列表，
+                类型0为变更后的记录（以列名为键），类型1为已删除的ID
+        """
+        def versions(column):
+            return column == at if at is not None else column > since
+        
+        changes = [
+            (row.change_version, 0, row._asdict())
+            for row in db.execute(
+                select(*Todo.__table__.c)
+                .where(Todo.owner_id == owner_id, todo_not_deleted, versions(Todo.change_version))
+                .order_by(Todo.change_version, Todo.id)
+                .limit(limit)
+            )
+        ]
+        if since:
+            changes.extend(
+                (change_version, 1, todo_id)
+                for change_version, todo_id in db.execute(
+                    select(TodoTombstone.change_version, TodoTombstone.id)
+                    .where(TodoTombstone.owner_id == owner_id, versions(TodoTombstone.change_version))
+                    .order_by(TodoTombstone.change_version, TodoTombstone.id)
+                    .limit(limit)
+                )
+            )
+            changes.sort(key=lambda change: change[:2])
+        return changes
+    
+    def compact_tombstones(self, db: Session, before: datetime) -> int:
+        """
+        清理过期的删除记录
+        每个所有者清理到的最大变更版本号记录在其计数行中，早于该版本的客户端需要重新获取完整列表
+        
+        Args:
+            db: 数据库会话
+            before: 清理在该时间之前删除的记录
+            
+        Returns:
+            int: 清理的删除记录数
+        """
+        expired = db.execute(
+            select(TodoTombstone.owner_id, func.max(TodoTombstone.change_version))
+            .where(TodoTombstone.deleted_at < literal(before, CURSOR_DATETIME))
+            .group_by(TodoTombstone.owner_id)
+        ).all()
+        count = 0
+        for owner_id, purged in expired:
+            db.execute(
+                update(TodoOwnerCounts)
+                .where(TodoOwnerCounts.owner_id == owner_id, TodoOwnerCounts.compacted_version < purged)
+                .values(compacted_version=purged)
+            )
+            count += db.execute(
+                delete(TodoTombstone)
+                .where(TodoTombstone.owner_id == owner_id, TodoTombstone.change_version <= purged)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        db.commit()
+        return count
+    
+    def reconcile_owner_counts(self, db: Session) -> List[str]:
+        """
+        按所有者重新统计待办事项数并修正所有者计数行
+        计数由触发器维护，只有绕过触发器修改数据（如手工导入数据库文件）时才会偏差。
+        先锁定计数表再统计：统计期间其他事务的触发器需要等待该锁，
+        其写入要么已包含在统计结果中，要么在修正之后再累加，不会被覆盖
+        
+        Args:
+            db: 数据库会话
+            
+        Returns:
+            List[str]: 计数有偏差并已修正的所有者
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            # 表锁同时阻止新所有者插入计数行，只允许读取
+            db.execute(text("LOCK TABLE todo_owner_counts IN EXCLUSIVE MODE"))
+        else:
+            # 空更新取得数据库写锁，不改变计数和版本号
+            db.execute(update(TodoOwnerCounts).values(version=TodoOwnerCounts.version))
+        actual = {
+            owner_id: (total, completed)
+            for owner_id, total, completed in db.execute(
+                select(Todo.owner_id, func.count(), func.count().filter(Todo.completed == True))
+                .where(todo_not_deleted)
+                .group_by(Todo.owner_id)
+            )
+        }
+        stored = {
+            owner_id: (total, completed)
+            for owner_id, total, completed in db.execute(
+                select(TodoOwnerCounts.owner_id, TodoOwnerCounts.total_count, TodoOwnerCounts.completed_count)
+            )
+        }
+        drifted = sorted(
+            owner_id for owner_id in actual.keys() | stored.keys()
+            if actual.get(owner_id, (0, 0)) != stored.get(owner_id, (0, 0))
+        )
+        for owner_id in drifted:
+            total, completed = actual.get(owner_id, (0, 0))
+            db.merge(TodoOwnerCounts(owner_id=owner_id, total_count=total, completed_count=completed))
+        db.commit()
+        return drifted
+    
+    def _unchanged_since(self, expected: Todo) -> list:
+        """
+        生成"记录内容与读取时一致"的条件，用于条件更新/删除
+        时间戳在SQLite中以文本存储，与绑定参数的格式不一致，因此只比较内容字段
+        
+        Args:
+            expected: 之前读取到的待办事项对象
+            
+        Returns:
+            list: WHERE条件列表
+        """
+        return [
+            Todo.title == expected.title,
+            Todo.description.is_not_distinct_from(expected.description),
+            Todo.completed.is_not_distinct_from(expected.completed),
+        ]
     
-    def update_todo(self, db: Session, todo_id: int, todo: TodoUpdate) -> Optional[Todo]:
+    def _write_conditions(self, todo_id: int, owner_id: str, expected: Optional[Todo]) -> list:
+        """
+        生成单条记录写操作的条件，同步和异步CRUD共用
+        
+        Args:
+            todo_id: 待办事项ID
+            owner_id: 所有者
+            expected: 之前读取到的待办事项，提供时只有记录未被其他请求修改才满足条件
+            
+        Returns:
+            list: WHERE条件列表
+        """
+        conditions = [Todo.id == todo_id, Todo.owner_id == owner_id, todo_not_deleted]
+        if expected is not None:
+            conditions += self._unchanged_since(expected)
+        return conditions
+    
+    def update_todo(
+        self,
+        db: Session,
+        todo_id: int,
+        todo: TodoUpdate,
+        expected: Optional[Todo] = None,
+        owner_id: str = DEFAULT_OWNER,
+    ) -> Optional[Todo]:
         """
         更新待办事项
         
@@ -94,67 +796,544 @@ class TodoCRUD:
             db: 数据库会话
             todo_id: 待办事项ID
             todo: 更新的待办事项数据
+            expected: 之前读取到的待办事项，提供时只有记录未被其他请求修改才更新
+            owner_id: 所有者
             
         Returns:
-            Optional[Todo]: 更新后的待办事项对象，未找到则返回None
+            Optional[Todo]: 更新后的待办事项对象，未找到或已被修改则返回None
         """
-        db_todo = db.query(Todo).filter(Todo.id == todo_id).first()
-        if db_todo:
-            update_data = todo.dict(exclude_unset=True)
-            for key, value in update_data.items():
-                setattr(db_todo, key, value)
-            db.commit()
-            db.refresh(db_todo)
+        update_data = todo.model_dump(exclude_unset=True)
+        if not update_data:
+            return self.get_todo(db, todo_id=todo_id, owner_id=owner_id)
+        conditions = self._write_conditions(todo_id, owner_id, expected)
+        # 单条UPDATE ... RETURNING语句完成更新并取回更新后的记录，
+        # populate_existing使会话中已有的同一对象（包括自动更新的updated_at）被返回的数据覆盖
+        statement = update(Todo).where(*conditions).values(**update_data).returning(Todo)
+        db_todo = db.scalars(
+            select(Todo).from_statement(statement).execution_options(populate_existing=True)
+        ).first()
+        db.commit()
+        todo_cache.invalidate(owner_id)
+        todo_events.notify(owner_id)
         return db_todo
     
-    def delete_todo(self, db: Session, todo_id: int) -> bool:
+    def set_completed_batch(
+        self, db: Session, changes: List[Tuple[int, bool, Optional[Todo], str]]
+    ) -> List[Optional[Row]]:
+        """
+        在一个事务中依次修改多个待办事项的完成状态，由合并提交写入器调用
+        按顺序逐条执行UPDATE ... RETURNING，每条语句都能看到之前语句的结果，
+        每项的结果与逐个调用update_todo时相同，但整批只提交一次
+        
+        Args:
+            db: 数据库会话
+            changes: (待办事项ID, 完成状态, 之前读取到的待办事项, 所有者)列表，第三项提供时只有记录未被修改才更新
+            
+        Returns:
+            List[Optional[Row]]: 与输入一一对应的更新后记录，未找到或已被修改的为None
+        """
+        rows = []
+        for todo_id, completed, expected, owner_id in changes:
+            conditions = self._write_conditions(todo_id, owner_id, expected)
+            # 返回的是查询结果行而不是ORM对象，同一批中多次修改同一记录时各自的结果互不覆盖
+            rows.append(db.execute(
+                update(Todo)
+                .where(*conditions)
+                .values(completed=completed)
+                .returning(*Todo.__table__.c)
+                .execution_options(synchronize_session=False)
+            ).first())
+        db.commit()
+        for owner_id in {change[3] for change in changes}:
+            todo_cache.invalidate(owner_id)
+            todo_events.notify(owner_id)
+        return rows
+    
+    def delete_todo(
+        self, db: Session, todo_id: int, expected: Optional[Todo] = None, owner_id: str = DEFAULT_OWNER
+    ) -> bool:
         """
         删除待办事项
         
         Args:
             db: 数据库会话
             todo_id: 待办事项ID
+            expected: 之前读取到的待办事项，提供时只有记录未被其他请求修改才删除
+            owner_id: 所有者
             
         Returns:
-            bool: 删除成功返回True，未找到返回False
+            bool: 删除成功返回True，未找到或已被修改返回False
         """
-        db_todo = db.query(Todo).filter(Todo.id == todo_id).first()
-        if db_todo:
-            db.delete(db_todo)
-            db.commit()
-            return True
-        return False
+        conditions = self._write_conditions(todo_id, owner_id, expected)
+        result = db.execute(
+            delete(Todo)
+            .where(*conditions)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        todo_cache.invalidate(owner_id)
+        todo_events.notify(owner_id)
+        return result.rowcount > 0
+    
+    def create_todos(self, db: Session, todos: List[TodoCreate], owner_id: str = DEFAULT_OWNER) -> List[Row]:
+        """
+        批量创建待办事项
+        使用一条多行INSERT ... RETURNING语句插入，整批在同一个事务中提交
+        
+        Args:
+            db: 数据库会话
+            todos: 待创建的待办事项数据列表
+            owner_id: 所有者
+            
+        Returns:
+            List[Row]: 创建成功的待办事项记录，顺序与输入一致
+        """
+        if not todos:
+            return []
+        rows = db.execute(
+            insert(Todo).returning(*Todo.__table__.c),
+            [{**todo.model_dump(), "owner_id": owner_id} for todo in todos],
+        ).all()
+        db.commit()
+        todo_cache.invalidate(owner_id)
+        todo_events.notify(owner_id)
+        # 同一条语句中自增ID按插入顺序分配，按ID排序即可与输入顺序对应
+        return sorted(rows, key=lambda row: row.id)
+    
+    def import_todos(self, db: Session, todos: List[TodoCreate], owner_id: str = DEFAULT_OWNER) -> int:
+        """
+        导入一批待办事项
+        不取回插入的记录，使用executemany执行INSERT，整批在同一个事务中提交。
+        SQLite的触发器逐行维护版本号、计数、删除记录和全文索引，开销数倍于插入本身，
+        因此导入的记录以IMPORT_PENDING_VERSION插入以跳过这些触发器，由_finish_import对整批一次性维护
+        
+        Args:
+            db: 数据库会话
+            todos: 待导入的待办事项数据列表
+            owner_id: 所有者
+            
+        Returns:
+            int: 导入的记录数
+        """
+        if not todos:
+            return 0
+        rows = [{**todo.model_dump(), "owner_id": owner_id} for todo in todos]
+        if db.get_bind().dialect.name == "sqlite":
+            for row in rows:
+                row["change_version"] = IMPORT_PENDING_VERSION
+            db.execute(insert(Todo.__table__), rows)
+            self._finish_import(db, owner_id, len(rows), sum(1 for row in rows if row["completed"]))
+        else:
+            # PostgreSQL的计数和删除记录由语句级触发器维护，搜索使用GIN索引
+            db.execute(insert(Todo.__table__), rows)
+        db.commit()
+        todo_cache.invalidate(owner_id)
+        todo_events.notify(owner_id)
+        return len(todos)
+    
+    def _finish_import(self, db: Session, owner_id: str, total: int, completed: int) -> None:
+        """
+        对刚插入的一批导入记录执行插入触发器的维护
+        整批使用该所有者的同一个新版本号；通过(owner_id, change_version)索引找到这批记录
+        
+        Args:
+            db: 数据库会话
+            owner_id: 所有者
+            total: 这批记录的数量
+            completed: 其中已完成的数量
+        """
+        pending = (Todo.owner_id == owner_id, Todo.change_version == IMPORT_PENDING_VERSION)
+        upsert = sqlite.insert(TodoOwnerCounts).values(
+            owner_id=owner_id, total_count=total, completed_count=completed, version=1
+        )
+        db.execute(upsert.on_conflict_do_update(
+            index_elements=[TodoOwnerCounts.owner_id],
+            set_={
+                "total_count": TodoOwnerCounts.total_count + upsert.excluded.total_count,
+                "completed_count": TodoOwnerCounts.completed_count + upsert.excluded.completed_count,
+                "version": TodoOwnerCounts.version + 1,
+            },
+        ))
+        # ID可能被重新使用，与插入触发器相同，移除同ID的删除记录
+        db.execute(
+            delete(TodoTombstone)
+            .where(TodoTombstone.id.in_(select(Todo.id).where(*pending)))
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(
+            insert(todos_fts).from_select(
+                ["rowid", "title", "description", "owner_key"],
+                select(Todo.id, Todo.title, Todo.description, fts_owner_key(Todo.owner_id)).where(*pending),
+            )
+        )
+        db.execute(
+            update(todos_change_version)
+            .where(
+                todos_change_version.c.owner_id == owner_id,
+                todos_change_version.c.change_version == IMPORT_PENDING_VERSION,
+            )
+            .values(
+                change_version=select(TodoOwnerCounts.version)
+                .where(TodoOwnerCounts.owner_id == owner_id)
+                .scalar_subquery()
+            )
+        )
+    
+    def update_todos(
+        self, db: Session, todos: List[TodoBatchUpdate], owner_id: str = DEFAULT_OWNER
+    ) -> Dict[int, Row]:
+        """
+        批量更新待办事项
+        先查询该所有者存在的ID，再按主键批量执行UPDATE，整批在同一个事务中提交
+        
+        Args:
+            db: 数据库会话
+            todos: 待更新的待办事项数据列表，每项包含ID和要修改的字段
+            owner_id: 所有者
+            
+        Returns:
+            Dict[int, Row]: 以ID为键的更新后记录，不存在的ID不包含在内
+        """
+        ids = {todo.id for todo in todos}
+        if not ids:
+            return {}
+        existing = set(db.scalars(
+            select(Todo.id).where(Todo.id.in_(ids), Todo.owner_id == owner_id, todo_not_deleted)
+        ))
+        params = [
+            todo.model_dump(exclude_unset=True)
+            for todo in todos
+            if todo.id in existing and todo.model_fields_set - {"id"}
+        ]
+        if params:
+            db.execute(update(Todo), params)
+        rows = db.execute(select(*Todo.__table__.c).where(Todo.id.in_(existing))).all()
+        db.commit()
+        todo_cache.invalidate(owner_id)
+        todo_events.notify(owner_id)
+        return {row.id: row for row in rows}
+    
+    def delete_todos(self, db: Session, todo_ids: List[int], owner_id: str = DEFAULT_OWNER) -> Set[int]:
+        """
+        批量删除待办事项
+        
+        Args:
+            db: 数据库会话
+            todo_ids: 待删除的待办事项ID列表
+            owner_id: 所有者
+            
+        Returns:
+            Set[int]: 实际删除的待办事项ID
+        """
+        if not todo_ids:
+            return set()
+        deleted = set(db.scalars(
+            delete(Todo)
+            .where(Todo.id.in_(set(todo_ids)), Todo.owner_id == owner_id, todo_not_deleted)
+            .returning(Todo.id)
+            .execution_options(synchronize_session=False)
+        ))
+        db.commit()
+        todo_cache.invalidate(owner_id)
+        todo_events.notify(owner_id)
+        return deleted
     
-    def delete_completed_todos(self, db: Session) -> int:
+    def delete_completed_todos(self, db: Session, owner_id: str = DEFAULT_OWNER) -> int:
         """
         删除所有已完成的待办事项
+        只标记删除时间（软删除），记录由后台任务分批清理；标记按clear_batch_size条一批分别提交，
+        每批的触发器开销有上限，大表上也不会长时间占用写锁
         
         Args:
             db: 数据库会话
+            owner_id: 所有者
             
         Returns:
             int: 删除的记录数
         """
-        deleted_count = db.query(Todo).filter(Todo.completed == True).count()
-        db.query(Todo).filter(Todo.completed == True).delete()
-        db.commit()
-        return deleted_count
+        return self._soft_delete_in_batches(db, owner_id, todos_soft_delete.c.completed == True)
     
-    def delete_all_todos(self, db: Session) -> int:
+    def delete_all_todos(self, db: Session, owner_id: str = DEFAULT_OWNER) -> int:
         """
         删除所有待办事项
+        与delete_completed_todos相同，只标记删除时间并分批提交，记录由后台任务分批清理
         
         Args:
             db: 数据库会话
+            owner_id: 所有者
             
         Returns:
             int: 删除的记录数
         """
-        deleted_count = db.query(Todo).count()
-        db.query(Todo).delete()
+        return self._soft_delete_in_batches(db, owner_id)
+    
+    def _soft_delete_in_batches(self, db: Session, owner_id: str, *conditions: Any) -> int:
+        """
+        分批软删除所有者的待办事项
+        每批是一条按ID顺序标记clear_batch_size条的UPDATE语句并单独提交，批与批之间其他写入可以获得写锁。
+        第一批之后新建的记录不受影响；全部完成后才使缓存失效
+        
+        Args:
+            db: 数据库会话
+            owner_id: 所有者
+            conditions: 额外的筛选条件
+            
+        Returns:
+            int: 软删除的记录数
+        """
+        batch_size = settings.clear_batch_size
+        conditions = [
+            todos_soft_delete.c.owner_id == owner_id,
+            todos_soft_delete.c.deleted_at.is_(None),
+            *conditions,
+        ]
+        deleted = 0
+        after_id = None
+        while True:
+            batch = select(todos_soft_delete.c.id).where(*conditions).order_by(todos_soft_delete.c.id).limit(batch_size)
+            if after_id is not None:
+                # 从上一批最后的ID之后继续，不再扫描已软删除的记录
+                batch = batch.where(todos_soft_delete.c.id > after_id)
+            batch_ids = list(db.scalars(
+                update(todos_soft_delete)
+                .where(todos_soft_delete.c.id.in_(batch.scalar_subquery()))
+                .values(deleted_at=func.now())
+                .returning(todos_soft_delete.c.id)
+            ))
+            db.commit()
+            if not deleted and len(batch_ids) == batch_size:
+                # 第一批已满时才查询剩余记录的最大ID，之后新建的记录不再处理
+                last_id = db.scalar(select(func.max(todos_soft_delete.c.id)).where(*conditions))
+                conditions.append(todos_soft_delete.c.id <= (last_id or 0))
+            deleted += len(batch_ids)
+            if len(batch_ids) < batch_size:
+                break
+            after_id = max(batch_ids)
+        todo_cache.invalidate(owner_id)
+        todo_events.notify(owner_id)
+        return deleted
+    
+    def purge_deleted_todos(self, db: Session, batch_size: int = 500) -> int:
+        """
+        清理一批已软删除的记录
+        通过部分索引找到已删除的记录，每批在单独的事务中删除，每次占用写锁的时间很短。
+        删除记录和计数已在软删除时更新，清理不改变数据版本号
+        
+        Args:
+            db: 数据库会话
+            batch_size: 本批最多清理的记录数
+            
+        Returns:
+            int: 清理的记录数
+        """
+        batch = select(Todo.id).where(todo_deleted).order_by(Todo.deleted_at).limit(batch_size)
+        result = db.execute(
+            delete(Todo)
+            .where(Todo.id.in_(batch.scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        )
         db.commit()
-        return deleted_count
+        return result.rowcount
+
+
+class AsyncTodoCRUD:
+    """
+    异步待办事项CRUD操作类
+    通过AsyncSession在异步驱动（aiosqlite/asyncpg）上执行请求路径上的读写：单条记录的增删改查、列表、搜索和计数，
+    等待数据库时不占用线程。语句由TodoCRUD构造，查询条件、分页和写入行为与同步实现一致；
+    批量操作、导入导出和维护任务仍使用TodoCRUD
+    """
+    
+    def __init__(self, crud: TodoCRUD):
+        self.crud = crud
+    
+    async def create_todo(self, db: AsyncSession, todo: TodoCreate, owner_id: str = DEFAULT_OWNER) -> Todo:
+        """
+        创建新的待办事项
+        
+        Args:
+            db: 异步数据库会话
+            todo: 待创建的待办事项数据
+            owner_id: 所有者
+            
+        Returns:
+            Todo: 创建成功的待办事项对象
+        """
+        db_todo = Todo(**todo.model_dump(), owner_id=owner_id, updated_at=None)
+        db.add(db_todo)
+        await db.commit()
+        todo_cache.invalidate(owner_id)
+        todo_events.notify(owner_id)
+        return db_todo
+    
+    async def get_todo(self, db: AsyncSession, todo_id: int, owner_id: str = DEFAULT_OWNER) -> Optional[Todo]:
+        """
+        获取单个待办事项
+        
+        Args:
+            db: 异步数据库会话
+            todo_id: 待办事项ID
+            owner_id: 所有者
+            
+        Returns:
+            Optional[Todo]: 找到的待办事项对象，未找到或属于其他所有者则返回None
+        """
+        result = await db.scalars(
+            select(Todo).where(Todo.id == todo_id, Todo.owner_id == owner_id, todo_not_deleted).limit(1)
+        )
+        return result.first()
+    
+    async def get_todo_rows(
+        self,
+        db: AsyncSession,
+        completed: Optional[bool] = None,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        sort: str = "id",
+        descending: bool = False,
+        after_value: Any = None,
+        owner_id: str = DEFAULT_OWNER,
+    ) -> List[dict]:
+        """
+        获取待办事项列表的轻量记录，参数与TodoCRUD.get_todo_rows相同
+        
+        Returns:
+            List[dict]: 以列名为键的记录列表
+        """
+        statement = self.crud._rows_statement(
+            completed, skip, limit, after_id, sort, descending, after_value, owner_id
+        )
+        return [row._asdict() for row in await db.execute(statement)]
+    
+    async def search_todo_rows(
+        self,
+        db: AsyncSession,
+        query: str,
+        completed: Optional[bool] = None,
+        limit: int = 100,
+        after: Optional[Tuple[float, int]] = None,
+        owner_id: str = DEFAULT_OWNER,
+    ) -> List[dict]:
+        """
+        全文搜索待办事项的标题和描述，参数与TodoCRUD.search_todo_rows相同
+        
+        Returns:
+            List[dict]: 以列名为键的记录列表，score为相关度分数，越小越相关
+        """
+        statement = self.crud._search_statement(db.get_bind().dialect.name, query, completed, limit, after, owner_id)
+        if statement is None:
+            return []
+        return [row._asdict() for row in await db.execute(statement)]
+    
+    async def get_version(self, db: AsyncSession, owner_id: str = DEFAULT_OWNER) -> int:
+        """
+        获取所有者的待办事项数据版本号
+        
+        Args:
+            db: 异步数据库会话
+            owner_id: 所有者
+            
+        Returns:
+            int: 当前数据版本号，所有者还没有写入过时为0
+        """
+        return await db.scalar(select(TodoOwnerCounts.version).where(TodoOwnerCounts.owner_id == owner_id)) or 0
+    
+    async def get_stats(self, db: AsyncSession, owner_id: str = DEFAULT_OWNER) -> Dict[str, int]:
+        """
+        获取待办事项计数
+        
+        Args:
+            db: 异步数据库会话
+            owner_id: 所有者
+            
+        Returns:
+            Dict[str, int]: 总数total、未完成数active和已完成数completed
+        """
+        row = (await db.execute(
+            select(TodoOwnerCounts.total_count, TodoOwnerCounts.completed_count)
+            .where(TodoOwnerCounts.owner_id == owner_id)
+        )).first()
+        total, completed = row if row is not None else (0, 0)
+        return {"total": total, "active": total - completed, "completed": completed}
+    
+    async def update_todo(
+        self,
+        db: AsyncSession,
+        todo_id: int,
+        todo: TodoUpdate,
+        expected: Optional[Todo] = None,
+        owner_id: str = DEFAULT_OWNER,
+    ) -> Optional[Todo]:
+        """
+        更新待办事项
+        
+        Args:
+            db: 异步数据库会话
+            todo_id: 待办事项ID
+            todo: 更新的待办事项数据
+            expected: 之前读取到的待办事项，提供时只有记录未被其他请求修改才更新
+            owner_id: 所有者
+            
+        Returns:
+            Optional[Todo]: 更新后的待办事项对象，未找到或已被修改则返回None
+        """
+        update_data = todo.model_dump(exclude_unset=True)
+        if not update_data:
+            return await self.get_todo(db, todo_id=todo_id, owner_id=owner_id)
+        statement = (
+            update(Todo)
+            .where(*self.crud._write_conditions(todo_id, owner_id, expected))
+            .values(**update_data)
+            .returning(Todo)
+        )
+        result = await db.scalars(
+            select(Todo).from_statement(statement).execution_options(populate_existing=True)
+        )
+        db_todo = result.first()
+        await db.commit()
+        todo_cache.invalidate(owner_id)
+        todo_events.notify(owner_id)
+        return db_todo
+    
+    async def delete_todo(
+        self, db: AsyncSession, todo_id: int, expected: Optional[Todo] = None, owner_id: str = DEFAULT_OWNER
+    ) -> bool:
+        """
+        删除待办事项
+        
+        Args:
+            db: 异步数据库会话
+            todo_id: 待办事项ID
+            expected: 之前读取到的待办事项，提供时只有记录未被其他请求修改才删除
+            owner_id: 所有者
+            
+        Returns:
+            bool: 删除成功返回True，未找到或已被修改返回False
+        """
+        result = await db.execute(
+            delete(Todo)
+            .where(*self.crud._write_conditions(todo_id, owner_id, expected))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        todo_cache.invalidate(owner_id)
+        todo_events.notify(owner_id)
+        return result.rowcount > 0
 
 
 # 创建全局CRUD实例
 todo_crud = TodoCRUD()
+async_todo_crud = AsyncTodoCRUD(todo_crud)
+
+# 完成/未完成状态切换的合并提交写入器
+# 异步模式下路由在事件循环线程中执行，不能阻塞等待写入线程，因此不启用；
+# 按所有者分片时写入器只能写入主库，同样不启用
+todo_completion_writer: GroupCommitWriter[Tuple[int, bool, Optional[Todo], str], Optional[Row]] = GroupCommitWriter(
+    "todo_completion",
+    todo_crud.set_completed_batch,
+    SessionLocal,
+    enabled=settings.group_commit_enabled and not USE_ASYNC_DB and not settings.tenant_shard_dir,
+    window=settings.group_commit_window,
+    max_batch=settings.group_commit_max_batch,
+)
@@ -0,0 +1,176 @@
+"""
+维护任务和事件流中继
+维护任务由应用按配置的间隔周期性运行，也可以在命令行中手动运行；按所有者分片时依次处理主库和每个分片:
+
+    python -m app.jobs reconcile_counts
+    python -m app.jobs compact_tombstones
+    python -m app.jobs purge_deleted
+"""
+import bisect
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import configure_logging, get_logger
+from app.core.database import SessionLocal
+from app.core.events import todo_events
+from app.core.tenancy import SHARD_PREFIX, database_sessions, owner_session, tenant_shards
+from app.crud.todo import todo_crud
+
+logger = get_logger("app.jobs")
+
+# 每个维护任务最后开始处理的数据库，下一次运行从其后的数据库开始
+_last_databases: Dict[str, str] = {}
+
+# 分片中是否有已软删除的记录，使用deleted_at上的部分索引
+PURGE_PENDING_SQL = "SELECT 1 FROM todos WHERE deleted_at IS NOT NULL LIMIT 1"
+
+# 分片中是否有过期的删除记录
+COMPACT_PENDING_SQL = "SELECT 1 FROM todo_tombstones WHERE deleted_at < ? LIMIT 1"
+
+
+def _databases(
+    job: str, pending_sql: Optional[str] = None, *params: Any
+) -> Iterator[Tuple[str, Callable[[], ContextManager[Session]]]]:
+    """
+    按轮转顺序依次给出维护任务需要处理的数据库
+    从上一次运行最后开始处理的数据库之后开始，因时间预算或出错提前结束时，下一次运行从后面的数据库继续，
+    排在后面的分片不会一直得不到处理；提供pending_sql时先用只读的临时连接检查分片，没有需要处理的记录时跳过，
+    不连接该分片
+
+    Args:
+        job: 维护任务名称，每个任务分别记录轮转位置
+        pending_sql: 检查分片中是否有需要处理的记录的查询，为空时处理所有分片
+        params: 查询参数
+
+    Yields:
+        Tuple[str, Callable[[], ContextManager[Session]]]: 数据库名称和会话工厂
+    """
+    databases = database_sessions()
+    start = 0
+    if job in _last_databases:
+        # 数据库按名称排序，上一次的数据库已不存在时从其原来的位置继续
+        start = bisect.bisect_right([name for name, _ in databases], _last_databases[job])
+    for name, session_factory in databases[start:] + databases[:start]:
+        if (
+            pending_sql is not None and name.startswith(SHARD_PREFIX)
+            and not tenant_shards.has_rows(name[len(SHARD_PREFIX):], pending_sql, *params)
+        ):
+            continue
+        _last_databases[job] = name
+        yield name, session_factory
+
+
+def reconcile_counts() -> Dict[str, List[str]]:
+    """
+    重新统计待办事项数，修正触发器维护的每个所有者的计数
+    计数有偏差时记录警告日志
+
+    Returns:
+        Dict[str, List[str]]: 有偏差的数据库及其中计数已修正的所有者，没有偏差时为空
+    """
+    result: Dict[str, List[str]] = {}
+    # 偏差来自绕过触发器的修改，无法事先判断，每个分片都需要统计
+    for database, session_factory in _databases("reconcile_counts"):
+        with session_factory() as db:
+            owners = todo_crud.reconcile_owner_counts(db)
+        if owners:
+            logger.warning("todo_owner_counts_drift", database=database, owners=owners)
+            result[database] = owners
+    return result
+
+
+def compact_tombstones() -> int:
+    """
+    清理超过保留时间的删除记录
+
+    Returns:
+        int: 清理的删除记录数
+    """
+    before = datetime.now(timezone.utc) - timedelta(seconds=settings.tombstone_retention)
+    purged = 0
+    # 与func.now()写入SQLite的文本格式相同
+    pending_before = before.strftime("%Y-%m-%d %H:%M:%S")
+    for _, session_factory in _databases("compact_tombstones", COMPACT_PENDING_SQL, pending_before):
+        with session_factory() as db:
+            purged += todo_crud.compact_tombstones(db, before)
+    if purged:
+        logger.info("todo_tombstones_compacted", purged=purged)
+    return purged
+
+
+def purge_deleted() -> int:
+    """
+    分批清理已软删除的待办事项
+    每批在单独的事务中删除，批次之间释放写锁，其他请求的写入可以穿插执行；
+    单次运行超过配置的时间后停止，剩余的记录留到下一次运行
+
+    Returns:
+        int: 清理的记录数
+    """
+    deadline = time.monotonic() + settings.purge_time_budget
+    purged = 0
+    for _, session_factory in _databases("purge_deleted", PURGE_PENDING_SQL):
+        with session_factory() as db:
+            while True:
+                count = todo_crud.purge_deleted_todos(db, settings.purge_batch_size)
+                purged += count
+                if count < settings.purge_batch_size or time.monotonic() >= deadline:
+                    break
+        if time.monotonic() >= deadline:
+            break
+    if purged:
+        logger.info("todos_purged", purged=purged)
+    return purged
+
+
+def relay_changes(cursors: Dict[str, int]) -> None:
+    """
+    事件流中继：查询有订阅者的所有者在已发布的版本号之后的变更，发布给本进程的订阅者
+    由事件广播器在每个工作进程中按stream_poll_interval运行，本进程有写操作时立即运行；
+    未分片时先在一次查询中读取所有订阅的所有者的数据版本号，只查询版本号增加的所有者的变更。
+    变更多于stream_batch_limit条或所需的删除记录已被清理时发布reset事件
+
+    Args:
+        cursors: 所有者及已发布到的数据版本号
+    """
+    owners = list(cursors)
+    if not tenant_shards:
+        with SessionLocal() as db:
+            versions = todo_crud.get_versions(db, owners)
+        owners = [owner_id for owner_id in owners if versions.get(owner_id, 0) > cursors[owner_id]]
+    for owner_id in owners:
+        since = cursors[owner_id]
+        with owner_session(owner_id) as db:
+            version, events = todo_crud.get_change_events(db, since, owner_id, settings.stream_batch_limit)
+        if version <= since:
+            continue
+        if events is None:
+            todo_events.publish("reset", {"reason": "expired"}, owner_id, version)
+            continue
+        for change_version, event_type, data in events:
+            todo_events.publish(event_type, data, owner_id, change_version)
+
+
+# 可以在命令行中运行的任务
+JOBS: Dict[str, Callable[[], object]] = {
+    "reconcile_counts": reconcile_counts,
+    "compact_tombstones": compact_tombstones,
+    "purge_deleted": purge_deleted,
+}
+
+
+def main() -> None:
+    if len(sys.argv) != 2 or sys.argv[1] not in JOBS:
+        print(f"用法: python -m app.jobs {{{','.join(JOBS)}}}")
+        sys.exit(2)
+    configure_logging()
+    print(JOBS[sys.argv[1]]())
+
+
+if __name__ == "__main__":
+    main()
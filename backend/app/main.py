@@ -1,15 +1,66 @@
 """
 FastAPI主应用入口
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.database import engine, Base
+from app.core.database import USE_ASYNC_DB, check_db, init_db
+from app.core.cache import todo_cache
 from app.core.config import settings
-from app.api.v1.todos import router as todos_router
-import uvicorn
+from app.core.events import todo_events
+from app.core.logging import REQUEST_ID_HEADER, RequestIdMiddleware, configure_logging
+from app.core.metrics import PrometheusMiddleware, mark_worker_exited, metrics_response
+from app.core.profiling import ProfilingMiddleware
+from app.core.replicas import LAST_WRITE_HEADER, ReadYourWritesMiddleware
+from app.core.server import run_server, worker_count
+from app.core.tasks import PeriodicTask
+from app.core.tenancy import OwnerVaryMiddleware
+from app.crud.todo import todo_completion_writer
+from app.jobs import compact_tombstones, purge_deleted, reconcile_counts, relay_changes
+from app.openapi import use_pregenerated_openapi
+
+# 配置结构化日志
+configure_logging()
+
+# 数据库URL使用异步驱动（aiosqlite/asyncpg）时注册异步版本的路由，只导入用到的路由模块
+if USE_ASYNC_DB:
+    from app.api.v1.todos_async import router as todos_router
+else:
+    from app.api.v1.todos import router as todos_router
+
+# 启动时的表结构处理
+SCHEMA_SETUP = {"create": init_db, "check": check_db, "skip": None}
+
+# 后台维护任务，多个工作进程中只有持有租约的一个进程运行每个任务
+periodic_tasks = [
+    PeriodicTask("reconcile_counts", reconcile_counts, settings.stats_reconcile_interval, exclusive=True),
+    PeriodicTask("compact_tombstones", compact_tombstones, settings.tombstone_compact_interval, exclusive=True),
+    PeriodicTask("purge_deleted", purge_deleted, settings.purge_interval, exclusive=True),
+]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时按配置建表或检查表结构并开始运行后台维护任务和事件流中继，关闭时停止后台任务和合并提交写入器、结束所有事件流并清理本进程的监控指标"""
+    # 在每个工作进程启动时处理表结构而不是在导入时，多个工作进程建表时通过数据库锁依次执行
+    if settings.db_schema_setup not in SCHEMA_SETUP:
+        raise ValueError(f"未知的表结构处理方式: {settings.db_schema_setup}，可选值为{'、'.join(SCHEMA_SETUP)}")
+    setup = SCHEMA_SETUP[settings.db_schema_setup]
+    if setup is not None:
+        setup()
+    for task in periodic_tasks:
+        task.start()
+    # 每个工作进程各自中继数据库中的变更，连接到任意进程的订阅者都能收到所有写操作的事件
+    todo_events.start(relay_changes)
+    yield
+    for task in periodic_tasks:
+        await task.stop()
+    await todo_events.stop()
+    # 提交写入器中剩余的写操作
+    todo_completion_writer.close()
+    todo_events.close()
+    mark_worker_exited()
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
 
 # 创建FastAPI应用
 app = FastAPI(
@@ -19,9 +70,14 @@ app = FastAPI(
     debug=settings.debug,
     openapi_url=f"{settings.api_prefix}/openapi.json",
     docs_url=f"{settings.api_prefix}/docs",
-    redoc_url=f"{settings.api_prefix}/redoc"
+    redoc_url=f"{settings.api_prefix}/redoc",
+    lifespan=lifespan,
 )
 
+# OpenAPI文档在首次请求时生成，配置了预先生成的文件时直接读取该文件
+if settings.openapi_file:
+    use_pregenerated_openapi(app, settings.openapi_file)
+
 # 配置CORS中间件
 app.add_middleware(
     CORSMiddleware,
@@ -29,8 +85,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", REQUEST_ID_HEADER, LAST_WRITE_HEADER],
 )
 
+# 配置所有者缓存区分中间件，待办事项接口的读取响应随X-Owner-ID请求头变化
+app.add_middleware(OwnerVaryMiddleware, path_prefix=f"{settings.api_prefix}/todos")
+
+# 配置写后读中间件，配置了只读副本时记录客户端的写操作时间
+app.add_middleware(ReadYourWritesMiddleware)
+
+# 配置请求剖析中间件，按配置的比例或请求头触发
+app.add_middleware(ProfilingMiddleware)
+
+# 配置监控中间件
+if settings.metrics_enabled:
+    app.add_middleware(PrometheusMiddleware)
+
+# 配置请求ID中间件，最后添加的中间件最先执行，使其他中间件输出的日志也带有请求ID
+app.add_middleware(RequestIdMiddleware)
+
 # 注册路由
 app.include_router(todos_router, prefix=settings.api_prefix)
 
@@ -55,29 +128,43 @@ async def health_check():
     return {"status": "healthy", "message": "服务运行正常"}
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    读缓存统计信息，包括命中次数、未命中次数和命中率
+    """
+    return todo_cache.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Prometheus监控指标
+    """
+    return metrics_response()
+
+
 # 启动函数
 def start_app():
     """启动应用并打印控制台信息"""
+    mode = "生产模式" if settings.server_mode == "production" else "开发模式（自动重载）"
     print("=" * 60)
     print(f"🚀 {settings.app_name} 启动成功!")
     print(f"📝 版本: {settings.app_version}")
-    print(f"🌐 服务地址: http://localhost:8000")
-    print(f"📚 API文档: http://localhost:8000/api/v1/docs")
-    print(f"🔍 ReDoc文档: http://localhost:8000/api/v1/redoc")
-    print(f"❤️  健康检查: http://localhost:8000/health")
+    print(f"⚙️  运行模式: {mode}")
+    if settings.server_mode == "production":
+        print(f"👷 工作进程: {worker_count()}")
+    print(f"🌐 服务地址: http://localhost:{settings.server_port}")
+    print(f"📚 API文档: http://localhost:{settings.server_port}{settings.api_prefix}/docs")
+    print(f"🔍 ReDoc文档: http://localhost:{settings.server_port}{settings.api_prefix}/redoc")
+    print(f"❤️  健康检查: http://localhost:{settings.server_port}/health")
     print(f"📁 数据库: SQLite (todos.db)")
     print("=" * 60)
     print("💡 提示: 按Ctrl+C停止服务")
     print("=" * 60)
     
-    # 启动Uvicorn服务器
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
-    )
+    # 按配置启动Uvicorn服务器
+    run_server()
 
 
 if __name__ == "__main__":
@@ -1,10 +1,16 @@
 """
 待办事项数据模型
 """
-from sqlalchemy import Column, Integer, Text, Boolean, DateTime
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, Float, Text, Boolean, DateTime, Index, DDL, event
+from sqlalchemy.sql import column, func, table, text
 from app.core.database import Base
 
+# 未指定所有者的待办事项（以及未携带所有者请求头的请求）使用的所有者
+DEFAULT_OWNER = "default"
+
+# 列表和排序索引的条件，索引只包含未被软删除的记录
+NOT_DELETED_WHERE = {"sqlite_where": text("deleted_at IS NULL"), "postgresql_where": text("deleted_at IS NULL")}
+
 
 class Todo(Base):
     """
@@ -12,9 +18,28 @@ class Todo(Base):
     对应数据库中的todos表
     """
     __tablename__ = "todos"
+    __table_args__ = (
+        # 所有查询都只读取一个所有者的记录，索引都以owner_id开头，
+        # 查询耗时只与该所有者的记录数有关，与表中的总记录数无关。
+        # 列表和排序索引是只包含未删除记录的部分索引，查询条件中包含todo_not_deleted时才能使用
+        # 按ID分页
+        Index("ix_todos_owner_id_id", "owner_id", "id", **NOT_DELETED_WHERE),
+        # 按状态筛选并按ID分页，同时用于批量删除已完成的待办事项
+        Index("ix_todos_owner_completed_id", "owner_id", "completed", "id", **NOT_DELETED_WHERE),
+        # 列表排序，末尾的id使排序值相同的记录顺序确定，并支持(排序值, id)的键集分页
+        Index("ix_todos_owner_created_at_id", "owner_id", "created_at", "id", **NOT_DELETED_WHERE),
+        Index("ix_todos_owner_title_id", "owner_id", "title", "id", **NOT_DELETED_WHERE),
+        # 按状态筛选并排序
+        Index("ix_todos_owner_completed_created_at_id", "owner_id", "completed", "created_at", "id", **NOT_DELETED_WHERE),
+        Index("ix_todos_owner_completed_title_id", "owner_id", "completed", "title", "id", **NOT_DELETED_WHERE),
+        # 增量同步按变更版本号查询，批量导入也按变更版本号查找刚插入的记录，包含所有记录
+        Index("ix_todos_owner_change_version", "owner_id", "change_version"),
+    )
     
-    # 主键ID
-    id = Column(Integer, primary_key=True, index=True)
+    # 主键ID，主键本身即为索引，不再单独建立索引
+    id = Column(Integer, primary_key=True)
+    # 所有者，创建后不再改变
+    owner_id = Column(Text, nullable=False, server_default=DEFAULT_OWNER)
     # 任务标题，必填字段
     title = Column(Text, nullable=False)
     # 任务描述，可选字段
@@ -25,3 +50,330 @@ class Todo(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     # 更新时间，默认为当前时间，更新时自动更新
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # 变更版本号，记录最近一次写入时的数据版本号，由触发器维护，用于增量同步
+    change_version = Column(Integer, nullable=False, server_default="0")
+    # 软删除时间，不为空的记录已被删除，由后台任务分批清理
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+
+
+# 按更新时间排序时使用的排序值，从未更新过的记录updated_at为空，按创建时间参与排序
+todo_modified_at = func.coalesce(Todo.updated_at, Todo.created_at)
+
+# 表达式索引，查询中必须使用相同的表达式才能命中
+Index("ix_todos_owner_modified_at_id", Todo.owner_id, todo_modified_at, Todo.id, **NOT_DELETED_WHERE)
+Index("ix_todos_owner_completed_modified_at_id", Todo.owner_id, Todo.completed, todo_modified_at, Todo.id, **NOT_DELETED_WHERE)
+
+# 未被软删除的记录，所有读写操作都只处理这些记录；
+# 列表和排序的部分索引只包含这些记录，已删除的记录不占用索引，读取时也不需要逐行跳过
+todo_not_deleted = Todo.deleted_at.is_(None)
+
+# 等待清理的软删除记录的部分索引，只包含已删除的记录，体积与待清理的记录数有关
+todo_deleted = Todo.deleted_at.is_not(None)
+Index("ix_todos_deleted_at", Todo.deleted_at, sqlite_where=todo_deleted, postgresql_where=todo_deleted)
+
+# 软删除语句使用的轻量表对象，不带updated_at的onupdate默认值：
+# 软删除不改变更新时间，只更新deleted_at一列，也不会触发内容更新的触发器
+todos_soft_delete = table("todos", column("id"), column("owner_id"), column("completed"), column("deleted_at"))
+
+# 批量导入插入记录时使用的变更版本号。SQLite的插入触发器跳过这些记录，
+# 导入在同一事务中对整批一次性更新版本号、计数、删除记录和全文索引，再改为新的版本号
+IMPORT_PENDING_VERSION = -1
+# 设置导入记录变更版本号的轻量表对象，同样不带updated_at的onupdate默认值，不会触发更新触发器
+todos_change_version = table("todos", column("owner_id"), column("change_version"))
+
+
+class TodoTombstone(Base):
+    """
+    待办事项删除记录模型
+    对应数据库中的todo_tombstones表，由触发器在删除待办事项时写入，
+    增量同步通过它得知哪些记录已被删除，过期的记录定期清理
+    """
+    __tablename__ = "todo_tombstones"
+    
+    __table_args__ = (
+        # 增量同步查询一个所有者在指定版本之后删除的记录
+        Index("ix_todo_tombstones_owner_change_version", "owner_id", "change_version"),
+    )
+    
+    # 被删除的待办事项ID
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    # 被删除的待办事项的所有者
+    owner_id = Column(Text, nullable=False, server_default=DEFAULT_OWNER)
+    # 删除时该所有者的数据版本号
+    change_version = Column(Integer, nullable=False, index=True)
+    # 删除时间，用于按保留时间清理
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class TodoOwnerCounts(Base):
+    """
+    所有者待办事项计数和数据版本号模型
+    对应数据库中的todo_owner_counts表，每个所有者一行，由触发器在写入todos表的同一事务中维护；
+    不同所有者的写入更新不同的行，互不等待
+    """
+    __tablename__ = "todo_owner_counts"
+    
+    # 所有者
+    owner_id = Column(Text, primary_key=True)
+    # 该所有者的待办事项总数和已完成数
+    total_count = Column(Integer, nullable=False, server_default="0")
+    completed_count = Column(Integer, nullable=False, server_default="0")
+    # 该所有者的数据版本号，该所有者的待办事项每次写入时由触发器递增，用于生成列表的ETag和增量同步
+    version = Column(Integer, nullable=False, server_default="0")
+    # 已清理的该所有者的删除记录中最大的变更版本号，更早的版本无法再增量同步
+    compacted_version = Column(Integer, nullable=False, server_default="0")
+
+
+class TaskLease(Base):
+    """
+    后台任务租约模型
+    对应数据库中的task_leases表，每个周期性任务一行；
+    多个工作进程和实例共用一个数据库时，只有持有未过期租约的进程运行该任务
+    """
+    __tablename__ = "task_leases"
+    
+    # 任务名称
+    name = Column(Text, primary_key=True)
+    # 持有租约的进程
+    holder = Column(Text, nullable=False)
+    # 租约过期时间（Unix时间戳），过期后其他进程可以取得租约
+    expires_at = Column(Float, nullable=False)
+
+
+# todos表的每次写入都由触发器递增该所有者的版本号并更新其计数，绕过CRUD的写入同样会被记录
+# create_all按表名顺序建表，todo_owner_counts和todo_tombstones先于todos创建
+# SQLite使用行级触发器，版本号和计数在同一条语句中更新，新所有者的第一次写入插入计数行。
+# 每种操作对应(所有者, 总数的变化, 已完成数的变化)
+SQLITE_OWNER_CHANGES = {
+    "INSERT": ("new.owner_id", "1", "CASE WHEN new.completed THEN 1 ELSE 0 END"),
+    "UPDATE": (
+        "new.owner_id",
+        "0",
+        "(CASE WHEN new.completed THEN 1 ELSE 0 END) - (CASE WHEN old.completed THEN 1 ELSE 0 END)",
+    ),
+    "DELETE": ("old.owner_id", "-1", "-(CASE WHEN old.completed THEN 1 ELSE 0 END)"),
+    "SOFT_DELETE": ("old.owner_id", "-1", "-(CASE WHEN old.completed THEN 1 ELSE 0 END)"),
+}
+SQLITE_OWNER_VERSION = (
+    "INSERT INTO todo_owner_counts (owner_id, total_count, completed_count, version) "
+    "VALUES ({owner}, {total}, {completed}, 1) "
+    "ON CONFLICT (owner_id) DO UPDATE SET total_count = total_count + excluded.total_count, "
+    "completed_count = completed_count + excluded.completed_count, version = version + 1;"
+)
+# 递增版本号之后记录变更：写入的记录以递增后的版本号作为变更版本号，删除的记录写入删除记录。
+# SQLite不允许在触发器中修改new，改为再执行一次UPDATE；更新触发器只监听内容列，
+# 触发器内对change_version的更新不会再次触发。ID可能被重新使用，新建记录时移除同ID的删除记录
+SQLITE_CHANGE_TRACKING = {
+    "INSERT": (
+        "UPDATE todos SET change_version = (SELECT version FROM todo_owner_counts WHERE owner_id = new.owner_id) "
+        "WHERE id = new.id; "
+        "DELETE FROM todo_tombstones WHERE id = new.id;"
+    ),
+    "UPDATE": (
+        "UPDATE todos SET change_version = (SELECT version FROM todo_owner_counts WHERE owner_id = new.owner_id) "
+        "WHERE id = new.id;"
+    ),
+    "DELETE": (
+        "INSERT OR REPLACE INTO todo_tombstones (id, owner_id, change_version, deleted_at) "
+        "VALUES (old.id, old.owner_id, (SELECT version FROM todo_owner_counts WHERE owner_id = old.owner_id), "
+        "CURRENT_TIMESTAMP);"
+    ),
+    "SOFT_DELETE": (
+        "INSERT OR REPLACE INTO todo_tombstones (id, owner_id, change_version, deleted_at) "
+        "VALUES (old.id, old.owner_id, (SELECT version FROM todo_owner_counts WHERE owner_id = old.owner_id), "
+        "CURRENT_TIMESTAMP);"
+    ),
+}
+# 软删除视为删除；已软删除的记录被清理时不再改变版本号和计数。
+# 批量导入的记录以IMPORT_PENDING_VERSION插入，不触发逐行维护，由导入对整批一次性维护
+SQLITE_TRIGGER_EVENTS = {
+    "INSERT": "INSERT ON todos WHEN new.change_version >= 0",
+    "UPDATE": "UPDATE OF title, description, completed, created_at, updated_at ON todos WHEN old.deleted_at IS NULL",
+    "DELETE": "DELETE ON todos WHEN old.deleted_at IS NULL",
+    "SOFT_DELETE": "UPDATE OF deleted_at ON todos WHEN old.deleted_at IS NULL AND new.deleted_at IS NOT NULL",
+}
+for operation, (owner, total, completed) in SQLITE_OWNER_CHANGES.items():
+    event.listen(
+        Todo.__table__,
+        "after_create",
+        DDL(
+            f"CREATE TRIGGER todos_version_{operation.lower()} AFTER {SQLITE_TRIGGER_EVENTS[operation]} "
+            f"BEGIN {SQLITE_OWNER_VERSION.format(owner=owner, total=total, completed=completed)} "
+            f"{SQLITE_CHANGE_TRACKING[operation]} END"
+        ).execute_if(dialect="sqlite"),
+    )
+# PostgreSQL在写入每条记录之前递增该所有者的版本号作为变更版本号，同时取得该所有者计数行的行锁直到事务提交：
+# 同一所有者的变更版本号的分配顺序与提交顺序一致，增量同步不会遗漏尚未提交的较小版本号；
+# 不同所有者的写入锁定不同的行，可以并发执行
+POSTGRESQL_CHANGE_VERSION_FUNCTION = (
+    "CREATE FUNCTION todos_set_change_version() RETURNS trigger AS $$ "
+    "BEGIN "
+    "INSERT INTO todo_owner_counts (owner_id, version) VALUES (NEW.owner_id, 1) "
+    "ON CONFLICT (owner_id) DO UPDATE SET version = todo_owner_counts.version + 1 "
+    "RETURNING version INTO NEW.change_version; "
+    "IF TG_OP = 'INSERT' THEN DELETE FROM todo_tombstones WHERE id = NEW.id; END IF; "
+    "RETURN NEW; "
+    "END; $$ LANGUAGE plpgsql"
+)
+# 删除未软删除的记录和软删除记录时写入删除记录，清理已软删除的记录时不再写入。
+# 物理删除没有行级的BEFORE触发器，在这里为每个涉及的所有者递增一次版本号；
+# 软删除的版本号已由行级触发器递增，删除记录使用该所有者当前的版本号
+POSTGRESQL_TOMBSTONES_FUNCTION = (
+    "CREATE FUNCTION todos_record_tombstones() RETURNS trigger AS $$ "
+    "BEGIN "
+    "IF TG_OP = 'DELETE' THEN "
+    "WITH versions AS ("
+    "UPDATE todo_owner_counts SET version = version + 1 "
+    "WHERE owner_id IN (SELECT owner_id FROM old_rows WHERE deleted_at IS NULL) RETURNING owner_id, version) "
+    "INSERT INTO todo_tombstones (id, owner_id, change_version, deleted_at) "
+    "SELECT old_rows.id, old_rows.owner_id, versions.version, now() "
+    "FROM old_rows JOIN versions ON versions.owner_id = old_rows.owner_id WHERE old_rows.deleted_at IS NULL "
+    "ON CONFLICT (id) DO UPDATE SET owner_id = EXCLUDED.owner_id, change_version = EXCLUDED.change_version, "
+    "deleted_at = EXCLUDED.deleted_at; "
+    "ELSE "
+    "INSERT INTO todo_tombstones (id, owner_id, change_version, deleted_at) "
+    "SELECT new_rows.id, new_rows.owner_id, todo_owner_counts.version, now() "
+    "FROM new_rows JOIN old_rows ON old_rows.id = new_rows.id "
+    "JOIN todo_owner_counts ON todo_owner_counts.owner_id = new_rows.owner_id "
+    "WHERE new_rows.deleted_at IS NOT NULL AND old_rows.deleted_at IS NULL "
+    "ON CONFLICT (id) DO UPDATE SET owner_id = EXCLUDED.owner_id, change_version = EXCLUDED.change_version, "
+    "deleted_at = EXCLUDED.deleted_at; "
+    "END IF; "
+    "RETURN NULL; "
+    "END; $$ LANGUAGE plpgsql"
+)
+POSTGRESQL_CHANGE_TRIGGERS = (
+    "CREATE TRIGGER todos_change_version BEFORE INSERT OR UPDATE ON todos "
+    "FOR EACH ROW EXECUTE FUNCTION todos_set_change_version()",
+    "CREATE TRIGGER todos_tombstones AFTER DELETE ON todos "
+    "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION todos_record_tombstones()",
+    "CREATE TRIGGER todos_tombstones_update AFTER UPDATE ON todos "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT "
+    "EXECUTE FUNCTION todos_record_tombstones()",
+)
+for statement in (POSTGRESQL_CHANGE_VERSION_FUNCTION, POSTGRESQL_TOMBSTONES_FUNCTION, *POSTGRESQL_CHANGE_TRIGGERS):
+    event.listen(Todo.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+# 按所有者汇总整条语句对计数的影响后更新各所有者的计数行，更新的记录数与涉及的所有者数有关
+POSTGRESQL_OWNER_COUNTS_UPDATE = (
+    "UPDATE todo_owner_counts SET total_count = todo_owner_counts.total_count + changes.total, "
+    "completed_count = todo_owner_counts.completed_count + changes.completed "
+    "FROM (SELECT owner_id, sum(total) AS total, sum(completed) AS completed FROM ({changes}) deltas "
+    "GROUP BY owner_id) changes WHERE todo_owner_counts.owner_id = changes.owner_id; "
+)
+POSTGRESQL_OWNER_DELETED = (
+    "SELECT owner_id, -1 AS total, CASE WHEN completed THEN -1 ELSE 0 END AS completed "
+    "FROM old_rows WHERE deleted_at IS NULL"
+)
+POSTGRESQL_OWNER_UPDATED = (
+    "SELECT owner_id, 1 AS total, CASE WHEN completed THEN 1 ELSE 0 END AS completed "
+    "FROM new_rows WHERE deleted_at IS NULL "
+    f"UNION ALL {POSTGRESQL_OWNER_DELETED}"
+)
+
+# PostgreSQL使用语句级触发器，通过过渡表一次统计整条语句影响的记录，已软删除的记录不计入。
+# 带过渡表的触发器只能对应一种操作，因此三种操作各有一个触发器，共用同一个函数
+POSTGRESQL_COUNTS_FUNCTION = (
+    "CREATE FUNCTION todos_update_counts() RETURNS trigger AS $$ "
+    "BEGIN "
+    "IF TG_OP = 'INSERT' THEN "
+    "INSERT INTO todo_owner_counts (owner_id, total_count, completed_count) "
+    "SELECT owner_id, count(*), count(*) FILTER (WHERE completed) FROM new_rows GROUP BY owner_id "
+    "ON CONFLICT (owner_id) DO UPDATE SET total_count = todo_owner_counts.total_count + EXCLUDED.total_count, "
+    "completed_count = todo_owner_counts.completed_count + EXCLUDED.completed_count; "
+    "ELSIF TG_OP = 'DELETE' THEN "
+    f"{POSTGRESQL_OWNER_COUNTS_UPDATE.format(changes=POSTGRESQL_OWNER_DELETED)}"
+    "ELSE "
+    f"{POSTGRESQL_OWNER_COUNTS_UPDATE.format(changes=POSTGRESQL_OWNER_UPDATED)}"
+    "END IF; "
+    "RETURN NULL; "
+    "END; $$ LANGUAGE plpgsql"
+)
+POSTGRESQL_COUNTS_TRIGGERS = {
+    "INSERT": "NEW TABLE AS new_rows",
+    "UPDATE": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "DELETE": "OLD TABLE AS old_rows",
+}
+
+event.listen(Todo.__table__, "after_create", DDL(POSTGRESQL_COUNTS_FUNCTION).execute_if(dialect="postgresql"))
+for operation, transition in POSTGRESQL_COUNTS_TRIGGERS.items():
+    event.listen(
+        Todo.__table__,
+        "after_create",
+        DDL(
+            f"CREATE TRIGGER todos_counts_{operation.lower()} AFTER {operation} ON todos "
+            f"REFERENCING {transition} FOR EACH STATEMENT EXECUTE FUNCTION todos_update_counts()"
+        ).execute_if(dialect="postgresql"),
+    )
+
+# 全文搜索
+# SQLite使用无内容的FTS5虚拟表，只保存索引不重复保存文本，由触发器与todos表同步。
+# trigram分词器按三字符切分，可以匹配任意位置的子串（包括中文和词前缀），
+# 少于三个字符的搜索词无法使用该索引。
+# owner_key列索引所有者ID加上首尾定界符，搜索同时匹配该列，只读取请求所有者的记录；
+# trigram分词器不区分大小写，匹配后仍需按owner_id筛选
+todos_fts = table(
+    "todos_fts", column("rowid"), column("title"), column("description"), column("owner_key"), column("rank")
+)
+
+
+def fts_owner_key(owner_id):
+    """
+    全文索引中所有者的索引值，定界符不会出现在所有者ID中，按短语匹配时只匹配完整的所有者ID
+
+    Args:
+        owner_id: 所有者ID，字符串或SQL表达式
+
+    Returns:
+        所有者的索引值，参数为SQL表达式时返回SQL表达式
+    """
+    return "<" + owner_id + ">"
+
+
+event.listen(
+    Todo.__table__,
+    "after_create",
+    DDL(
+        "CREATE VIRTUAL TABLE todos_fts USING fts5("
+        "title, description, owner_key, content='', tokenize='trigram')"
+    ).execute_if(dialect="sqlite"),
+)
+# 相关度只按标题和描述计算，所有者列的匹配不影响排序
+FTS_RANK = "INSERT INTO todos_fts(todos_fts, rank) VALUES ('rank', 'bm25(1.0, 1.0, 0.0)')"
+event.listen(Todo.__table__, "after_create", DDL(FTS_RANK).execute_if(dialect="sqlite"))
+
+FTS_INSERT = (
+    "INSERT INTO todos_fts(rowid, title, description, owner_key) "
+    "VALUES (new.id, new.title, new.description, '<' || new.owner_id || '>');"
+)
+FTS_DELETE = (
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description, owner_key) "
+    "VALUES ('delete', old.id, old.title, old.description, '<' || old.owner_id || '>');"
+)
+# 只有标题或描述变化时才更新索引，完成状态的切换不触发；批量导入的记录由导入统一建立索引
+FTS_TRIGGERS = {
+    "insert": ("AFTER INSERT ON todos WHEN new.change_version >= 0", FTS_INSERT),
+    "delete": ("AFTER DELETE ON todos", FTS_DELETE),
+    "update": ("AFTER UPDATE OF title, description ON todos", f"{FTS_DELETE} {FTS_INSERT}"),
+}
+for name, (timing, body) in FTS_TRIGGERS.items():
+    event.listen(
+        Todo.__table__,
+        "after_create",
+        DDL(f"CREATE TRIGGER todos_fts_{name} {timing} BEGIN {body} END").execute_if(dialect="sqlite"),
+    )
+
+# PostgreSQL在表达式上建立GIN索引，查询必须使用完全相同的表达式才能命中索引。
+# simple配置不做词干提取，与中文内容和前缀匹配的行为一致。
+# 所有者ID不经分词作为权重A的词素加入文档，标题和描述的词素为默认的权重D，
+# 搜索同时匹配所有者词素，GIN索引只读取请求所有者的记录
+SEARCH_DOCUMENT = (
+    "(setweight(array_to_tsvector(ARRAY[owner_id]), 'A') "
+    "|| to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, '')))"
+)
+
+event.listen(
+    Todo.__table__,
+    "after_create",
+    DDL(f"CREATE INDEX ix_todos_search ON todos USING gin ({SEARCH_DOCUMENT})").execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,54 @@
+"""
+OpenAPI文档
+FastAPI默认在首次请求/openapi.json时生成文档；也可以在构建时预先生成，运行时直接读取:
+
+    python -m app.openapi openapi.json
+    OPENAPI_FILE=openapi.json python run.py
+"""
+import json
+import sys
+
+from fastapi import FastAPI
+
+
+def use_pregenerated_openapi(app: FastAPI, path: str) -> None:
+    """
+    使应用从预先生成的文件读取OpenAPI文档，文件在首次请求文档时读取
+
+    Args:
+        app: FastAPI应用
+        path: python -m app.openapi生成的文件路径
+    """
+    def openapi() -> dict:
+        if app.openapi_schema is None:
+            with open(path, encoding="utf-8") as f:
+                app.openapi_schema = json.load(f)
+        return app.openapi_schema
+
+    app.openapi = openapi
+
+
+def write_openapi(path: str) -> None:
+    """
+    生成OpenAPI文档并写入文件
+
+    Args:
+        path: 输出文件路径
+    """
+    from app.main import app
+
+    # 生成当前路由的文档，不读取已配置的预生成文件
+    schema = FastAPI.openapi(app)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(schema, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def main() -> None:
+    if len(sys.argv) != 2:
+        print("用法: python -m app.openapi <输出文件>")
+        sys.exit(2)
+    write_openapi(sys.argv[1])
+
+
+if __name__ == "__main__":
+    main()
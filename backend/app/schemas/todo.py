@@ -1,9 +1,11 @@
 """
 待办事项Pydantic模式
 """
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from typing import List, Optional
+from typing_extensions import TypedDict
 from datetime import datetime
+from app.core.pagination import MAX_ID, MIN_ID
 
 
 class TodoBase(BaseModel):
@@ -39,13 +41,99 @@ class TodoResponse(TodoBase):
     待办事项响应模式
     继承自TodoBase，用于API响应，包含数据库字段
     """
+    # 允许从ORM模型中读取数据
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
-    
-    class Config:
-        """
-        配置选项
-        允许从ORM模型中读取数据
-        """
-        orm_mode = True
+
+
+class TodoRow(TypedDict):
+    """
+    待办事项列表行
+    字段及顺序与TodoResponse一致，用于列表接口直接序列化数据库查询结果，
+    数据来自数据库，不需要再逐行校验
+    """
+    title: str
+    description: Optional[str]
+    completed: bool
+    id: int
+    created_at: datetime
+    updated_at: Optional[datetime]
+
+
+# 列表行的序列化器，dump_json在pydantic-core中直接生成JSON字节
+todo_rows_adapter = TypeAdapter(List[TodoRow])
+# 单行的序列化器，用于逐行输出的NDJSON导出
+todo_row_adapter = TypeAdapter(TodoRow)
+
+
+class TodoChanges(TypedDict):
+    """
+    增量同步响应
+    包含本次同步到的数据版本号、之后新建或修改的待办事项、已删除的待办事项ID，以及是否还有后续变更
+    """
+    version: int
+    todos: List[TodoRow]
+    deleted: List[int]
+    has_more: bool
+
+
+# 增量同步响应的序列化器
+todo_changes_adapter = TypeAdapter(TodoChanges)
+
+
+class TodoBatchUpdate(TodoUpdate):
+    """
+    批量更新待办事项模式
+    在TodoUpdate基础上增加待更新的待办事项ID
+    """
+    id: int = Field(..., ge=MIN_ID, le=MAX_ID)
+
+
+class TodoBatchItemResult(BaseModel):
+    """
+    批量操作单项结果模式
+    按请求中的顺序返回每一项的处理结果
+    """
+    index: int
+    id: Optional[int] = None
+    status: str
+    todo: Optional[TodoResponse] = None
+
+
+class TodoBatchResponse(BaseModel):
+    """
+    批量操作响应模式
+    包含每一项的处理结果
+    """
+    results: List[TodoBatchItemResult]
+
+
+class TodoImportError(BaseModel):
+    """
+    导入错误模式
+    记录导入文件中无法导入的行及原因
+    """
+    line: int
+    error: str
+
+
+class TodoImportResponse(BaseModel):
+    """
+    导入响应模式
+    包含导入成功和失败的行数，以及失败行的错误信息
+    """
+    imported: int
+    failed: int
+    errors: List[TodoImportError]
+
+
+class TodoStats(BaseModel):
+    """
+    待办事项计数模式
+    """
+    total: int
+    active: int
+    completed: int
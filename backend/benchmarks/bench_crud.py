@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+TodoCRUD基准测试
+在不同数据规模下测量TodoCRUD每个方法的耗时
+
+用法（在backend目录下运行）:
+    python -m benchmarks.bench_crud --sizes 1k,100k,1m --repeat 50
+"""
+import argparse
+import random
+from typing import List
+
+from benchmarks.common import (
+    Case,
+    parse_sizes,
+    print_results,
+    run_cases,
+    seed,
+    use_temp_database,
+    write_results,
+)
+
+use_temp_database()
+
+from sqlalchemy import func, select  # noqa: E402
+
+from app.core.database import SessionLocal  # noqa: E402
+from app.crud.todo import todo_crud  # noqa: E402
+from app.models.todo import Todo  # noqa: E402
+from app.schemas.todo import TodoBatchUpdate, TodoCreate, TodoUpdate  # noqa: E402
+
+# 批量操作每次处理的记录数
+BATCH_SIZE = 100
+
+
+def crud_cases(size: int, rng: random.Random) -> List[Case]:
+    """
+    生成TodoCRUD的基准测试用例
+    只读用例在前，写操作用例在后，删除全部已完成/全部待办事项的用例只运行一次
+
+    Args:
+        size: 当前数据规模
+        rng: 随机数生成器，用于选择待读取和修改的记录
+
+    Returns:
+        List[Case]: 用例列表
+    """
+    db = SessionLocal()
+    min_id, max_id = db.execute(select(func.min(Todo.id), func.max(Todo.id))).one()
+    middle_id = (min_id + max_id) // 2
+    scan_repeat = 3 if size >= 100_000 else None
+
+    def fresh_session():
+        # 清空标识映射，避免读取到会话中已加载的对象而跳过数据转换
+        db.expunge_all()
+        return db
+
+    def random_id() -> int:
+        # 只选择前半部分的ID，后面的用例会删除新建的记录，但不会删除种子数据
+        fresh_session()
+        return rng.randint(min_id, middle_id)
+
+    def random_ids() -> List[int]:
+        return [random_id() for _ in range(BATCH_SIZE)]
+
+    def load_random_todo() -> Todo:
+        return todo_crud.get_todo(fresh_session(), random_id())
+
+    def create_one() -> int:
+        return todo_crud.create_todo(fresh_session(), TodoCreate(title="待删除")).id
+
+    def create_batch() -> List[int]:
+        rows = todo_crud.create_todos(fresh_session(), [TodoCreate(title="待删除")] * BATCH_SIZE)
+        return [row.id for row in rows]
+
+    return [
+        Case("get_todo", lambda todo_id: todo_crud.get_todo(db, todo_id), setup=random_id),
+        Case("get_todos", lambda s: todo_crud.get_todos(s, limit=100), setup=fresh_session),
+        Case("get_todos_offset_middle", lambda s: todo_crud.get_todos(s, skip=size // 2, limit=100), setup=fresh_session),
+        Case("get_todos_cursor_middle", lambda s: todo_crud.get_todos(s, limit=100, after_id=middle_id), setup=fresh_session),
+        Case(
+            "get_todos_sort_updated_at_desc",
+            lambda s: todo_crud.get_todos(s, limit=100, sort="updated_at", descending=True),
+            setup=fresh_session,
+        ),
+        Case("get_active_todos", lambda s: todo_crud.get_active_todos(s, limit=100), setup=fresh_session),
+        Case("get_completed_todos", lambda s: todo_crud.get_completed_todos(s, limit=100), setup=fresh_session),
+        Case("get_todo_rows_1000", lambda s: todo_crud.get_todo_rows(s, limit=1000), setup=fresh_session),
+        Case(
+            "search_todo_rows",
+            lambda s: todo_crud.search_todo_rows(s, f"待办事项{size // 2}", limit=100),
+            setup=fresh_session,
+        ),
+        Case("get_version", lambda s: todo_crud.get_version(s), setup=fresh_session),
+        Case(
+            "get_changes_last_100",
+            lambda s: todo_crud.get_changes(s, since=max(todo_crud.get_version(s) - 100, 1)),
+            setup=fresh_session,
+        ),
+        Case(
+            "iter_todo_batches_full_scan",
+            lambda s: sum(len(batch) for batch in todo_crud.iter_todo_batches(s)),
+            setup=fresh_session,
+            repeat=scan_repeat,
+        ),
+        Case("create_todo", lambda s: todo_crud.create_todo(s, TodoCreate(title="新建")), setup=fresh_session),
+        Case(
+            "update_todo",
+            lambda todo_id: todo_crud.update_todo(db, todo_id, TodoUpdate(completed=True)),
+            setup=random_id,
+        ),
+        Case(
+            "update_todo_if_match",
+            lambda todo: todo_crud.update_todo(db, todo.id, TodoUpdate(title="条件更新"), expected=todo),
+            setup=load_random_todo,
+        ),
+        Case("delete_todo", lambda todo_id: todo_crud.delete_todo(db, todo_id), setup=create_one),
+        Case(
+            f"create_todos_{BATCH_SIZE}",
+            lambda s: todo_crud.create_todos(s, [TodoCreate(title="批量新建")] * BATCH_SIZE),
+            setup=fresh_session,
+        ),
+        Case(
+            f"update_todos_{BATCH_SIZE}",
+            lambda ids: todo_crud.update_todos(db, [TodoBatchUpdate(id=i, completed=False) for i in ids]),
+            setup=random_ids,
+        ),
+        Case(f"delete_todos_{BATCH_SIZE}", lambda ids: todo_crud.delete_todos(db, ids), setup=create_batch),
+        Case(
+            "import_todos_1000",
+            lambda s: todo_crud.import_todos(s, [TodoCreate(title="导入")] * 1000),
+            setup=fresh_session,
+        ),
+        Case("delete_completed_todos", lambda s: todo_crud.delete_completed_todos(s), setup=fresh_session, repeat=1, warmup=0),
+        Case("delete_all_todos", lambda s: todo_crud.delete_all_todos(s), setup=fresh_session, repeat=1, warmup=0),
+        Case("purge_deleted_todos_500", lambda s: todo_crud.purge_deleted_todos(s, 500), setup=fresh_session),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TodoCRUD基准测试")
+    parser.add_argument("--sizes", default="1k,100k,1m", help="逗号分隔的数据规模，支持k/m后缀")
+    parser.add_argument("--repeat", type=int, default=50, help="每个用例的运行次数")
+    parser.add_argument("--seed", type=int, default=42, help="随机数种子")
+    parser.add_argument("--output", help="结果文件路径，默认保存到benchmarks/results目录")
+    args = parser.parse_args()
+
+    results = []
+    for size in parse_sizes(args.sizes):
+        print(f"数据规模: {size}", flush=True)
+        seed(size)
+        results += run_cases(crud_cases(size, random.Random(args.seed)), size, args.repeat)
+
+    print_results(results)
+    output = write_results("crud", results, args.output, sizes=args.sizes, repeat=args.repeat, seed=args.seed)
+    print(f"结果已保存到 {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+API接口基准测试
+在不同数据规模下通过TestClient在进程内测量每个接口的耗时，包括路由、校验、序列化和中间件的开销
+
+用法（在backend目录下运行）:
+    python -m benchmarks.bench_endpoints --sizes 1k,100k,1m --repeat 50
+"""
+import argparse
+import json
+import random
+from typing import List
+
+from benchmarks.common import (
+    Case,
+    parse_sizes,
+    print_results,
+    run_cases,
+    seed,
+    use_temp_database,
+    write_results,
+)
+
+use_temp_database()
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from app.core.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.todo import Todo  # noqa: E402
+
+API = "/api/v1/todos"
+
+# 批量接口每次处理的记录数
+BATCH_SIZE = 100
+
+
+def check(response):
+    """确认请求成功，避免把错误响应的耗时计入结果"""
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.method} {response.request.url} 返回 {response.status_code}: {response.text}")
+    return response
+
+
+def endpoint_cases(client: TestClient, size: int, rng: random.Random) -> List[Case]:
+    """
+    生成API接口的基准测试用例
+    只读用例在前，写操作用例在后，删除全部已完成/全部待办事项的用例只运行一次
+
+    Args:
+        client: 测试客户端
+        size: 当前数据规模
+        rng: 随机数生成器，用于选择待读取和修改的记录
+
+    Returns:
+        List[Case]: 用例列表
+    """
+    with SessionLocal() as db:
+        min_id, max_id = db.execute(select(func.min(Todo.id), func.max(Todo.id))).one()
+    middle_id = (min_id + max_id) // 2
+    scan_repeat = 3 if size >= 100_000 else None
+    cursor = check(client.get(f"{API}?skip={size // 2 - 100}&limit=100")).headers["X-Next-Cursor"]
+    title_cursor = check(client.get(f"{API}?sort=title&skip={size // 2 - 100}&limit=100")).headers["X-Next-Cursor"]
+    list_etag = check(client.get(API)).headers["ETag"]
+    import_body = "\n".join(json.dumps({"title": f"导入{i}"}) for i in range(1000)).encode("utf-8")
+
+    def random_id() -> int:
+        # 只选择前半部分的ID，后面的用例会删除新建的记录，但不会删除种子数据
+        return rng.randint(min_id, middle_id)
+
+    def random_item() -> tuple:
+        todo_id = random_id()
+        return todo_id, check(client.get(f"{API}/{todo_id}")).headers["ETag"]
+
+    def create_one() -> int:
+        return check(client.post(API, json={"title": "待删除"})).json()["id"]
+
+    def create_batch() -> List[int]:
+        response = check(client.post(f"{API}/batch", json=[{"title": "待删除"}] * BATCH_SIZE))
+        return [result["id"] for result in response.json()["results"]]
+
+    return [
+        Case("GET /todos", lambda: check(client.get(API))),
+        Case("GET /todos?limit=1000", lambda: check(client.get(f"{API}?limit=1000"))),
+        Case("GET /todos?skip=middle", lambda: check(client.get(f"{API}?skip={size // 2}&limit=100"))),
+        Case("GET /todos?cursor=middle", lambda: check(client.get(f"{API}?cursor={cursor}"))),
+        Case("GET /todos?filter=completed", lambda: check(client.get(f"{API}?filter=completed"))),
+        Case("GET /todos If-None-Match", lambda: check(client.get(API, headers={"If-None-Match": list_etag}))),
+        Case("GET /todos?sort=title", lambda: check(client.get(f"{API}?sort=title&limit=100"))),
+        Case("GET /todos?sort=title&cursor=middle", lambda: check(client.get(f"{API}?sort=title&cursor={title_cursor}"))),
+        Case("GET /todos/search", lambda: check(client.get(f"{API}/search", params={"q": f"待办事项{size // 2}"}))),
+        Case("GET /todos/{todo_id}", lambda todo_id: check(client.get(f"{API}/{todo_id}")), setup=random_id),
+        Case(
+            "GET /todos/{todo_id} If-None-Match",
+            lambda item: check(client.get(f"{API}/{item[0]}", headers={"If-None-Match": item[1]})),
+            setup=random_item,
+        ),
+        Case("GET /todos/export", lambda: check(client.get(f"{API}/export")), repeat=scan_repeat),
+        Case("POST /todos", lambda: check(client.post(API, json={"title": "新建", "description": "描述"}))),
+        Case(
+            "PUT /todos/{todo_id}",
+            lambda todo_id: check(client.put(f"{API}/{todo_id}", json={"title": "更新"})),
+            setup=random_id,
+        ),
+        Case(
+            "PUT /todos/{todo_id} If-Match",
+            lambda item: check(client.put(f"{API}/{item[0]}", json={"title": "条件更新"}, headers={"If-Match": item[1]})),
+            setup=random_item,
+        ),
+        Case("PUT /todos/{todo_id}/complete", lambda todo_id: check(client.put(f"{API}/{todo_id}/complete")), setup=random_id),
+        Case("DELETE /todos/{todo_id}", lambda todo_id: check(client.delete(f"{API}/{todo_id}")), setup=create_one),
+        Case(
+            f"POST /todos/batch {BATCH_SIZE}",
+            lambda: check(client.post(f"{API}/batch", json=[{"title": "批量新建"}] * BATCH_SIZE)),
+        ),
+        Case(
+            f"PATCH /todos/batch {BATCH_SIZE}",
+            lambda ids: check(client.patch(f"{API}/batch", json=[{"id": i, "completed": False} for i in ids])),
+            setup=lambda: [random_id() for _ in range(BATCH_SIZE)],
+        ),
+        Case(
+            f"DELETE /todos/batch {BATCH_SIZE}",
+            lambda ids: check(client.request("DELETE", f"{API}/batch", json=ids)),
+            setup=create_batch,
+        ),
+        Case("POST /todos/import 1000", lambda: check(client.post(f"{API}/import", content=import_body))),
+        Case("DELETE /todos/completed", lambda: check(client.delete(f"{API}/completed")), repeat=1, warmup=0),
+        Case("DELETE /todos", lambda: check(client.delete(API)), repeat=1, warmup=0),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="API接口基准测试")
+    parser.add_argument("--sizes", default="1k,100k,1m", help="逗号分隔的数据规模，支持k/m后缀")
+    parser.add_argument("--repeat", type=int, default=50, help="每个用例的运行次数")
+    parser.add_argument("--seed", type=int, default=42, help="随机数种子")
+    parser.add_argument("--output", help="结果文件路径，默认保存到benchmarks/results目录")
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    results = []
+    for size in parse_sizes(args.sizes):
+        print(f"数据规模: {size}", flush=True)
+        seed(size)
+        results += run_cases(endpoint_cases(client, size, random.Random(args.seed)), size, args.repeat)
+
+    print_results(results)
+    output = write_results("endpoints", results, args.output, sizes=args.sizes, repeat=args.repeat, seed=args.seed)
+    print(f"结果已保存到 {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+列表序列化基准测试
+比较列表接口原先的序列化路径（查询ORM对象，经response_model逐行校验后用标准库编码）
+与快速序列化路径（只查询列值，由TypeAdapter.dump_json直接编码）的耗时
+
+用法（在backend目录下运行）:
+    python -m benchmarks.bench_serialization --rows 1000 --repeat 50
+"""
+import argparse
+import json
+from typing import List
+
+from benchmarks.common import measure, seed, use_temp_database, write_results
+
+use_temp_database()
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.core.database import SessionLocal  # noqa: E402
+from app.crud.todo import todo_crud  # noqa: E402
+from app.schemas.todo import TodoResponse, todo_rows_adapter  # noqa: E402
+
+# FastAPI处理response_model=List[TodoResponse]时使用的校验与序列化
+response_adapter = TypeAdapter(List[TodoResponse])
+
+
+def response_model_path(rows: int) -> bytes:
+    """原先的路径：查询ORM对象，逐行校验为TodoResponse，转换为dict后用标准库编码"""
+    with SessionLocal() as db:
+        todos = todo_crud.get_todos(db, limit=rows)
+        content = response_adapter.dump_python(response_adapter.validate_python(todos), mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(rows: int) -> bytes:
+    """快速序列化路径：只查询列值，由pydantic-core直接编码为JSON"""
+    with SessionLocal() as db:
+        return todo_rows_adapter.dump_json(todo_crud.get_todo_rows(db, limit=rows))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="列表序列化基准测试")
+    parser.add_argument("--rows", type=int, default=1000, help="每次返回的记录数")
+    parser.add_argument("--repeat", type=int, default=50, help="每条路径的运行次数")
+    parser.add_argument("--output", help="结果文件路径，默认保存到benchmarks/results目录")
+    args = parser.parse_args()
+
+    seed(args.rows)
+    assert json.loads(response_model_path(args.rows)) == json.loads(fast_path(args.rows))
+
+    results = [
+        {"name": name, "size": args.rows, "unit": "ms", **measure(lambda: func(args.rows), args.repeat)}
+        for name, func in (("serialize_response_model", response_model_path), ("serialize_fast", fast_path))
+    ]
+    baseline, fast = results[0]["median"], results[1]["median"]
+    per_1000 = 1000 / args.rows
+    print(f"记录数: {args.rows}，运行次数: {args.repeat}")
+    print(f"response_model路径: {baseline:.2f} ms（每1000行 {baseline * per_1000:.2f} ms）")
+    print(f"快速序列化路径:     {fast:.2f} ms（每1000行 {fast * per_1000:.2f} ms）")
+    print(f"加速比: {baseline / fast:.2f}x")
+    output = write_results("serialization", results, args.output, rows=args.rows, repeat=args.repeat)
+    print(f"结果已保存到 {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+启动耗时基准测试
+每次在新的Python进程中导入app.main、运行应用启动（lifespan）并处理第一个请求，统计各阶段的耗时，
+衡量工作进程和扩容实例从启动到可以处理请求的时间。ready（导入+启动+第一个请求）的中位数
+超过--budget时以非零状态码退出，可用于CI；与历史结果对比使用benchmarks.compare
+
+用法（在backend目录下运行）:
+    python -m benchmarks.bench_startup --repeat 10 --budget 2500
+    python -m benchmarks.bench_startup --schema-setup skip
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from benchmarks.common import print_results, seed, summarize, use_temp_database, write_results
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 在子进程中运行，输出各阶段的耗时（毫秒）
+CHILD_SCRIPT = """
+import asyncio
+import json
+import time
+
+import httpx
+
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+
+async def main():
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            response = await client.get("/api/v1/todos")
+        assert response.status_code == 200, response.status_code
+        return started, time.perf_counter()
+
+
+started, responded = asyncio.run(main())
+print(json.dumps({
+    "import": (imported - start) * 1000,
+    "lifespan": (started - imported) * 1000,
+    "first_request": (responded - started) * 1000,
+    "ready": (responded - start) * 1000,
+}))
+"""
+
+STAGES = ("import", "lifespan", "first_request", "ready", "process")
+
+
+def run_once(env: Dict[str, str]) -> Dict[str, float]:
+    """
+    在新进程中启动应用并处理第一个请求
+
+    Args:
+        env: 子进程的环境变量
+
+    Returns:
+        Dict[str, float]: 各阶段耗时（毫秒），process为包括解释器启动和退出在内的进程总耗时
+    """
+    begin = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    timings["process"] = (time.perf_counter() - begin) * 1000
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="启动耗时基准测试")
+    parser.add_argument("--repeat", type=int, default=10, help="启动次数")
+    parser.add_argument("--size", type=int, default=1000, help="数据库中的待办事项数")
+    parser.add_argument(
+        "--schema-setup", default="create", choices=["create", "check", "skip"], help="启动时的表结构处理方式"
+    )
+    parser.add_argument("--budget", type=float, default=2500.0, help="ready中位数的上限（毫秒），0表示不检查")
+    parser.add_argument("--output", help="结果文件路径，默认保存到benchmarks/results目录")
+    args = parser.parse_args()
+
+    use_temp_database()
+    seed(args.size)
+    env = dict(os.environ, DB_SCHEMA_SETUP=args.schema_setup, LOG_LEVEL="WARNING")
+    # 预热一次，使.pyc缓存和数据库文件都已就绪，与实际部署中的镜像一致
+    run_once(env)
+
+    samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    for index in range(args.repeat):
+        for stage, value in run_once(env).items():
+            samples[stage].append(value)
+        print(f"  第{index + 1}次: ready {samples['ready'][-1]:.1f} ms", flush=True)
+
+    results = [
+        {"name": f"startup:{stage}", "size": args.size, "unit": "ms", **summarize(samples[stage])}
+        for stage in STAGES
+    ]
+    print_results(results)
+    output = write_results(
+        "startup", results, args.output, repeat=args.repeat, schema_setup=args.schema_setup, budget=args.budget
+    )
+    print(f"结果已保存到 {output}")
+
+    ready = results[STAGES.index("ready")]["median"]
+    if args.budget and ready > args.budget:
+        print(f"启动耗时{ready:.1f} ms超过预算{args.budget:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
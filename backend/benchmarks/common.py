@@ -0,0 +1,270 @@
+"""
+基准测试公共工具
+包括临时数据库、测试数据生成、计时统计和结果保存
+
+注意：使用临时数据库时需要在导入app之前调用use_temp_database
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+# 基准测试结果的默认保存目录
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def use_temp_database() -> str:
+    """
+    使用临时目录下的SQLite数据库，避免污染项目中的todos.db
+    必须在导入app之前调用
+
+    Returns:
+        str: 数据库URL
+    """
+    db_dir = tempfile.mkdtemp(prefix="todos-bench-")
+    url = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    os.environ["DATABASE_URL"] = url
+    # 基准测试关注数据库和序列化的开销，关闭读缓存
+    os.environ.setdefault("CACHE_ENABLED", "False")
+    return url
+
+
+def seed(rows: int, chunk_size: int = 50_000) -> None:
+    """
+    清空并写入测试数据
+    每第三项为已完成，标题和描述的长度与真实数据接近
+
+    Args:
+        rows: 待办事项数量
+        chunk_size: 每个事务插入的记录数
+    """
+    from sqlalchemy import delete, insert
+
+    from app.core.database import Base, SessionLocal, engine
+    from app.models.todo import Todo
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.execute(delete(Todo))
+        db.commit()
+        for start in range(0, rows, chunk_size):
+            db.execute(
+                insert(Todo.__table__),
+                [
+                    {
+                        "title": f"待办事项{i}",
+                        "description": f"第{i}条基准测试数据，用于衡量查询和序列化的耗时",
+                        "completed": i % 3 == 0,
+                    }
+                    for i in range(start, min(start + chunk_size, rows))
+                ],
+            )
+            db.commit()
+
+
+def percentile(samples: List[float], percent: float) -> float:
+    """
+    计算百分位数（线性插值）
+
+    Args:
+        samples: 样本
+        percent: 百分位，如95
+
+    Returns:
+        float: 百分位数
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """
+    汇总耗时样本
+
+    Args:
+        samples: 耗时样本（毫秒）
+
+    Returns:
+        Dict[str, float]: 样本数、最小值、中位数、平均值、p95、p99和最大值
+    """
+    return {
+        "count": len(samples),
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+        "max": max(samples),
+    }
+
+
+def measure(
+    func: Callable[[], object],
+    repeat: int,
+    setup: Optional[Callable[[], object]] = None,
+    warmup: int = 1,
+) -> Dict[str, float]:
+    """
+    多次运行并统计耗时
+
+    Args:
+        func: 待测函数
+        repeat: 计时的运行次数
+        setup: 每次运行前执行的准备函数，不计入耗时，返回值作为func的参数
+        warmup: 不计时的预热次数
+
+    Returns:
+        Dict[str, float]: summarize的统计结果（毫秒）
+    """
+    def run_once() -> float:
+        if setup is None:
+            start = time.perf_counter()
+            func()
+        else:
+            argument = setup()
+            start = time.perf_counter()
+            func(argument)
+        return (time.perf_counter() - start) * 1000
+
+    for _ in range(warmup):
+        run_once()
+    return summarize([run_once() for _ in range(repeat)])
+
+
+def git_commit() -> Optional[str]:
+    """获取当前git提交，不在git仓库中时返回None"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(name: str, results: List[dict], output: Optional[str] = None, **parameters) -> str:
+    """
+    保存基准测试结果
+    每条结果以name和size标识，benchmarks.compare按此对比两次运行的结果
+
+    Args:
+        name: 基准测试名称
+        results: 结果列表
+        output: 输出文件路径，默认为results/<name>-<提交>.json
+        parameters: 运行参数，一并保存
+
+    Returns:
+        str: 输出文件路径
+    """
+    commit = git_commit()
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{name}-{commit or 'nogit'}.json")
+    document = {
+        "benchmark": name,
+        "metadata": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "parameters": parameters,
+        },
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    return output
+
+
+def print_results(results: List[dict]) -> None:
+    """
+    以表格形式输出结果
+
+    Args:
+        results: 结果列表，每项包含name、size以及summarize的统计值
+    """
+    print(f"{'名称':<36}{'规模':>10}{'中位数ms':>12}{'p95 ms':>12}{'p99 ms':>12}")
+    for result in results:
+        print(
+            f"{result['name']:<36}{result.get('size', ''):>10}"
+            f"{result['median']:>12.3f}{result['p95']:>12.3f}{result['p99']:>12.3f}"
+        )
+
+
+class Case:
+    """
+    基准测试用例
+
+    Args:
+        name: 用例名称
+        func: 待测函数，提供setup时接收setup的返回值
+        setup: 每次运行前执行的准备函数，不计入耗时
+        repeat: 运行次数，默认使用命令行参数；全表扫描、删除全部等开销大的用例可以单独指定
+        warmup: 不计时的预热次数
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        setup: Optional[Callable[[], object]] = None,
+        repeat: Optional[int] = None,
+        warmup: int = 1,
+    ):
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.repeat = repeat
+        self.warmup = warmup
+
+
+def run_cases(cases: List[Case], size: int, repeat: int) -> List[dict]:
+    """
+    依次运行用例并输出进度
+
+    Args:
+        cases: 用例列表，按顺序运行，会修改数据的用例应放在最后
+        size: 当前数据规模
+        repeat: 默认运行次数
+
+    Returns:
+        List[dict]: 每个用例的统计结果
+    """
+    results = []
+    for case in cases:
+        stats = measure(case.func, case.repeat or repeat, setup=case.setup, warmup=case.warmup)
+        result = {"name": case.name, "size": size, "unit": "ms", **stats}
+        print(f"  {case.name:<40}{result['median']:>10.3f} ms", flush=True)
+        results.append(result)
+    return results
+
+
+def parse_sizes(value: str) -> List[int]:
+    """
+    解析命令行中的数据规模列表，支持k/m后缀，如1k,100k,1m
+
+    Args:
+        value: 逗号分隔的数据规模
+
+    Returns:
+        List[int]: 数据规模列表
+    """
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    sizes = []
+    for item in value.split(","):
+        item = item.strip().lower()
+        if item[-1] in multipliers:
+            sizes.append(int(float(item[:-1]) * multipliers[item[-1]]))
+        else:
+            sizes.append(int(item))
+    return sizes
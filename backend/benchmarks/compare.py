@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+对比两次基准测试的结果
+按名称和数据规模匹配结果，输出指标的变化，超过阈值的退化以非零状态码退出，可用于CI
+
+用法（在backend目录下运行）:
+    python -m benchmarks.compare benchmarks/results/crud-abc1234.json benchmarks/results/crud-def5678.json
+    python -m benchmarks.compare old.json new.json --metric p95 --threshold 15
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Tuple
+
+# 数值越大越好的指标，其余指标（耗时）数值越小越好
+HIGHER_IS_BETTER = {"throughput"}
+
+
+def load_results(path: str) -> Dict[Tuple[str, int], dict]:
+    """
+    读取结果文件
+
+    Args:
+        path: write_results保存的结果文件
+
+    Returns:
+        Dict[Tuple[str, int], dict]: 以(名称, 数据规模)为键的结果
+    """
+    with open(path, encoding="utf-8") as f:
+        document = json.load(f)
+    return {(result["name"], result.get("size", 0)): result for result in document["results"]}
+
+
+def compare(baseline: Dict[Tuple[str, int], dict], current: Dict[Tuple[str, int], dict], metric: str, threshold: float) -> int:
+    """
+    输出两次结果中共有用例的指标变化
+
+    Args:
+        baseline: 基准结果
+        current: 当前结果
+        metric: 对比的指标，如median、p95、throughput
+        threshold: 判定为退化的变化百分比
+
+    Returns:
+        int: 退化的用例数
+    """
+    regressions = 0
+    print(f"{'名称':<40}{'规模':>10}{'基准':>12}{'当前':>12}{'变化':>10}")
+    for key in sorted(baseline.keys() & current.keys()):
+        old, new = baseline[key].get(metric), current[key].get(metric)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        worse = -change if metric in HIGHER_IS_BETTER else change
+        marker = ""
+        if worse > threshold:
+            regressions += 1
+            marker = "  退化"
+        elif worse < -threshold:
+            marker = "  提升"
+        print(f"{key[0]:<40}{key[1]:>10}{old:>12.3f}{new:>12.3f}{change:>+9.1f}%{marker}")
+    for key in sorted(baseline.keys() - current.keys()):
+        print(f"{key[0]:<40}{key[1]:>10}  仅存在于基准结果")
+    for key in sorted(current.keys() - baseline.keys()):
+        print(f"{key[0]:<40}{key[1]:>10}  仅存在于当前结果")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="对比两次基准测试的结果")
+    parser.add_argument("baseline", help="基准结果文件")
+    parser.add_argument("current", help="当前结果文件")
+    parser.add_argument("--metric", default="median", help="对比的指标：median、p95、p99、mean、throughput等")
+    parser.add_argument("--threshold", type=float, default=10.0, help="判定为退化的变化百分比")
+    args = parser.parse_args()
+
+    regressions = compare(load_results(args.baseline), load_results(args.current), args.metric, args.threshold)
+    if regressions:
+        print(f"{regressions}个用例的{args.metric}退化超过{args.threshold}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+本地负载测试
+在子进程中启动uvicorn，使用httpx异步客户端按场景并发发送请求，统计每类请求的p50/p95/p99延迟和吞吐量
+
+用法（在backend目录下运行）:
+    python -m benchmarks.load_test --size 100k --concurrency 50 --duration 30 --scenario mixed
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+from benchmarks.common import parse_sizes, seed, summarize, use_temp_database, write_results
+
+use_temp_database()
+
+from sqlalchemy import func, select  # noqa: E402
+
+from app.core.database import SessionLocal  # noqa: E402
+from app.models.todo import Todo  # noqa: E402
+
+API = "/api/v1/todos"
+
+# 各场景中每类请求的权重
+SCENARIOS: Dict[str, Dict[str, int]] = {
+    "read": {"list": 60, "item": 40},
+    "mixed": {"list": 50, "item": 30, "complete": 10, "create": 10},
+    "write": {"list": 20, "complete": 40, "create": 30, "delete": 10},
+    # 频繁切换完成状态，用于对比开启和关闭合并提交（GROUP_COMMIT_ENABLED）的写吞吐量
+    "toggle": {"complete": 50, "uncomplete": 50},
+}
+
+
+def free_port() -> int:
+    """获取一个空闲的本地端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, workers: int) -> subprocess.Popen:
+    """
+    在子进程中以生产模式启动服务（与run.py相同的启动方式），使用与当前进程相同的数据库
+
+    Args:
+        port: 监听端口
+        workers: 工作进程数
+
+    Returns:
+        subprocess.Popen: 服务进程
+    """
+    env = dict(
+        os.environ,
+        SERVER_MODE="production",
+        SERVER_HOST="127.0.0.1",
+        SERVER_PORT=str(port),
+        SERVER_WORKERS=str(workers),
+        SERVER_ACCESS_LOG="False",
+        LOG_LEVEL="WARNING",
+    )
+    # 不输出启动信息
+    return subprocess.Popen([sys.executable, "run.py"], env=env, stdout=subprocess.DEVNULL)
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 30.0) -> None:
+    """等待服务可以响应请求"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("服务启动超时")
+
+
+async def send(client: httpx.AsyncClient, operation: str, rng: random.Random, id_range: Tuple[int, int]) -> int:
+    """
+    发送一个指定类型的请求
+
+    Args:
+        client: HTTP客户端
+        operation: 请求类型
+        rng: 随机数生成器
+        id_range: 种子数据的ID范围
+
+    Returns:
+        int: 响应状态码
+    """
+    todo_id = rng.randint(*id_range)
+    if operation == "list":
+        response = await client.get(API, params={"limit": 100, "skip": rng.randint(0, 1000)})
+    elif operation == "item":
+        response = await client.get(f"{API}/{todo_id}")
+    elif operation == "complete":
+        response = await client.put(f"{API}/{todo_id}/complete")
+    elif operation == "uncomplete":
+        response = await client.put(f"{API}/{todo_id}/uncomplete")
+    elif operation == "create":
+        response = await client.post(API, json={"title": "负载测试", "description": "新建"})
+    elif operation == "delete":
+        # 删除种子数据之后新建的记录，不影响其他请求读取种子数据
+        created = await client.post(API, json={"title": "待删除"})
+        response = await client.delete(f"{API}/{created.json()['id']}")
+    else:
+        raise ValueError(f"未知的请求类型: {operation}")
+    return response.status_code
+
+
+async def run_load(
+    base_url: str,
+    scenario: Dict[str, int],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    id_range: Tuple[int, int],
+    seed_value: int,
+) -> Tuple[Dict[str, List[float]], Dict[str, int], float]:
+    """
+    并发发送请求直到达到指定时长
+
+    Returns:
+        Tuple: 每类请求的延迟样本（毫秒）、每类请求的错误数、计时时长（秒）
+    """
+    operations = list(scenario)
+    weights = [scenario[operation] for operation in operations]
+    latencies: Dict[str, List[float]] = {operation: [] for operation in operations}
+    errors: Dict[str, int] = {operation: 0 for operation in operations}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        await wait_until_ready(client)
+        start = time.monotonic()
+        measure_from = start + warmup
+        stop_at = measure_from + duration
+
+        async def worker(index: int) -> None:
+            rng = random.Random(seed_value + index)
+            while (now := time.monotonic()) < stop_at:
+                operation = rng.choices(operations, weights)[0]
+                begin = time.perf_counter()
+                try:
+                    status = await send(client, operation, rng, id_range)
+                except httpx.HTTPError:
+                    status = 599
+                elapsed = (time.perf_counter() - begin) * 1000
+                if now < measure_from:
+                    continue
+                latencies[operation].append(elapsed)
+                if status >= 400:
+                    errors[operation] += 1
+
+        await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    return latencies, errors, duration
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="本地负载测试")
+    parser.add_argument("--size", default="100k", help="种子数据规模，支持k/m后缀")
+    parser.add_argument("--scenario", default="mixed", choices=sorted(SCENARIOS), help="请求场景")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发请求数")
+    parser.add_argument("--duration", type=float, default=30.0, help="计时时长（秒）")
+    parser.add_argument("--warmup", type=float, default=3.0, help="不计入结果的预热时长（秒）")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn工作进程数")
+    parser.add_argument("--seed", type=int, default=42, help="随机数种子")
+    parser.add_argument("--output", help="结果文件路径，默认保存到benchmarks/results目录")
+    args = parser.parse_args()
+
+    size = parse_sizes(args.size)[0]
+    print(f"写入种子数据: {size}", flush=True)
+    seed(size)
+    with SessionLocal() as db:
+        id_range = db.execute(select(func.min(Todo.id), func.max(Todo.id))).one()
+
+    port = free_port()
+    server = start_server(port, args.workers)
+    try:
+        latencies, errors, elapsed = asyncio.run(run_load(
+            f"http://127.0.0.1:{port}",
+            SCENARIOS[args.scenario],
+            args.concurrency,
+            args.duration,
+            args.warmup,
+            tuple(id_range),
+            args.seed,
+        ))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    results = []
+    all_samples = [sample for samples in latencies.values() for sample in samples]
+    groups = [(f"load:{args.scenario}:{operation}", samples) for operation, samples in latencies.items()]
+    groups.append((f"load:{args.scenario}:all", all_samples))
+    print(f"{'请求':<28}{'请求数':>8}{'错误':>6}{'吞吐量/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, samples in groups:
+        if not samples:
+            continue
+        operation = name.rsplit(":", 1)[1]
+        error_count = sum(errors.values()) if operation == "all" else errors[operation]
+        result = {
+            "name": name,
+            "size": size,
+            "unit": "ms",
+            **summarize(samples),
+            "throughput": len(samples) / elapsed,
+            "errors": error_count,
+        }
+        results.append(result)
+        print(
+            f"{operation:<28}{result['count']:>8}{error_count:>6}{result['throughput']:>10.1f}"
+            f"{result['median']:>10.2f}{result['p95']:>10.2f}{result['p99']:>10.2f}"
+        )
+
+    output = write_results(
+        "load",
+        results,
+        args.output,
+        size=size,
+        scenario=args.scenario,
+        concurrency=args.concurrency,
+        duration=args.duration,
+        workers=args.workers,
+    )
+    print(f"结果已保存到 {output}")
+
+
+if __name__ == "__main__":
+    main()
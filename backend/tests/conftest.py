@@ -0,0 +1,43 @@
+"""
+测试公共配置
+测试使用临时目录下的独立数据库，避免污染项目中的todos.db
+"""
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import event
+
+_test_db_dir = tempfile.mkdtemp(prefix="todos-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_test_db_dir, 'test.db')}"
+
+from app.core.cache import todo_cache  # noqa: E402
+from app.core.database import Base, engine  # noqa: E402
+from app.models.todo import Todo  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def clean_todos():
+    """每个测试开始前清空待办事项表"""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(Todo.__table__.delete())
+    # 直接通过SQL清空的数据不会经过CRUD，需要手动使缓存失效
+    todo_cache.clear()
+    yield
+
+
+@pytest.fixture
+def query_counter():
+    """
+    记录执行的SQL语句
+    返回语句列表，测试中可清空后再调用接口，断言接口执行的语句数量
+    """
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
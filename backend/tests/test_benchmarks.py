@@ -0,0 +1,52 @@
+"""
+基准测试工具测试用例
+"""
+import json
+import os
+
+from benchmarks.bench_startup import STAGES, run_once
+from benchmarks.common import parse_sizes, percentile, summarize, write_results
+from benchmarks.compare import compare, load_results
+
+
+def test_parse_sizes():
+    """测试解析数据规模"""
+    assert parse_sizes("1k,100k,1m") == [1_000, 100_000, 1_000_000]
+    assert parse_sizes("500, 2.5k") == [500, 2_500]
+
+
+def test_summarize():
+    """测试耗时统计"""
+    samples = [float(i) for i in range(1, 101)]
+    stats = summarize(samples)
+    assert stats["count"] == 100
+    assert stats["median"] == 50.5
+    assert percentile(samples, 95) == 95.05
+    assert stats["max"] == 100.0
+
+
+def test_compare_results(tmp_path):
+    """测试对比两次结果，超过阈值的退化被计数"""
+    baseline = write_results(
+        "crud", [{"name": "get_todo", "size": 1000, "median": 1.0}, {"name": "get_todos", "size": 1000, "median": 2.0}],
+        str(tmp_path / "baseline.json"),
+    )
+    current = write_results(
+        "crud", [{"name": "get_todo", "size": 1000, "median": 1.5}, {"name": "get_todos", "size": 1000, "median": 1.0}],
+        str(tmp_path / "current.json"),
+    )
+    with open(current, encoding="utf-8") as f:
+        assert json.load(f)["benchmark"] == "crud"
+    assert compare(load_results(baseline), load_results(current), "median", 10.0) == 1
+    # 吞吐量越大越好
+    assert compare(
+        {("load", 1): {"throughput": 100.0}}, {("load", 1): {"throughput": 50.0}}, "throughput", 10.0
+    ) == 1
+
+
+def test_startup_benchmark():
+    """测试启动耗时基准测试在新进程中完成启动并处理第一个请求"""
+    timings = run_once(dict(os.environ))
+    assert set(timings) == set(STAGES)
+    assert timings["ready"] >= timings["import"] + timings["first_request"]
+    assert timings["process"] > timings["ready"]
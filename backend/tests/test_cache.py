@@ -0,0 +1,152 @@
+"""
+读缓存测试用例
+"""
+import time
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import update
+
+from app.core.cache import MemoryCacheBackend, TodoCache, todo_cache
+from app.core.database import SessionLocal
+from app.main import app
+from app.models.todo import Todo
+
+client = TestClient(app)
+
+
+def test_memory_backend_lru_eviction():
+    """测试超过容量时淘汰最久未使用的缓存项"""
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("a", 1, ttl=60)
+    backend.set("b", 2, ttl=60)
+    assert backend.get("a") == 1
+    backend.set("c", 3, ttl=60)
+    assert backend.get("b") is None
+    assert backend.get("a") == 1
+    assert backend.get("c") == 3
+
+
+def test_memory_backend_ttl():
+    """测试缓存项过期"""
+    backend = MemoryCacheBackend()
+    backend.set("a", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert backend.get("a") is None
+
+
+def test_todo_cache_version():
+    """测试版本号按所有者缓存，写操作只使该所有者的版本号失效"""
+    cache = TodoCache(MemoryCacheBackend(), ttl=60, version_ttl=60)
+    assert cache.get_version("alice") is None
+    cache.set_version("alice", 3, time.time())
+    cache.set_version("bob", 5, time.time())
+    assert cache.get_version("alice") == 3
+    cache.invalidate("alice")
+    assert cache.get_version("alice") is None
+    assert cache.get_version("bob") == 5
+
+
+def test_todo_cache_version_loaded_before_invalidate():
+    """测试读取版本号期间发生的写操作使读取结果不被使用"""
+    cache = TodoCache(MemoryCacheBackend(), ttl=60, version_ttl=60)
+    loaded_at = time.time()
+    cache.invalidate("alice")
+    cache.set_version("alice", 3, loaded_at)
+    assert cache.get_version("alice") is None
+
+
+def test_todo_cache_version_ttl():
+    """测试缓存的版本号超过version_ttl后重新读取"""
+    cache = TodoCache(MemoryCacheBackend(), ttl=60, version_ttl=0.01)
+    cache.set_version("alice", 3, time.time())
+    time.sleep(0.02)
+    assert cache.get_version("alice") is None
+
+
+def test_cache_metrics():
+    """测试缓存命中和未命中计入监控指标"""
+    cache = TodoCache(MemoryCacheBackend(), ttl=60, version_ttl=1, name="test")
+    key = cache.key("item", 1)
+    cache.get(key)
+    cache.set(key, "value")
+    cache.get(key)
+    cache.get(key)
+    assert REGISTRY.get_sample_value("cache_requests_total", {"cache": "test", "result": "miss"}) == 1
+    assert REGISTRY.get_sample_value("cache_requests_total", {"cache": "test", "result": "hit"}) == 2
+
+
+def test_list_served_from_cache(query_counter):
+    """测试重复读取列表时不访问数据库，写操作后重新查询"""
+    client.post("/api/v1/todos", json={"title": "缓存任务"})
+    query_counter.clear()
+
+    first = client.get("/api/v1/todos?filter=active")
+    second = client.get("/api/v1/todos?filter=active")
+    assert first.json() == second.json()
+    # 第一次读取数据版本号和查询列表，第二次使用缓存的版本号和列表
+    assert len(query_counter) == 2
+    assert client.get("/api/v1/todos?filter=active", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    assert len(query_counter) == 2
+
+    todo_id = first.json()[0]["id"]
+    client.put(f"/api/v1/todos/{todo_id}/complete")
+    response = client.get("/api/v1/todos?filter=active")
+    assert response.json() == []
+
+
+def test_item_served_from_cache(query_counter):
+    """测试读取过列表后，重复读取单个待办事项时不访问数据库"""
+    todo_id = client.post("/api/v1/todos", json={"title": "缓存任务"}).json()["id"]
+    client.get("/api/v1/todos")
+    query_counter.clear()
+
+    first = client.get(f"/api/v1/todos/{todo_id}")
+    second = client.get(f"/api/v1/todos/{todo_id}")
+    assert first.json() == second.json()
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert len(query_counter) == 1
+
+    client.put(f"/api/v1/todos/{todo_id}", json={"title": "已修改"})
+    client.get("/api/v1/todos")
+    assert client.get(f"/api/v1/todos/{todo_id}").json()["title"] == "已修改"
+
+
+def test_write_keeps_other_owners_cache(query_counter):
+    """测试一个所有者的写操作不使其他所有者的缓存失效"""
+    client.post("/api/v1/todos", json={"title": "缓存任务"}, headers={"X-Owner-ID": "alice"})
+    client.get("/api/v1/todos", headers={"X-Owner-ID": "alice"})
+    query_counter.clear()
+
+    client.post("/api/v1/todos", json={"title": "其他所有者"}, headers={"X-Owner-ID": "bob"})
+    query_counter.clear()
+    response = client.get("/api/v1/todos", headers={"X-Owner-ID": "alice"})
+    assert [todo["title"] for todo in response.json()] == ["缓存任务"]
+    assert query_counter == []
+
+
+def test_cache_sees_other_worker_writes(monkeypatch):
+    """测试其他工作进程的写操作（不经过本进程的invalidate）在版本号的缓存时间之后可见"""
+    monkeypatch.setattr(todo_cache, "version_ttl", 0.05)
+    todo_id = client.post("/api/v1/todos", json={"title": "缓存任务"}).json()["id"]
+    etag = client.get("/api/v1/todos").headers["ETag"]
+    assert client.get(f"/api/v1/todos/{todo_id}").json()["title"] == "缓存任务"
+
+    # 直接写入数据库，模拟另一个工作进程处理的写请求
+    with SessionLocal() as db:
+        db.execute(update(Todo).where(Todo.id == todo_id).values(title="其他进程"))
+        db.commit()
+    time.sleep(0.1)
+
+    response = client.get("/api/v1/todos", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [todo["title"] for todo in response.json() if todo["id"] == todo_id] == ["其他进程"]
+    assert client.get(f"/api/v1/todos/{todo_id}").json()["title"] == "其他进程"
+
+
+def test_cache_stats_endpoint():
+    """测试缓存统计接口"""
+    response = client.get("/cache/stats")
+    assert response.status_code == 200
+    assert {"hits", "misses", "hit_ratio", "version_ttl"} <= response.json().keys()
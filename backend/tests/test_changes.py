@@ -0,0 +1,203 @@
+"""
+增量同步测试用例
+"""
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from alembic import command
+from alembic.config import Config
+from fastapi.testclient import TestClient
+from structlog.testing import capture_logs
+
+from app.core.database import SessionLocal, engine
+from app.crud.todo import todo_crud
+from app.jobs import compact_tombstones
+from app.main import app
+
+from tests.test_indexes import ALEMBIC_INI, query_plans
+
+client = TestClient(app)
+
+
+def changes(since: int, limit: int = 1000) -> dict:
+    """获取since之后的变更"""
+    response = client.get(f"/api/v1/todos/changes?since={since}&limit={limit}")
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_full_sync():
+    """测试since为0时返回全部待办事项"""
+    ids = [client.post("/api/v1/todos", json={"title": f"任务{i}"}).json()["id"] for i in range(3)]
+
+    result = changes(0)
+    assert [todo["id"] for todo in result["todos"]] == ids
+    assert result["todos"][0] == client.get(f"/api/v1/todos/{ids[0]}").json()
+    assert result["deleted"] == []
+    assert result["version"] == changes(result["version"])["version"]
+
+
+def test_changes_since_version():
+    """测试只返回指定版本之后新建、修改和删除的待办事项"""
+    ids = [client.post("/api/v1/todos", json={"title": f"任务{i}"}).json()["id"] for i in range(4)]
+    version = changes(0)["version"]
+
+    client.put(f"/api/v1/todos/{ids[2]}", json={"title": "修改后"})
+    client.put(f"/api/v1/todos/{ids[0]}/complete")
+    client.put(f"/api/v1/todos/{ids[2]}", json={"description": "再次修改"})
+    client.delete(f"/api/v1/todos/{ids[1]}")
+    new_id = client.post("/api/v1/todos", json={"title": "新任务"}).json()["id"]
+
+    result = changes(version)
+    # 多次修改的记录只返回一次最新内容，按变更顺序排列
+    assert [todo["id"] for todo in result["todos"]] == [ids[0], ids[2], new_id]
+    assert result["todos"][1]["title"] == "修改后"
+    assert result["todos"][1]["description"] == "再次修改"
+    assert result["deleted"] == [ids[1]]
+    assert result["version"] > version
+
+    assert changes(result["version"]) == {"version": result["version"], "todos": [], "deleted": [], "has_more": False}
+
+
+def test_changes_paging():
+    """测试变更超过limit条时分页返回，逐页同步得到全部变更"""
+    ids = [client.post("/api/v1/todos", json={"title": f"任务{i}"}).json()["id"] for i in range(5)]
+    first = changes(0, limit=2)
+    assert [todo["id"] for todo in first["todos"]] == ids[:2] and first["has_more"] is True
+    version = changes(0)["version"]
+    client.delete(f"/api/v1/todos/{ids[1]}")
+    client.put(f"/api/v1/todos/{ids[3]}", json={"title": "修改后"})
+    client.delete(f"/api/v1/todos/{ids[4]}")
+
+    pages, since = [], version
+    while True:
+        page = changes(since, limit=1)
+        pages.append((page["todos"], page["deleted"]))
+        since = page["version"]
+        if not page["has_more"]:
+            break
+    assert [([todo["id"] for todo in todos], deleted) for todos, deleted in pages] == [
+        ([], [ids[1]]), ([ids[3]], []), ([], [ids[4]]),
+    ]
+    assert since == changes(0)["version"]
+
+
+def test_changes_paging_keeps_versions_together():
+    """测试同一版本号的变更不会被拆到两页"""
+    ids = [client.post("/api/v1/todos", json={"title": f"任务{i}"}).json()["id"] for i in range(3)]
+    version = changes(0)["version"]
+    # PostgreSQL中同一条语句写入的记录共用一个版本号
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"UPDATE todos SET change_version = {version} WHERE id IN ({ids[1]}, {ids[2]})")
+
+    first = changes(0, limit=2)
+    assert [todo["id"] for todo in first["todos"]] == [ids[0]] and first["has_more"] is True
+    second = changes(first["version"], limit=1)
+    assert [todo["id"] for todo in second["todos"]] == ids[1:] and second["has_more"] is False
+
+
+def test_bulk_deletes_record_tombstones():
+    """测试批量删除、删除已完成和删除全部都记录删除"""
+    ids = [
+        client.post("/api/v1/todos", json={"title": f"任务{i}", "completed": i % 2 == 0}).json()["id"]
+        for i in range(6)
+    ]
+    version = changes(0)["version"]
+
+    client.request("DELETE", "/api/v1/todos/batch", json=[ids[5]])
+    assert changes(version)["deleted"] == [ids[5]]
+    client.delete("/api/v1/todos/completed")
+    assert sorted(changes(version)["deleted"]) == [ids[0], ids[2], ids[4], ids[5]]
+    client.delete("/api/v1/todos")
+    assert sorted(changes(version)["deleted"]) == sorted(ids)
+    assert changes(version)["todos"] == []
+
+
+def test_reused_id_is_not_deleted():
+    """测试删除后重新使用的ID只作为新记录返回"""
+    todo_id = client.post("/api/v1/todos", json={"title": "任务"}).json()["id"]
+    version = changes(0)["version"]
+    client.delete(f"/api/v1/todos/{todo_id}")
+    # SQLite在最大ID被删除后会重新使用该ID
+    new_id = client.post("/api/v1/todos", json={"title": "新任务"}).json()["id"]
+    assert new_id == todo_id
+
+    result = changes(version)
+    assert [todo["title"] for todo in result["todos"]] == ["新任务"]
+    assert result["deleted"] == []
+
+
+def test_invalid_version():
+    """测试大于当前版本号的版本返回410"""
+    version = changes(0)["version"]
+    assert client.get(f"/api/v1/todos/changes?since={version + 1}").status_code == 410
+    assert client.get("/api/v1/todos/changes?since=-1").status_code == 422
+
+
+def test_compact_tombstones():
+    """测试清理删除记录后，早于清理位置的版本需要重新获取完整列表"""
+    ids = [client.post("/api/v1/todos", json={"title": f"任务{i}"}).json()["id"] for i in range(3)]
+    before_delete = changes(0)["version"]
+    client.delete(f"/api/v1/todos/{ids[0]}")
+    after_delete = changes(0)["version"]
+
+    # 保留时间内的删除记录不会被清理
+    assert compact_tombstones() == 0
+    with SessionLocal() as db:
+        assert todo_crud.compact_tombstones(db, datetime.now(timezone.utc) + timedelta(minutes=1)) >= 1
+
+    response = client.get(f"/api/v1/todos/changes?since={before_delete}")
+    assert response.status_code == 410
+    client.delete(f"/api/v1/todos/{ids[1]}")
+    assert changes(after_delete)["deleted"] == [ids[1]]
+
+
+def test_compact_tombstones_job_logs():
+    """测试清理任务记录清理的数量"""
+    todo_id = client.post("/api/v1/todos", json={"title": "任务"}).json()["id"]
+    client.delete(f"/api/v1/todos/{todo_id}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE todo_tombstones SET deleted_at = '2000-01-01 00:00:00'")
+
+    with capture_logs() as logs:
+        purged = compact_tombstones()
+    assert purged >= 1
+    assert [log["event"] for log in logs] == ["todo_tombstones_compacted"]
+
+
+def test_changes_use_index():
+    """测试增量查询通过变更版本号的索引定位，不扫描全表"""
+    plans = query_plans(lambda db: todo_crud.get_changes(db, since=1))
+    assert any("ix_todos_owner_change_version" in plan for plan in plans)
+    assert any("ix_todo_tombstones_owner_change_version" in plan for plan in plans)
+    assert not any("SCAN todos" in plan or "TEMP B-TREE" in plan for plan in plans)
+
+
+def test_migration_tracks_changes():
+    """测试迁移为已有记录设置变更版本号，之后的写入由触发器记录"""
+    path = os.path.join(tempfile.mkdtemp(prefix="todos-migration-"), "old.db")
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{path}")
+    command.upgrade(config, "0001")
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO todos (title, completed) VALUES (?, 0)", [("任务",)] * 3)
+    conn.commit()
+    conn.close()
+
+    command.upgrade(config, "head")
+
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE todos SET completed = 1 WHERE id = 2")
+    conn.execute("DELETE FROM todos WHERE id = 3")
+    conn.commit()
+    rows = conn.execute("SELECT id, change_version FROM todos ORDER BY id").fetchall()
+    tombstones = conn.execute("SELECT id, change_version FROM todo_tombstones").fetchall()
+    meta = conn.execute(
+        "SELECT version, compacted_version FROM todo_owner_counts WHERE owner_id = 'default'"
+    ).fetchone()
+    conn.close()
+    assert rows == [(1, 1), (2, 2)]
+    assert tombstones == [(3, 3)]
+    assert meta == (3, 0)
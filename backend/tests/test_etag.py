@@ -0,0 +1,107 @@
+"""
+HTTP条件请求测试用例
+"""
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.core.cache import todo_cache
+from app.core.database import SessionLocal, engine
+from app.core.etag import etag_matches
+from app.crud.todo import todo_crud
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_etag_matches():
+    """测试ETag比较规则"""
+    assert etag_matches('"a"', '"a"')
+    assert etag_matches('"b", W/"a"', '"a"')
+    assert not etag_matches('W/"a"', '"a"', weak=False)
+    assert etag_matches("*", '"a"')
+    assert not etag_matches(None, '"a"')
+
+
+def test_version_bumped_by_triggers():
+    """测试绕过CRUD的写入同样会递增数据版本号"""
+    db = SessionLocal()
+    try:
+        before = todo_crud.get_version(db)
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO todos (title, completed) VALUES ('直接写入', 0)"))
+        db.rollback()
+        assert todo_crud.get_version(db) > before
+    finally:
+        db.close()
+
+
+def test_list_not_modified(query_counter):
+    """测试列表数据未变化时返回304，且不执行列表查询"""
+    client.post("/api/v1/todos", json={"title": "任务"})
+    response = client.get("/api/v1/todos")
+    etag = response.headers["ETag"]
+
+    todo_cache.enabled = False
+    try:
+        query_counter.clear()
+        response = client.get("/api/v1/todos", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert len(query_counter) == 1
+    finally:
+        todo_cache.enabled = True
+
+    client.post("/api/v1/todos", json={"title": "新任务"})
+    response = client.get("/api/v1/todos", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.json()) == 2
+
+
+def test_item_not_modified():
+    """测试单个待办事项未变化时返回304，更新后返回新内容"""
+    todo_id = client.post("/api/v1/todos", json={"title": "任务"}).json()["id"]
+    etag = client.get(f"/api/v1/todos/{todo_id}").headers["ETag"]
+
+    response = client.get(f"/api/v1/todos/{todo_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    client.put(f"/api/v1/todos/{todo_id}/complete")
+    response = client.get(f"/api/v1/todos/{todo_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["completed"] is True
+
+
+def test_update_if_match():
+    """测试If-Match乐观并发控制"""
+    response = client.post("/api/v1/todos", json={"title": "任务"})
+    todo_id = response.json()["id"]
+    etag = response.headers["ETag"]
+
+    response = client.put(f"/api/v1/todos/{todo_id}", json={"title": "修改1"}, headers={"If-Match": etag})
+    assert response.status_code == 200
+    new_etag = response.headers["ETag"]
+    assert new_etag != etag
+
+    # 使用过期的ETag更新会被拒绝
+    response = client.put(f"/api/v1/todos/{todo_id}", json={"title": "修改2"}, headers={"If-Match": etag})
+    assert response.status_code == 412
+    assert client.get(f"/api/v1/todos/{todo_id}").json()["title"] == "修改1"
+
+    response = client.put(f"/api/v1/todos/{todo_id}/complete", headers={"If-Match": new_etag})
+    assert response.status_code == 200
+
+
+def test_delete_if_match():
+    """测试删除时的If-Match检查"""
+    todo_id = client.post("/api/v1/todos", json={"title": "任务"}).json()["id"]
+
+    response = client.delete(f"/api/v1/todos/{todo_id}", headers={"If-Match": '"stale"'})
+    assert response.status_code == 412
+
+    etag = client.get(f"/api/v1/todos/{todo_id}").headers["ETag"]
+    response = client.delete(f"/api/v1/todos/{todo_id}", headers={"If-Match": etag})
+    assert response.status_code == 200
+
+    response = client.delete(f"/api/v1/todos/{todo_id}", headers={"If-Match": etag})
+    assert response.status_code == 404
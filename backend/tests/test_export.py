@@ -0,0 +1,84 @@
+"""
+待办事项导出测试用例
+"""
+import csv
+import io
+import json
+
+from fastapi.testclient import TestClient
+
+from app.core.database import SessionLocal
+from app.crud.todo import todo_crud
+from app.main import app
+from app.schemas.todo import TodoCreate
+
+client = TestClient(app)
+
+
+def create_todos(count: int) -> list:
+    """创建测试待办事项，每第三项为已完成"""
+    with SessionLocal() as db:
+        rows = todo_crud.create_todos(
+            db, [TodoCreate(title=f"任务{i}", completed=i % 3 == 0) for i in range(count)]
+        )
+    return [row.id for row in rows]
+
+
+def test_export_ndjson():
+    """测试导出NDJSON，每行一个待办事项"""
+    ids = create_todos(5)
+
+    response = client.get("/api/v1/todos/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert 'filename="todos.ndjson"' in response.headers["content-disposition"]
+    todos = [json.loads(line) for line in response.text.splitlines()]
+    assert [todo["id"] for todo in todos] == ids
+    assert todos[0] == client.get(f"/api/v1/todos/{ids[0]}").json()
+
+
+def test_export_filter():
+    """测试导出时按完成状态筛选"""
+    create_todos(6)
+
+    response = client.get("/api/v1/todos/export?filter=completed")
+    todos = [json.loads(line) for line in response.text.splitlines()]
+    assert len(todos) == 2
+    assert all(todo["completed"] for todo in todos)
+
+    response = client.get("/api/v1/todos/export?filter=active")
+    assert len(response.text.splitlines()) == 4
+
+
+def test_export_csv():
+    """测试导出CSV"""
+    ids = create_todos(3)
+
+    response = client.get("/api/v1/todos/export?format=csv")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(row["id"]) for row in rows] == ids
+    assert rows[1]["title"] == "任务1"
+    assert rows[1]["description"] == ""
+
+
+def test_export_empty_csv():
+    """测试没有待办事项时CSV只包含表头"""
+    response = client.get("/api/v1/todos/export?format=csv")
+    assert response.text.splitlines() == ["title,description,completed,id,created_at,updated_at"]
+
+
+def test_export_invalid_format():
+    """测试不支持的导出格式"""
+    assert client.get("/api/v1/todos/export?format=xml").status_code == 422
+
+
+def test_iter_todo_batches():
+    """测试按批遍历待办事项"""
+    ids = create_todos(5)
+
+    with SessionLocal() as db:
+        batches = list(todo_crud.iter_todo_batches(db, batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [row["id"] for batch in batches for row in batch] == ids
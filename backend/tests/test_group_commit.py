@@ -0,0 +1,134 @@
+"""
+合并提交测试用例
+"""
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.database import SessionLocal
+from app.crud.todo import todo_completion_writer, todo_crud
+from app.main import app
+from app.models.todo import DEFAULT_OWNER
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    """启用合并提交写入器，记录每批的写操作数"""
+    batches = []
+    apply = todo_completion_writer.apply
+
+    def recording_apply(db, changes):
+        batches.append(len(changes))
+        return apply(db, changes)
+
+    monkeypatch.setattr(todo_completion_writer, "enabled", True)
+    monkeypatch.setattr(todo_completion_writer, "window", 0.05)
+    monkeypatch.setattr(todo_completion_writer, "apply", recording_apply)
+    yield batches
+    todo_completion_writer.close()
+
+
+def create_todos(count: int) -> list:
+    """创建指定数量的待办事项，返回ID列表"""
+    return [client.post("/api/v1/todos", json={"title": f"任务{i}"}).json()["id"] for i in range(count)]
+
+
+def test_concurrent_toggles_share_commit(writer):
+    """测试并发的状态切换合并到同一批提交，每个请求返回自己的结果"""
+    # 并发数超过连接池大小，等待写入器的请求不能占用写入器需要的连接
+    ids = create_todos(24)
+    responses = {}
+
+    def toggle(todo_id):
+        action = "complete" if todo_id % 2 else "uncomplete"
+        responses[todo_id] = client.put(f"/api/v1/todos/{todo_id}/{action}")
+
+    threads = [threading.Thread(target=toggle, args=(todo_id,)) for todo_id in ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(writer) == len(ids)
+    assert len(writer) < len(ids)
+    for todo_id, response in responses.items():
+        assert response.status_code == 200
+        assert response.json() == client.get(f"/api/v1/todos/{todo_id}").json()
+        assert response.json()["completed"] is bool(todo_id % 2)
+        assert response.headers["ETag"] == client.get(f"/api/v1/todos/{todo_id}").headers["ETag"]
+    assert client.get("/api/v1/todos/stats").json()["completed"] == sum(1 for todo_id in ids if todo_id % 2)
+
+
+def test_writer_errors(writer):
+    """测试启用合并提交时不存在和已被修改的待办事项分别返回404和412"""
+    todo_id = create_todos(1)[0]
+    assert client.put("/api/v1/todos/999999/complete").status_code == 404
+    response = client.put(f"/api/v1/todos/{todo_id}/complete", headers={"If-Match": '"stale"'})
+    assert response.status_code == 412
+
+    etag = client.get(f"/api/v1/todos/{todo_id}").headers["ETag"]
+    response = client.put(f"/api/v1/todos/{todo_id}/complete", headers={"If-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_same_todo_in_one_batch():
+    """测试同一批中多次切换同一记录时按顺序执行，各自返回执行后的状态，并各自递增数据版本号"""
+    todo_id = create_todos(1)[0]
+    with SessionLocal() as db:
+        snapshot = todo_crud.get_todo(db, todo_id)
+        before = todo_crud.get_version(db)
+        rows = todo_crud.set_completed_batch(db, [
+            (todo_id, True, None, DEFAULT_OWNER),
+            # 读取后已被本批中之前的写操作修改
+            (todo_id, False, snapshot, DEFAULT_OWNER),
+            (todo_id, False, None, DEFAULT_OWNER),
+            (todo_id, True, None, DEFAULT_OWNER),
+        ])
+    assert [row.completed if row else None for row in rows] == [True, None, False, True]
+    # 3次成功的写操作各递增一次版本号，事件流为每次变更推送一个事件
+    with SessionLocal() as db:
+        assert todo_crud.get_version(db) - before == 3
+    assert client.get(f"/api/v1/todos/{todo_id}").json()["completed"] is True
+    assert client.get("/api/v1/todos/stats").json() == {"total": 1, "active": 0, "completed": 1}
+
+
+def test_failed_write_does_not_fail_batch(writer, monkeypatch):
+    """测试一批中某个写操作出错时，其他写操作仍然提交，只有出错的请求收到异常"""
+    ids = create_todos(3)
+    apply = todo_completion_writer.apply
+
+    def failing_apply(db, changes):
+        if any(todo_id == ids[0] for todo_id, _, _, _ in changes):
+            raise RuntimeError("写入失败")
+        return apply(db, changes)
+
+    monkeypatch.setattr(todo_completion_writer, "apply", failing_apply)
+    results = {}
+
+    def submit(todo_id):
+        try:
+            results[todo_id] = todo_completion_writer.submit((todo_id, True, None, DEFAULT_OWNER)).completed
+        except RuntimeError as exc:
+            results[todo_id] = exc
+
+    threads = [threading.Thread(target=submit, args=(todo_id,)) for todo_id in ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert isinstance(results[ids[0]], RuntimeError)
+    assert results[ids[1]] is True and results[ids[2]] is True
+    assert client.get(f"/api/v1/todos/{ids[0]}").json()["completed"] is False
+
+
+def test_writer_restarts_after_close(writer):
+    """测试关闭写入器后再次提交时重新启动写入线程"""
+    todo_id = create_todos(1)[0]
+    assert client.put(f"/api/v1/todos/{todo_id}/complete").status_code == 200
+    todo_completion_writer.close()
+    assert client.put(f"/api/v1/todos/{todo_id}/uncomplete").json()["completed"] is False
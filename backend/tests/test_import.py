@@ -0,0 +1,120 @@
+"""
+待办事项导入测试用例
+"""
+import json
+
+from fastapi.testclient import TestClient
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.crud.todo import todo_crud
+from app.main import app
+from app.models.todo import Todo, TodoTombstone
+
+client = TestClient(app)
+
+
+def test_import_ndjson():
+    """测试导入NDJSON，无效行被跳过并报告行号"""
+    body = "\n".join([
+        json.dumps({"title": "任务1"}),
+        json.dumps({"title": "任务2", "description": "描述", "completed": True}),
+        "",
+        json.dumps({"description": "缺少标题"}),
+        "不是JSON",
+        json.dumps({"title": "任务3"}),
+    ])
+    response = client.post("/api/v1/todos/import", content=body.encode("utf-8"))
+    assert response.status_code == 200
+    result = response.json()
+    assert result["imported"] == 3
+    assert result["failed"] == 2
+    assert [error["line"] for error in result["errors"]] == [4, 5]
+    assert "title" in result["errors"][0]["error"]
+
+    todos = client.get("/api/v1/todos").json()
+    assert [todo["title"] for todo in todos] == ["任务1", "任务2", "任务3"]
+    assert todos[1]["completed"] is True
+
+
+def test_import_csv():
+    """测试导入CSV，支持带引号的多行字段"""
+    body = 'title,description,completed\n任务1,,false\n"任务2","第一行\n第二行",true\n,无标题,false\n'
+    response = client.post("/api/v1/todos/import?format=csv", content=body.encode("utf-8"))
+    result = response.json()
+    assert result["imported"] == 2
+    assert result["failed"] == 1
+    assert result["errors"][0]["line"] == 5
+
+    todos = client.get("/api/v1/todos").json()
+    assert todos[0]["description"] is None
+    assert todos[1]["description"] == "第一行\n第二行"
+    assert todos[1]["completed"] is True
+
+
+def test_import_export_round_trip():
+    """测试导出的文件可以重新导入"""
+    client.post("/api/v1/todos", json={"title": "任务1", "completed": True})
+    client.post("/api/v1/todos", json={"title": "任务2", "description": "描述"})
+
+    exports = {
+        format: client.get(f"/api/v1/todos/export?format={format}").content for format in ("ndjson", "csv")
+    }
+    for format, exported in exports.items():
+        response = client.post(f"/api/v1/todos/import?format={format}", content=exported)
+        assert response.json() == {"imported": 2, "failed": 0, "errors": []}
+
+    todos = client.get("/api/v1/todos").json()
+    assert [(todo["title"], todo["completed"]) for todo in todos] == [
+        ("任务1", True), ("任务2", False)
+    ] * 3
+
+
+def test_import_in_chunks(monkeypatch):
+    """测试分批提交，错误数超过上限时只返回前几条"""
+    monkeypatch.setattr(settings, "import_chunk_size", 3)
+    monkeypatch.setattr(settings, "import_max_errors", 2)
+    lines = [json.dumps({"title": f"任务{i}"}) for i in range(10)] + ["{}"] * 5
+
+    response = client.post("/api/v1/todos/import", content="\n".join(lines).encode("utf-8"))
+    result = response.json()
+    assert result["imported"] == 10
+    assert result["failed"] == 5
+    assert len(result["errors"]) == 2
+    assert len(client.get("/api/v1/todos").json()) == 10
+
+
+def test_import_invalid_encoding():
+    """测试请求体不是UTF-8编码"""
+    response = client.post("/api/v1/todos/import", content="任务".encode("gbk"))
+    assert response.status_code == 400
+
+
+def test_import_maintains_version_counts_and_search(monkeypatch, query_counter):
+    """测试导入的每批记录一次性更新版本号、计数、删除记录和全文索引，不逐行执行触发器"""
+    monkeypatch.setattr(settings, "import_chunk_size", 3)
+    todo_id = client.post("/api/v1/todos", json={"title": "旧任务"}).json()["id"]
+    client.delete(f"/api/v1/todos/{todo_id}")
+    version = client.get("/api/v1/todos/changes").json()["version"]
+    lines = [json.dumps({"title": f"导入任务{i}", "completed": i % 2 == 0}) for i in range(5)]
+    query_counter.clear()
+
+    assert client.post("/api/v1/todos/import", content="\n".join(lines).encode("utf-8")).json()["imported"] == 5
+    # 每批只执行固定数量的语句，与批内记录数无关
+    assert len([statement for statement in query_counter if statement.startswith("INSERT INTO todos_fts")]) == 2
+
+    changes = client.get(f"/api/v1/todos/changes?since={version}").json()
+    assert changes["version"] == version + 2
+    assert len(changes["todos"]) == 5
+    # 重新使用的ID不再作为已删除返回
+    assert changes["deleted"] == []
+    with SessionLocal() as db:
+        assert db.scalars(select(Todo.id).order_by(Todo.id)).first() == todo_id
+        assert todo_id not in db.scalars(select(TodoTombstone.id)).all()
+        assert db.scalars(select(Todo.change_version).order_by(Todo.id)).all() == [version + 1] * 3 + [version + 2] * 2
+        assert todo_crud.reconcile_owner_counts(db) == []
+    assert client.get("/api/v1/todos/stats").json() == {"total": 5, "active": 2, "completed": 3}
+    assert [todo["title"] for todo in client.get("/api/v1/todos/search?q=导入任务3").json()] == ["导入任务3"]
+    assert client.get("/api/v1/todos").json()[0]["updated_at"] is None
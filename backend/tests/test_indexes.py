@@ -0,0 +1,103 @@
+"""
+索引与数据库迁移测试用例
+通过EXPLAIN QUERY PLAN确认列表查询和批量删除使用了索引
+"""
+import os
+import sqlite3
+import tempfile
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import event
+
+from app.core.database import SessionLocal, engine
+from app.crud.todo import todo_crud
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini")
+
+
+def query_plans(operation):
+    """
+    执行数据库操作并返回其中每条SELECT/DELETE语句的查询计划
+
+    Args:
+        operation: 接收数据库会话的函数
+
+    Returns:
+        list: 每条语句的查询计划文本
+    """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "DELETE", "UPDATE")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    db = SessionLocal()
+    try:
+        operation(db)
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", capture)
+
+    plans = []
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            plans.append(" | ".join(row[-1] for row in rows))
+    return plans
+
+
+@pytest.mark.parametrize("operation", [
+    lambda db: todo_crud.get_active_todos(db),
+    lambda db: todo_crud.get_completed_todos(db),
+    lambda db: todo_crud.get_active_todos(db, after_id=10),
+    lambda db: todo_crud.get_completed_todos(db, after_id=10),
+    lambda db: todo_crud.delete_completed_todos(db),
+])
+def test_filtered_queries_use_index(operation):
+    """测试按状态筛选的查询使用以所有者和completed开头的组合索引"""
+    plans = query_plans(operation)
+    assert plans
+    for plan in plans:
+        assert "INDEX ix_todos_owner_completed_" in plan, plan
+        assert "TEMP B-TREE" not in plan, plan
+
+
+def test_list_queries_use_owner_index():
+    """测试全部列表查询按所有者和主键的索引顺序读取，无需额外排序"""
+    plans = query_plans(lambda db: todo_crud.get_todos(db, after_id=10))
+    assert "ix_todos_owner_id_id (owner_id=? AND id>?)" in plans[0]
+    plans = query_plans(lambda db: todo_crud.get_todos(db))
+    assert "TEMP B-TREE" not in plans[0]
+
+
+def test_migrations_add_indexes_to_existing_database():
+    """测试迁移为旧版本创建的数据库补充索引"""
+    path = os.path.join(tempfile.mkdtemp(prefix="todos-migration-"), "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE todos (id INTEGER NOT NULL, title TEXT NOT NULL, description TEXT, "
+        "completed BOOLEAN, created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME, "
+        "PRIMARY KEY (id))"
+    )
+    conn.execute("CREATE INDEX ix_todos_id ON todos (id)")
+    conn.close()
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{path}")
+    command.upgrade(config, "head")
+
+    conn = sqlite3.connect(path)
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list('todos')")}
+    partial = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE sql LIKE '%WHERE deleted_at IS NULL'")}
+    conn.execute("INSERT INTO todos (title, completed) VALUES ('任务', 0)")
+    version = conn.execute("SELECT version FROM todo_owner_counts WHERE owner_id = 'default'").fetchone()[0]
+    conn.close()
+    assert {"ix_todos_owner_completed_id", "ix_todos_owner_completed_created_at_id", "ix_todos_owner_title_id"} <= indexes
+    assert not {"ix_todos_completed_id", "ix_todos_title_id", "ix_todos_id"} & indexes
+    # 列表和排序索引只包含未删除的记录
+    assert {"ix_todos_owner_id_id", "ix_todos_owner_completed_id", "ix_todos_owner_modified_at_id"} <= partial
+    # 迁移同时创建了维护数据版本号的触发器
+    assert version == 1
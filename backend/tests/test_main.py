@@ -1,9 +1,13 @@
 """
 主应用测试用例
 """
+import json
+
 import pytest
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from app.main import app
+from app.openapi import use_pregenerated_openapi, write_openapi
 
 client = TestClient(app)
 
@@ -26,3 +30,16 @@ def test_api_docs():
     """测试API文档访问"""
     response = client.get("/api/v1/docs")
     assert response.status_code == 200
+
+
+def test_pregenerated_openapi(tmp_path):
+    """测试预先生成的OpenAPI文档与运行时生成的一致，配置后直接读取文件"""
+    path = str(tmp_path / "openapi.json")
+    write_openapi(path)
+    with open(path, encoding="utf-8") as f:
+        assert client.get("/api/v1/openapi.json").json() == json.load(f)
+
+    docs = FastAPI()
+    use_pregenerated_openapi(docs, path)
+    response = TestClient(docs).get("/openapi.json")
+    assert "/api/v1/todos" in response.json()["paths"]
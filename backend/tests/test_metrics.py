@@ -0,0 +1,71 @@
+"""
+Prometheus监控指标测试用例
+"""
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.main import app
+
+client = TestClient(app)
+
+ITEM_ROUTE = "/api/v1/todos/{todo_id}"
+
+
+def sample(name: str, **labels) -> float:
+    """读取指标的当前值，不存在时返回0"""
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_request_metrics_use_route_template():
+    """测试请求耗时按路由模板而不是原始路径统计"""
+    todo_id = client.post("/api/v1/todos", json={"title": "监控任务"}).json()["id"]
+    labels = {"method": "GET", "route": ITEM_ROUTE, "status": "200"}
+    before = sample("http_request_duration_seconds_count", **labels)
+
+    client.get(f"/api/v1/todos/{todo_id}")
+    client.get(f"/api/v1/todos/{todo_id}")
+
+    assert sample("http_request_duration_seconds_count", **labels) == before + 2
+    assert sample("http_requests_in_progress", method="GET", route=ITEM_ROUTE) == 0
+
+
+def test_unmatched_route_label():
+    """测试未匹配路由的请求使用统一标签"""
+    before = sample("http_request_duration_seconds_count", method="GET", route="<unmatched>", status="404")
+    client.get("/no/such/path")
+    after = sample("http_request_duration_seconds_count", method="GET", route="<unmatched>", status="404")
+    assert after == before + 1
+
+
+def test_db_metrics_per_request():
+    """测试按请求统计数据库查询次数、耗时和连接池等待时间"""
+    labels = {"method": "GET", "route": "/api/v1/todos"}
+    queries_before = sample("http_request_db_queries_sum", **labels)
+    pool_before = sample("db_pool_checkout_wait_seconds_count")
+    selects_before = sample("db_queries_total", operation="SELECT")
+
+    # 两次请求的筛选条件不同，不会命中读缓存，各查询一次版本号和列表
+    client.get("/api/v1/todos?filter=active")
+    client.get("/api/v1/todos?filter=completed")
+
+    assert sample("http_request_db_queries_sum", **labels) == queries_before + 4
+    assert sample("http_request_db_duration_seconds_count", **labels) > 0
+    assert sample("db_pool_checkout_wait_seconds_count") == pool_before + 2
+    assert sample("db_queries_total", operation="SELECT") >= selects_before + 4
+
+
+def test_response_size():
+    """测试统计响应体大小"""
+    labels = {"method": "GET", "route": "/health"}
+    before = sample("http_response_size_bytes_sum", **labels)
+    response = client.get("/health")
+    assert sample("http_response_size_bytes_sum", **labels) == before + len(response.content)
+
+
+def test_metrics_endpoint():
+    """测试/metrics接口输出Prometheus文本格式"""
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_bucket{le="0.005",method="GET",route="/health",status="200"}' in response.text
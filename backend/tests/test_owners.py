@@ -0,0 +1,376 @@
+"""
+多租户测试用例
+"""
+import asyncio
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select, update
+from structlog.testing import capture_logs
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine, init_db
+from app.core.events import EventBroadcaster
+from app.core.tenancy import OWNER_HEADER, tenant_shards
+from app.crud.todo import todo_crud
+from app import jobs
+from app.jobs import purge_deleted, reconcile_counts
+from app.main import app
+from app.models.todo import DEFAULT_OWNER, Todo, TodoOwnerCounts
+from tests.test_indexes import ALEMBIC_INI, query_plans
+
+client = TestClient(app)
+
+ALICE = {OWNER_HEADER: "alice"}
+BOB = {OWNER_HEADER: "bob"}
+
+
+def create_todo(headers: dict, title: str = "任务", completed: bool = False) -> int:
+    """以指定所有者创建待办事项，返回ID"""
+    return client.post("/api/v1/todos", json={"title": title, "completed": completed}, headers=headers).json()["id"]
+
+
+def titles(headers: dict, path: str = "/api/v1/todos") -> list:
+    """获取所有者的列表中的标题"""
+    return [todo["title"] for todo in client.get(path, headers=headers).json()]
+
+
+def test_owners_are_isolated():
+    """测试所有者只能读写自己的待办事项，其他所有者的记录如同不存在"""
+    alice_id = create_todo(ALICE, "爱丽丝")
+    create_todo(BOB, "鲍勃")
+    create_todo({}, "默认")
+
+    assert titles(ALICE) == ["爱丽丝"]
+    assert titles(BOB) == ["鲍勃"]
+    assert titles({}) == ["默认"]
+    # 先以alice读取使详情写入缓存，缓存不会被其他所有者读到
+    assert client.get(f"/api/v1/todos/{alice_id}", headers=ALICE).status_code == 200
+    assert client.get(f"/api/v1/todos/{alice_id}", headers=BOB).status_code == 404
+    assert client.put(f"/api/v1/todos/{alice_id}", json={"title": "改"}, headers=BOB).status_code == 404
+    assert client.put(f"/api/v1/todos/{alice_id}/complete", headers=BOB).status_code == 404
+    assert client.delete(f"/api/v1/todos/{alice_id}", headers=BOB).status_code == 404
+    assert client.get(f"/api/v1/todos/{alice_id}", headers=ALICE).json()["title"] == "爱丽丝"
+
+
+def test_bulk_operations_are_scoped():
+    """测试批量操作和清空只影响请求的所有者"""
+    alice_ids = [create_todo(ALICE, f"爱丽丝{i}", completed=i == 0) for i in range(2)]
+    create_todo(BOB, "鲍勃", completed=True)
+
+    response = client.patch("/api/v1/todos/batch", json=[{"id": alice_ids[1], "title": "改"}], headers=BOB)
+    assert response.json()["results"][0]["status"] == "not_found"
+    response = client.request("DELETE", "/api/v1/todos/batch", json=alice_ids, headers=BOB)
+    assert [item["status"] for item in response.json()["results"]] == ["not_found", "not_found"]
+
+    client.delete("/api/v1/todos/completed", headers=BOB)
+    assert titles(ALICE) == ["爱丽丝0", "爱丽丝1"]
+    assert titles(BOB) == []
+    client.delete("/api/v1/todos", headers=ALICE)
+    assert titles(ALICE) == []
+    assert titles(BOB, "/api/v1/todos/search?q=鲍勃") == []
+    create_todo(BOB, "鲍勃")
+    assert titles(ALICE, "/api/v1/todos/search?q=鲍勃") == []
+    assert titles(BOB, "/api/v1/todos/search?q=鲍勃") == ["鲍勃"]
+
+
+def test_stats_per_owner():
+    """测试计数按所有者统计"""
+    create_todo(ALICE, completed=True)
+    create_todo(ALICE)
+    bob_id = create_todo(BOB)
+    client.put(f"/api/v1/todos/{bob_id}/complete", headers=BOB)
+    client.delete(f"/api/v1/todos/{bob_id}", headers=BOB)
+
+    assert client.get("/api/v1/todos/stats", headers=ALICE).json() == {"total": 2, "active": 1, "completed": 1}
+    assert client.get("/api/v1/todos/stats", headers=BOB).json() == {"total": 0, "active": 0, "completed": 0}
+    assert client.get("/api/v1/todos/stats", headers={OWNER_HEADER: "carol"}).json()["total"] == 0
+
+
+def test_changes_per_owner():
+    """测试增量同步只返回所有者的变更和删除记录"""
+    alice_version = client.get("/api/v1/todos/changes", headers=ALICE).json()["version"]
+    bob_version = client.get("/api/v1/todos/changes", headers=BOB).json()["version"]
+    alice_id = create_todo(ALICE)
+    bob_id = create_todo(BOB)
+    client.delete(f"/api/v1/todos/{bob_id}", headers=BOB)
+
+    alice = client.get(f"/api/v1/todos/changes?since={alice_version}", headers=ALICE).json()
+    bob = client.get(f"/api/v1/todos/changes?since={bob_version}", headers=BOB).json()
+    assert [todo["id"] for todo in alice["todos"]] == [alice_id] and alice["deleted"] == []
+    assert bob["todos"] == [] and bob["deleted"] == [bob_id]
+
+
+def test_versions_per_owner():
+    """测试数据版本号按所有者递增，其他所有者的写入不改变列表的ETag"""
+    create_todo(ALICE)
+    alice_etag = client.get("/api/v1/todos", headers=ALICE).headers["ETag"]
+    alice_version = client.get("/api/v1/todos/changes", headers=ALICE).json()["version"]
+
+    bob_id = create_todo(BOB)
+    client.put(f"/api/v1/todos/{bob_id}/complete", headers=BOB)
+    client.delete(f"/api/v1/todos/{bob_id}", headers=BOB)
+
+    assert client.get("/api/v1/todos/changes", headers=ALICE).json()["version"] == alice_version
+    assert client.get("/api/v1/todos", headers={**ALICE, "If-None-Match": alice_etag}).status_code == 304
+    # 版本号相同的其他所有者的ETag也不同
+    assert client.get("/api/v1/todos", headers={**BOB, "If-None-Match": alice_etag}).status_code == 200
+    create_todo(ALICE)
+    assert client.get("/api/v1/todos/changes", headers=ALICE).json()["version"] == alice_version + 1
+
+
+def test_compact_tombstones_per_owner():
+    """测试清理删除记录按所有者记录清理位置，不影响其他所有者的增量同步"""
+    alice_version = client.get("/api/v1/todos/changes", headers=ALICE).json()["version"]
+    client.delete(f"/api/v1/todos/{create_todo(ALICE)}", headers=ALICE)
+    with SessionLocal() as db:
+        assert todo_crud.compact_tombstones(db, datetime.now(timezone.utc) + timedelta(minutes=1)) >= 1
+    bob_version = client.get("/api/v1/todos/changes", headers=BOB).json()["version"]
+    bob_id = create_todo(BOB)
+    client.delete(f"/api/v1/todos/{bob_id}", headers=BOB)
+
+    assert client.get(f"/api/v1/todos/changes?since={alice_version}", headers=ALICE).status_code == 410
+    assert client.get(f"/api/v1/todos/changes?since={bob_version}", headers=BOB).json()["deleted"] == [bob_id]
+
+
+def test_migration_versions_each_owner():
+    """测试迁移为每个已有记录的所有者建立计数和版本号，之后的写入只递增自己的版本号，降级后可以重新升级"""
+    path = os.path.join(tempfile.mkdtemp(prefix="todos-migration-"), "old.db")
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{path}")
+    command.upgrade(config, "0002")
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO todos (owner_id, title) VALUES (?, '任务')", [("alice",), ("bob",), ("bob",)])
+    conn.commit()
+    conn.close()
+
+    command.upgrade(config, "head")
+
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO todos (owner_id, title) VALUES ('bob', '任务')")
+    conn.commit()
+    versions = conn.execute("SELECT owner_id, total_count, version FROM todo_owner_counts ORDER BY owner_id").fetchall()
+    conn.close()
+    assert versions == [("alice", 1, 1), ("bob", 3, 2)]
+
+    command.downgrade(config, "0002")
+    command.upgrade(config, "head")
+    conn = sqlite3.connect(path)
+    versions = conn.execute("SELECT owner_id, total_count, version FROM todo_owner_counts ORDER BY owner_id").fetchall()
+    conn.close()
+    assert versions == [("alice", 1, 1), ("bob", 3, 1)]
+
+
+def test_migrations_on_created_database():
+    """测试由create_all建表的新数据库可以直接执行迁移，不会重复创建已有的表"""
+    path = os.path.join(tempfile.mkdtemp(prefix="todos-migration-"), "new.db")
+    init_db(create_engine(f"sqlite:///{path}"))
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{path}")
+    command.upgrade(config, "head")
+
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO todos (title) VALUES ('任务')")
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    counts = conn.execute("SELECT owner_id, total_count, version FROM todo_owner_counts").fetchall()
+    conn.close()
+    assert "todo_meta" not in tables
+    assert counts == [(DEFAULT_OWNER, 1, 1)]
+
+
+def test_export_and_import_per_owner():
+    """测试导入的记录属于请求的所有者，导出只包含该所有者的记录"""
+    create_todo(ALICE, "爱丽丝")
+    body = client.get("/api/v1/todos/export", headers=ALICE).content
+    assert client.post("/api/v1/todos/import", content=body, headers=BOB).json()["imported"] == 1
+    assert titles(BOB) == ["爱丽丝"]
+    assert client.get("/api/v1/todos/export", headers={OWNER_HEADER: "carol"}).content == b""
+
+
+def test_subscription_filters_owner():
+    """测试事件订阅只收到所有者的事件，中继只查询有订阅者的所有者"""
+    async def run():
+        broadcaster = EventBroadcaster(queue_size=10)
+        subscription = broadcaster.subscribe("bob", after=0)
+        broadcaster.publish("created", {"id": 1}, "alice", 1)
+        broadcaster.publish("created", {"id": 2}, "bob", 1)
+        await asyncio.sleep(0)
+        event = await subscription.get(timeout=1)
+        cursors = broadcaster.cursors()
+        broadcaster.close()
+        return event, cursors
+
+    event, cursors = asyncio.run(run())
+    assert (event.type, event.owner, event.data) == ("created", "bob", '{"id":2}')
+    assert cursors == {"bob": 1}
+
+
+@pytest.mark.parametrize("owner", ["", "../secret", ".hidden", "a" * 65, "含中文"])
+def test_invalid_owner(owner):
+    """测试格式无效的所有者ID返回400"""
+    response = client.get("/api/v1/todos", headers={OWNER_HEADER: owner.encode("utf-8")})
+    assert response.status_code == 400
+
+
+def test_owner_header_required(monkeypatch):
+    """测试要求携带所有者请求头时，未携带的请求返回400"""
+    monkeypatch.setattr(settings, "owner_header_required", True)
+    assert client.get("/api/v1/todos").status_code == 400
+    assert client.get("/api/v1/todos", headers=ALICE).status_code == 200
+
+
+@pytest.mark.parametrize("sort,index", [
+    ("id", "ix_todos_owner_id_id"),
+    ("title", "ix_todos_owner_title_id"),
+    ("updated_at", "ix_todos_owner_modified_at_id"),
+])
+def test_owner_queries_use_owner_index(sort, index):
+    """测试所有者的列表查询使用以owner_id开头的索引，无需额外排序"""
+    plans = query_plans(lambda db: todo_crud.get_todo_rows(db, sort=sort, owner_id="alice"))
+    assert index in plans[0]
+    assert "TEMP B-TREE" not in plans[0]
+
+
+def test_reconcile_owner_counts():
+    """测试重新统计修正所有者计数的偏差并记录警告日志"""
+    create_todo(ALICE, completed=True)
+    create_todo(BOB)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE todo_owner_counts SET total_count = 9 WHERE owner_id = 'alice'")
+        conn.exec_driver_sql("INSERT INTO todo_owner_counts (owner_id, total_count, completed_count) VALUES ('ghost', 3, 0)")
+
+    with capture_logs() as logs:
+        reconcile_counts()
+    drift = [log for log in logs if log["event"] == "todo_owner_counts_drift"]
+    assert [log["owners"] for log in drift] == [["alice", "ghost"]]
+    assert client.get("/api/v1/todos/stats", headers=ALICE).json() == {"total": 1, "active": 0, "completed": 1}
+    assert client.get("/api/v1/todos/stats", headers={OWNER_HEADER: "ghost"}).json()["total"] == 0
+
+
+@pytest.fixture
+def shards(tmp_path, monkeypatch):
+    """启用按所有者分片，分片数据库文件保存在临时目录中"""
+    monkeypatch.setattr(tenant_shards, "directory", str(tmp_path))
+    monkeypatch.setattr(jobs, "_last_databases", {})
+    yield tmp_path
+    tenant_shards.dispose()
+
+
+def test_shards(shards):
+    """测试启用分片时每个所有者的待办事项保存在自己的数据库文件中"""
+    alice_id = create_todo(ALICE, "爱丽丝", completed=True)
+    create_todo(BOB, "鲍勃")
+
+    assert {"alice.db", "bob.db"} <= set(os.listdir(shards))
+    assert tenant_shards.owners() == ["alice", "bob"]
+    assert titles(ALICE) == ["爱丽丝"]
+    assert client.get(f"/api/v1/todos/{alice_id}", headers=ALICE).json()["completed"] is True
+    assert client.get("/api/v1/todos/stats", headers=BOB).json() == {"total": 1, "active": 1, "completed": 0}
+    with SessionLocal() as db:
+        assert db.execute(select(func.count()).select_from(Todo)).scalar() == 0
+    with tenant_shards.session_factory("alice")() as db:
+        assert db.execute(select(Todo.owner_id)).scalars().all() == ["alice"]
+
+    # 维护任务依次处理主库和每个分片
+    assert reconcile_counts() == {}
+    with tenant_shards.session_factory("bob")() as db:
+        db.execute(update(TodoOwnerCounts).values(total_count=5))
+        db.commit()
+    assert reconcile_counts() == {"shard:bob": ["bob"]}
+    assert client.get("/api/v1/todos/stats", headers=BOB).json()["total"] == 1
+
+
+def test_jobs_resume_after_last_database(shards, monkeypatch):
+    """测试维护任务用完时间后，下一次运行从之后的数据库继续，排在后面的分片不会一直得不到清理"""
+    owners = [{OWNER_HEADER: owner} for owner in ("alice", "bob", "carol")]
+    for headers in owners:
+        create_todo(headers)
+        client.delete("/api/v1/todos", headers=headers)
+    monkeypatch.setattr(settings, "purge_batch_size", 1)
+    monkeypatch.setattr(settings, "purge_time_budget", 0)
+
+    # 每次运行只处理一个数据库：主库、alice、bob、carol
+    assert [purge_deleted() for _ in range(4)] == [0, 1, 1, 1]
+    for owner in ("alice", "bob", "carol"):
+        with tenant_shards.session_factory(owner)() as db:
+            assert db.execute(select(func.count()).select_from(Todo)).scalar() == 0
+
+
+def test_jobs_skip_shards_without_pending_rows(shards, monkeypatch):
+    """测试清理任务跳过没有软删除记录的分片，不打开其数据库，也不改变打开的分片"""
+    create_todo(ALICE)
+    create_todo(BOB)
+    client.delete("/api/v1/todos", headers=BOB)
+    tenant_shards.dispose()
+    opened = []
+    maintenance_session = tenant_shards.maintenance_session
+
+    def record(owner_id):
+        opened.append(owner_id)
+        return maintenance_session(owner_id)
+
+    monkeypatch.setattr(tenant_shards, "maintenance_session", record)
+
+    assert purge_deleted() == 1
+    assert opened == ["bob"]
+    assert tenant_shards.open_count() == 0
+    assert purge_deleted() == 0
+    assert opened == ["bob"]
+
+
+def test_shards_evict_least_recently_used(shards, monkeypatch):
+    """测试打开的分片超过上限时关闭最久未访问的分片的连接池，再次访问时重新打开且数据不变"""
+    monkeypatch.setattr(tenant_shards, "max_open", 2)
+    alice_id = create_todo(ALICE, "爱丽丝")
+    create_todo(BOB, "鲍勃")
+    bob_engine = tenant_shards.session_factory("bob").kw["bind"]
+    bob_pool = bob_engine.pool
+    alice_engine = tenant_shards.session_factory("alice").kw["bind"]
+    # 刚访问过alice，打开carol时关闭的是bob
+    create_todo({OWNER_HEADER: "carol"}, "卡罗尔")
+
+    assert tenant_shards.open_count() == 2
+    # dispose关闭连接池中的连接并换上新的空连接池
+    assert bob_engine.pool is not bob_pool and bob_engine.pool.checkedin() == 0
+    assert tenant_shards.session_factory("alice").kw["bind"] is alice_engine
+    assert titles(BOB) == ["鲍勃"]
+    assert tenant_shards.session_factory("bob").kw["bind"] is not bob_engine
+    assert client.get(f"/api/v1/todos/{alice_id}", headers=ALICE).json()["title"] == "爱丽丝"
+    assert tenant_shards.owners() == ["alice", "bob", "carol"]
+
+
+def test_shard_engine_is_small(shards):
+    """测试分片使用不溢出的小连接池、较小的页缓存，不使用内存映射"""
+    shard_engine = tenant_shards.session_factory("alice").kw["bind"]
+    assert shard_engine.pool.size() == settings.tenant_shard_pool_size
+    assert shard_engine.pool._max_overflow == 0
+    with shard_engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA cache_size").scalar() == settings.tenant_shard_cache_size
+        assert conn.exec_driver_sql("PRAGMA mmap_size").scalar() == 0
+
+
+def test_vary_owner_header():
+    """测试待办事项的读取响应（包括304）带有Vary: X-Owner-ID，共享缓存按所有者区分"""
+    todo_id = create_todo(ALICE)
+    response = client.get("/api/v1/todos", headers=ALICE)
+    assert OWNER_HEADER in response.headers["Vary"]
+    cached = client.get("/api/v1/todos", headers={**ALICE, "If-None-Match": response.headers["ETag"]})
+    assert cached.status_code == 304
+    assert OWNER_HEADER in cached.headers["Vary"]
+    assert OWNER_HEADER in client.get(f"/api/v1/todos/{todo_id}", headers=ALICE).headers["Vary"]
+    assert "Vary" not in client.get("/health").headers
+
+
+def test_default_owner():
+    """测试未携带请求头的请求和直接调用CRUD使用默认所有者"""
+    create_todo({}, "默认")
+    with SessionLocal() as db:
+        assert [todo.title for todo in todo_crud.get_todos(db)] == ["默认"]
+        assert todo_crud.get_todos(db, owner_id="alice") == []
+        assert db.execute(select(Todo.owner_id)).scalars().all() == [DEFAULT_OWNER]
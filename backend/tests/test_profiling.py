@@ -0,0 +1,67 @@
+"""
+慢查询日志和请求剖析测试用例
+"""
+import os
+
+from fastapi.testclient import TestClient
+from structlog.testing import capture_logs
+
+from app.core.config import settings
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_request_id_header():
+    """测试请求ID：沿用合法的客户端请求ID，否则重新生成"""
+    response = client.get("/health", headers={"X-Request-ID": "req-123"})
+    assert response.headers["X-Request-ID"] == "req-123"
+
+    response = client.get("/health", headers={"X-Request-ID": "bad id\n"})
+    assert response.headers["X-Request-ID"] != "bad id\n"
+    assert len(response.headers["X-Request-ID"]) == 32
+
+
+def test_slow_query_log(monkeypatch):
+    """测试超过阈值的查询记录日志和执行计划"""
+    monkeypatch.setattr(settings, "slow_query_ms", 1e-6)
+    with capture_logs() as logs:
+        client.get("/api/v1/todos?filter=active")
+    slow_queries = [log for log in logs if log["event"] == "slow_query"]
+    statement = next(log for log in slow_queries if "FROM todos" in log["statement"])
+    assert statement["log_level"] == "warning"
+    assert any("ix_todos_owner_completed_" in line for line in statement["plan"])
+
+
+def test_slow_query_log_disabled():
+    """测试默认不记录慢查询"""
+    with capture_logs() as logs:
+        client.get("/api/v1/todos")
+    assert not [log for log in logs if log["event"] == "slow_query"]
+
+
+def test_profile_by_header(monkeypatch, tmp_path):
+    """测试请求头触发剖析，输出函数统计并保存剖析文件"""
+    monkeypatch.setattr(settings, "profile_token", "secret")
+    monkeypatch.setattr(settings, "profile_dir", str(tmp_path))
+    with capture_logs() as logs:
+        client.get("/api/v1/todos", headers={"X-Profile": "wrong"})
+        client.get("/api/v1/todos", headers={"X-Profile": "secret", "X-Request-ID": "profiled"})
+    profiles = [log for log in logs if log["event"] == "request_profile"]
+    assert len(profiles) == 1
+    profile = profiles[0]
+    assert profile["route"] == "/api/v1/todos"
+    assert profile["status"] == 200
+    assert any("get_todos" in item["function"] for item in profile["stats"])
+    assert profile["profile_file"] == os.path.join(str(tmp_path), "profiled.prof")
+    assert os.path.exists(profile["profile_file"])
+
+
+def test_profile_sampling(monkeypatch):
+    """测试按比例剖析请求"""
+    monkeypatch.setattr(settings, "profile_sample_rate", 1.0)
+    with capture_logs() as logs:
+        client.get("/health")
+        client.get("/api/v1/todos/999")
+    profiles = [log for log in logs if log["event"] == "request_profile"]
+    assert [profile["status"] for profile in profiles] == [200, 404]
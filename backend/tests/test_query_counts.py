@@ -0,0 +1,47 @@
+"""
+接口SQL语句数量测试用例
+确保热点接口不会执行多余的查询
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def todo_id():
+    """创建一个待办事项并返回ID"""
+    return client.post("/api/v1/todos", json={"title": "计数任务"}).json()["id"]
+
+
+@pytest.mark.parametrize("method, path, body, expected", [
+    # 列表先读取数据版本号用于ETag和缓存键，再查询列表
+    ("GET", "/api/v1/todos", None, 2),
+    ("GET", "/api/v1/todos?filter=active", None, 2),
+    ("GET", "/api/v1/todos/{id}", None, 1),
+    ("POST", "/api/v1/todos", {"title": "新任务"}, 1),
+    ("PUT", "/api/v1/todos/{id}", {"title": "新标题"}, 1),
+    ("PUT", "/api/v1/todos/{id}/complete", None, 1),
+    ("PUT", "/api/v1/todos/{id}/uncomplete", None, 1),
+    ("DELETE", "/api/v1/todos/{id}", None, 1),
+    ("DELETE", "/api/v1/todos/completed", None, 1),
+    ("DELETE", "/api/v1/todos", None, 1),
+    ("POST", "/api/v1/todos/batch", [{"title": "任务1"}, {"title": "任务2"}], 1),
+    ("DELETE", "/api/v1/todos/batch", [1, 2, 3], 1),
+])
+def test_endpoint_query_count(todo_id, query_counter, method, path, body, expected):
+    """测试每个接口执行的SQL语句数量"""
+    query_counter.clear()
+    response = client.request(method, path.format(id=todo_id), json=body)
+    assert response.status_code == 200
+    assert len(query_counter) == expected, query_counter
+
+
+def test_update_not_found_query_count(query_counter):
+    """测试更新不存在的待办事项只执行一条语句"""
+    query_counter.clear()
+    response = client.put("/api/v1/todos/999/complete")
+    assert response.status_code == 404
+    assert len(query_counter) == 1
@@ -0,0 +1,154 @@
+"""
+只读副本读写分离测试用例
+使用多个SQLite文件数据库作为副本，每个副本中的数据不同，通过返回的数据判断请求使用的数据库
+"""
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import replicas
+from app.core.cache import todo_cache
+from app.core.config import settings
+from app.core.database import init_db
+from app.core.replicas import LAST_WRITE_COOKIE, LAST_WRITE_HEADER, ReplicaSet
+from app.main import app
+from app.models.todo import Todo
+
+
+def make_replicas(tmp_path, count: int = 2, selection: str = "round_robin") -> ReplicaSet:
+    """创建指定数量的副本，第i个副本中有一条标题为“副本i”的待办事项"""
+    urls = [f"sqlite:///{os.path.join(tmp_path, f'replica{index}.db')}" for index in range(count)]
+    replica_set = ReplicaSet(urls, selection)
+    for index, replica_engine in enumerate(replica_set.engines):
+        init_db(replica_engine)
+        with replica_engine.begin() as conn:
+            conn.execute(Todo.__table__.insert().values(title=f"副本{index}", completed=False))
+    return replica_set
+
+
+@pytest.fixture
+def read_replicas(tmp_path, monkeypatch):
+    """配置两个只读副本，关闭读缓存以便观察每个请求使用的数据库"""
+    replica_set = make_replicas(tmp_path)
+    monkeypatch.setattr(replicas, "read_replicas", replica_set)
+    monkeypatch.setattr(todo_cache, "enabled", False)
+    yield replica_set
+    replica_set.dispose()
+
+
+def list_titles(client: TestClient) -> list:
+    """获取列表中的标题"""
+    return [todo["title"] for todo in client.get("/api/v1/todos").json()]
+
+
+def test_reads_round_robin(read_replicas):
+    """测试列表和详情查询轮流使用各个副本，会话归还后不计入进行中的会话"""
+    client = TestClient(app)
+    assert [list_titles(client) for _ in range(4)] == [["副本0"], ["副本1"], ["副本0"], ["副本1"]]
+    assert client.get("/api/v1/todos/1").json()["title"] == "副本0"
+    assert client.get("/api/v1/todos/1").json()["title"] == "副本1"
+    assert read_replicas.in_flight == [0, 0]
+
+
+def test_reads_least_connections(tmp_path, monkeypatch):
+    """测试最少连接选择进行中会话最少的副本"""
+    replica_set = make_replicas(tmp_path, count=3, selection="least_connections")
+    monkeypatch.setattr(replicas, "read_replicas", replica_set)
+    monkeypatch.setattr(todo_cache, "enabled", False)
+    client = TestClient(app)
+
+    # 副本0和副本1各有一个进行中的会话
+    assert [replica_set.acquire(), replica_set.acquire()] == [0, 1]
+    assert [list_titles(client) for _ in range(3)] == [["副本2"]] * 3
+    # 进行中会话数相同的副本之间轮流选择
+    replica_set.release(0)
+    assert {list_titles(client)[0] for _ in range(4)} == {"副本0", "副本2"}
+    replica_set.release(1)
+    assert replica_set.in_flight == [0, 0, 0]
+    replica_set.dispose()
+
+
+def test_read_your_writes(read_replicas, monkeypatch):
+    """测试客户端写操作后的读请求使用主库，其他客户端和超过时间窗口后仍使用副本"""
+    writer = TestClient(app)
+    todo_id = writer.post("/api/v1/todos", json={"title": "主库"}).json()["id"]
+    assert LAST_WRITE_COOKIE in writer.cookies
+    assert list_titles(writer) == ["主库"]
+    assert writer.get(f"/api/v1/todos/{todo_id}").json()["title"] == "主库"
+
+    assert list_titles(TestClient(app)) == ["副本0"]
+
+    monkeypatch.setattr(settings, "read_your_writes_window", 0)
+    assert list_titles(writer) == ["副本1"]
+
+
+def test_read_your_writes_cross_origin(read_replicas):
+    """测试跨域客户端不发送Cookie时，通过回传X-Last-Write请求头读到自己写入的数据"""
+    origin = {"Origin": settings.backend_cors_origins[0]}
+    writer = TestClient(app)
+    response = writer.post("/api/v1/todos", json={"title": "主库"}, headers=origin)
+    assert LAST_WRITE_HEADER.lower() in response.headers["access-control-expose-headers"].lower()
+    last_write = response.headers[LAST_WRITE_HEADER]
+    # 跨域请求不携带Cookie，只回传响应头
+    writer.cookies.clear()
+    assert list_titles(writer) == ["副本0"]
+    response = writer.get("/api/v1/todos", headers={**origin, LAST_WRITE_HEADER: last_write})
+    assert [todo["title"] for todo in response.json()] == ["主库"]
+
+    # 晚于当前时间的写操作时间无效
+    future = {LAST_WRITE_HEADER: f"{time.time() + 3600:.3f}"}
+    assert [todo["title"] for todo in writer.get("/api/v1/todos", headers=future).json()] == ["副本1"]
+
+
+def test_sticky_read_skips_cache(read_replicas, monkeypatch):
+    """测试写后读不使用其他客户端从副本读到并写入缓存的旧数据"""
+    monkeypatch.setattr(todo_cache, "enabled", True)
+    writer = TestClient(app)
+    todo_id = writer.post("/api/v1/todos", json={"title": "主库"}).json()["id"]
+    # 写入后其他客户端从尚未复制的副本读取，旧数据写入了写操作之后的缓存代数
+    reader = TestClient(app)
+    assert list_titles(reader) == ["副本0"]
+    assert reader.get(f"/api/v1/todos/{todo_id}").json()["title"] == "副本1"
+
+    assert list_titles(writer) == ["主库"]
+    assert writer.get(f"/api/v1/todos/{todo_id}").json()["title"] == "主库"
+
+
+def test_failed_write_does_not_stick(read_replicas):
+    """测试失败的写请求不记录写操作时间"""
+    client = TestClient(app)
+    response = client.put("/api/v1/todos/999999", json={"title": "不存在"})
+    assert response.status_code == 404
+    assert LAST_WRITE_COOKIE not in client.cookies
+    assert LAST_WRITE_HEADER not in response.headers
+    assert list_titles(client) == ["副本0"]
+
+
+def test_unavailable_replica_falls_back_to_primary(tmp_path, monkeypatch):
+    """测试副本无法连接时读请求使用主库"""
+    missing = os.path.join(tmp_path, "missing", "replica.db")
+    replica_set = ReplicaSet([f"sqlite:///{missing}"])
+    monkeypatch.setattr(replicas, "read_replicas", replica_set)
+    client = TestClient(app)
+    client.post("/api/v1/todos", json={"title": "主库"})
+    client.cookies.clear()
+
+    assert list_titles(client) == ["主库"]
+    assert replica_set.in_flight == [0]
+
+
+def test_without_replicas():
+    """测试未配置副本时读请求使用主库，写操作不设置Cookie和X-Last-Write响应头"""
+    client = TestClient(app)
+    response = client.post("/api/v1/todos", json={"title": "主库"})
+    assert LAST_WRITE_COOKIE not in response.cookies
+    assert LAST_WRITE_HEADER not in response.headers
+    assert list_titles(client) == ["主库"]
+
+
+def test_invalid_selection():
+    """测试未知的副本选择方式"""
+    with pytest.raises(ValueError):
+        ReplicaSet([], "random")
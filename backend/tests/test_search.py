@@ -0,0 +1,165 @@
+"""
+待办事项全文搜索测试用例
+"""
+import os
+import sqlite3
+import tempfile
+
+from alembic import command
+from alembic.config import Config
+from fastapi.testclient import TestClient
+
+from app.core.database import SessionLocal
+from app.crud.todo import todo_crud
+from app.main import app
+from app.schemas.todo import TodoCreate
+
+from tests.test_indexes import ALEMBIC_INI, query_plans
+
+client = TestClient(app)
+
+
+def create_todos(todos: list) -> list:
+    """按(标题, 描述, 是否完成)创建测试待办事项"""
+    with SessionLocal() as db:
+        rows = todo_crud.create_todos(
+            db,
+            [TodoCreate(title=title, description=description, completed=completed) for title, description, completed in todos],
+        )
+    return [row.id for row in rows]
+
+
+def search(**params) -> list:
+    """调用搜索接口并返回匹配的ID"""
+    response = client.get("/api/v1/todos/search", params=params)
+    assert response.status_code == 200, response.text
+    return [todo["id"] for todo in response.json()]
+
+
+def test_search_title_and_description():
+    """测试搜索标题和描述，返回格式与列表接口一致"""
+    ids = create_todos([
+        ("学习Python编程", "每天一小时", False),
+        ("买菜", "记得买牛奶", False),
+        ("写周报", "整理Python项目进度", True),
+    ])
+
+    assert sorted(search(q="python")) == [ids[0], ids[2]]
+    assert search(q="牛奶") == [ids[1]]
+    assert search(q="Python 周报") == [ids[2]]
+    assert search(q="不存在的内容") == []
+
+    response = client.get("/api/v1/todos/search", params={"q": "买菜"})
+    assert response.json() == [client.get(f"/api/v1/todos/{ids[1]}").json()]
+    assert "ETag" in response.headers
+
+
+def test_search_prefix_and_ranking():
+    """测试前缀匹配，匹配次数越多的记录排序越靠前，短搜索词同样可以匹配"""
+    ids = create_todos([
+        ("数据库迁移", "编写方案并安排时间", False),
+        ("数据库迁移", "数据库迁移回滚演练", False),
+        ("其他任务", None, False),
+    ])
+
+    assert sorted(search(q="数据")) == ids[:2]
+    assert sorted(search(q="数据库迁")) == ids[:2]
+    assert search(q="数据库迁移") == [ids[1], ids[0]]
+
+
+def test_search_filter():
+    """测试搜索结果按完成状态筛选"""
+    ids = create_todos([("整理文档", None, False), ("整理房间", None, True)])
+
+    assert search(q="整理", filter="active") == [ids[0]]
+    assert search(q="整理", filter="completed") == [ids[1]]
+    assert sorted(search(q="整理", filter="all")) == ids
+
+
+def test_search_cursor_pagination():
+    """测试按游标翻页遍历全部搜索结果，不重复也不遗漏"""
+    ids = create_todos([(f"季度报告{i}", "报告" * (i % 3 + 1), False) for i in range(7)])
+
+    seen = []
+    params = {"q": "报告", "limit": 3}
+    while True:
+        response = client.get("/api/v1/todos/search", params=params)
+        seen += [todo["id"] for todo in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    assert sorted(seen) == ids
+    assert seen == search(q="报告", limit=100)
+
+    response = client.get("/api/v1/todos/search", params={"q": "报告", "cursor": "无效"})
+    assert response.status_code == 400
+
+
+def test_search_follows_updates_and_deletes():
+    """测试修改和删除待办事项后搜索索引同步更新"""
+    ids = create_todos([("修理自行车", None, False)])
+
+    client.put(f"/api/v1/todos/{ids[0]}", json={"title": "修理电脑"})
+    assert search(q="自行车") == []
+    assert search(q="修理电脑") == ids
+    client.put(f"/api/v1/todos/{ids[0]}/complete")
+    assert search(q="修理电脑") == ids
+    client.delete(f"/api/v1/todos/{ids[0]}")
+    assert search(q="修理电脑") == []
+
+
+def test_search_special_characters():
+    """测试搜索内容中的查询语法和通配符按普通字符处理"""
+    ids = create_todos([('完成"引号" AND 任务', "100%_完成", False), ("普通任务", None, False)])
+
+    assert search(q='"引号"') == [ids[0]]
+    assert search(q="AND") == [ids[0]]
+    assert search(q="%_") == [ids[0]]
+    assert client.get("/api/v1/todos/search", params={"q": ""}).status_code == 422
+
+
+def test_search_uses_fts_index():
+    """测试搜索通过FTS5索引匹配，而不是扫描todos表"""
+    plans = query_plans(lambda db: todo_crud.search_todo_rows(db, "任务清单", completed=False, after=(-1.0, 10)))
+    assert "VIRTUAL TABLE INDEX" in plans[0]
+    assert "SCAN todos" not in plans[0].replace("SCAN todos_fts", "")
+
+
+def test_search_is_scoped_to_owner():
+    """测试全文索引按所有者匹配，所有者ID互为子串或只有大小写不同时也不会搜到其他所有者的记录"""
+    owners = ["ali", "alice", "Ali", "a"]
+    with SessionLocal() as db:
+        for owner_id in owners:
+            todo_crud.create_todos(db, [TodoCreate(title="修理电脑")], owner_id=owner_id)
+        for owner_id in owners:
+            rows = todo_crud.search_todo_rows(db, "修理电脑", owner_id=owner_id)
+            assert [row["owner_id"] for row in rows] == [owner_id]
+            assert [row["owner_id"] for row in todo_crud.search_todo_rows(db, "修理", owner_id=owner_id)] == [owner_id]
+        # 搜索词只匹配标题和描述，不匹配全文索引中的所有者
+        assert todo_crud.search_todo_rows(db, "lic", owner_id="alice") == []
+
+
+def test_short_terms_use_owner_index():
+    """测试只有短搜索词时通过全文索引读取该所有者的记录再过滤，不扫描todos表"""
+    plans = query_plans(lambda db: todo_crud.search_todo_rows(db, "买菜", owner_id="alice"))
+    assert "VIRTUAL TABLE INDEX" in plans[0]
+    assert "SCAN todos" not in plans[0].replace("SCAN todos_fts", "")
+
+
+def test_migration_indexes_existing_todos():
+    """测试迁移为已有的待办事项建立搜索索引"""
+    path = os.path.join(tempfile.mkdtemp(prefix="todos-migration-"), "old.db")
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{path}")
+    command.upgrade(config, "0003")
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO todos (title, completed) VALUES ('迁移前的任务', 0)")
+    conn.commit()
+    conn.close()
+
+    command.upgrade(config, "head")
+
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT rowid FROM todos_fts WHERE todos_fts MATCH '\"迁移前\"'").fetchall()
+    conn.close()
+    assert rows == [(1,)]
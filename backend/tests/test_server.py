@@ -0,0 +1,199 @@
+"""
+服务启动配置和数据库初始化测试用例
+"""
+import asyncio
+import multiprocessing
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+import app.main
+from app.core import server
+from app.core.config import settings
+from app.core.database import check_db, engine_options, init_db
+from app.core.server import PROMETHEUS_MULTIPROC_ENV, configure_multiprocess_metrics, uvicorn_options, worker_count
+from app.core.tasks import PeriodicTask, acquire_lease, release_lease
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def init_db_in_process(url: str) -> None:
+    """在子进程中对指定的数据库建表"""
+    init_db(create_engine(url, **engine_options(url)))
+
+
+def test_development_options():
+    """测试开发模式为单进程并自动重载"""
+    options = uvicorn_options()
+    assert options["reload"] is True
+    assert "workers" not in options
+    assert options["port"] == settings.server_port
+
+
+def test_production_options(monkeypatch):
+    """测试生产模式的工作进程数和连接参数来自配置"""
+    monkeypatch.setattr(settings, "server_mode", "production")
+    monkeypatch.setattr(settings, "server_workers", 3)
+    monkeypatch.setattr(settings, "server_keepalive", 75)
+    monkeypatch.setattr(settings, "server_loop", "uvloop")
+    options = uvicorn_options()
+    assert "reload" not in options
+    assert options["workers"] == 3
+    assert options["timeout_keep_alive"] == 75
+    assert options["loop"] == "uvloop"
+    assert options["backlog"] == settings.server_backlog
+    assert options["timeout_graceful_shutdown"] == settings.server_graceful_timeout
+
+    # 未配置工作进程数时使用CPU核数
+    monkeypatch.setattr(settings, "server_workers", 0)
+    assert worker_count() == (os.cpu_count() or 1)
+
+    monkeypatch.setattr(settings, "server_mode", "staging")
+    with pytest.raises(ValueError):
+        uvicorn_options()
+
+
+def test_production_default_workers(monkeypatch):
+    """测试生产模式使用默认配置时按CPU核数启动多个工作进程，事件流等功能不需要额外配置"""
+    monkeypatch.setattr(settings, "server_mode", "production")
+    monkeypatch.setattr(settings, "server_workers", 0)
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    assert uvicorn_options()["workers"] == 8
+
+
+def test_multiprocess_metrics_dir(monkeypatch):
+    """测试多个工作进程时创建Prometheus多进程指标目录，单进程或已设置时不创建"""
+    monkeypatch.delenv(PROMETHEUS_MULTIPROC_ENV, raising=False)
+    assert configure_multiprocess_metrics(1) is None
+    assert PROMETHEUS_MULTIPROC_ENV not in os.environ
+
+    directory = configure_multiprocess_metrics(4)
+    try:
+        assert os.path.isdir(directory)
+        assert os.environ[PROMETHEUS_MULTIPROC_ENV] == directory
+        assert configure_multiprocess_metrics(4) is None
+    finally:
+        # 环境变量由被测函数设置，monkeypatch不会还原，避免影响之后启动的子进程
+        os.environ.pop(PROMETHEUS_MULTIPROC_ENV, None)
+        os.rmdir(directory)
+
+
+def test_run_server_removes_metrics_dir(monkeypatch):
+    """测试服务退出后删除自动创建的指标目录，工作进程启动时环境变量已设置"""
+    uvicorn = pytest.importorskip("uvicorn")
+    monkeypatch.delenv(PROMETHEUS_MULTIPROC_ENV, raising=False)
+    monkeypatch.setattr(settings, "server_mode", "production")
+    monkeypatch.setattr(settings, "server_workers", 2)
+    monkeypatch.setattr(server, "preload", lambda: None)
+    seen = []
+    monkeypatch.setattr(uvicorn, "run", lambda app, **options: seen.append(os.environ[PROMETHEUS_MULTIPROC_ENV]))
+    try:
+        server.run_server()
+    finally:
+        os.environ.pop(PROMETHEUS_MULTIPROC_ENV, None)
+    assert len(seen) == 1
+    assert not os.path.exists(seen[0])
+
+
+def test_task_lease():
+    """测试同一时间只有一个进程持有任务租约，持有者可以续期，过期或释放后其他进程可以取得"""
+    assert acquire_lease("lease_test", "worker-a", 60)
+    assert not acquire_lease("lease_test", "worker-b", 60)
+    assert acquire_lease("lease_test", "worker-a", 60)
+
+    release_lease("lease_test", "worker-b")
+    assert not acquire_lease("lease_test", "worker-b", 60)
+    release_lease("lease_test", "worker-a")
+    assert acquire_lease("lease_test", "worker-b", 0)
+    # 租约已过期
+    assert acquire_lease("lease_test", "worker-a", 60)
+    release_lease("lease_test", "worker-a")
+
+
+def test_exclusive_task_skips_without_lease():
+    """测试其他进程持有租约时独占任务跳过运行，停止时释放自己持有的租约"""
+    calls = []
+    assert acquire_lease("exclusive_test", "other-worker", 60)
+
+    async def run(expected: int):
+        task = PeriodicTask("exclusive_test", lambda: calls.append(1), 0.01, exclusive=True)
+        task.start()
+        deadline = time.monotonic() + 5
+        while len(calls) < expected and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        await task.stop()
+
+    asyncio.run(run(0))
+    assert calls == []
+
+    release_lease("exclusive_test", "other-worker")
+    asyncio.run(run(1))
+    assert calls
+    # 任务停止时已释放租约
+    assert acquire_lease("exclusive_test", "other-worker", 60)
+    release_lease("exclusive_test", "other-worker")
+
+
+def test_import_does_not_create_tables():
+    """测试导入应用时不访问数据库，也不导入用不到的模块"""
+    path = os.path.join(tempfile.mkdtemp(prefix="todos-server-"), "import.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}")
+    script = "import sys, app.main; print(sorted({'app.api.v1.todos_async', 'uvicorn'} & set(sys.modules)))"
+    completed = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    assert completed.stdout.strip() == "[]"
+    assert not os.path.exists(path)
+
+
+def test_schema_setup_on_startup(monkeypatch):
+    """测试应用启动时按配置建表、检查表结构或跳过"""
+    calls = []
+    monkeypatch.setattr(app.main, "SCHEMA_SETUP", {
+        "create": lambda: calls.append("create"), "check": lambda: calls.append("check"), "skip": None
+    })
+    for setup in ("create", "check", "skip"):
+        monkeypatch.setattr(settings, "db_schema_setup", setup)
+        with TestClient(app.main.app):
+            pass
+    assert calls == ["create", "check"]
+
+    monkeypatch.setattr(settings, "db_schema_setup", "drop")
+    with pytest.raises(ValueError):
+        with TestClient(app.main.app):
+            pass
+
+
+def test_check_db():
+    """测试检查表结构时发现缺少的表，不创建表"""
+    check_db()
+    path = os.path.join(tempfile.mkdtemp(prefix="todos-server-"), "empty.db")
+    empty = create_engine(f"sqlite:///{path}")
+    with pytest.raises(RuntimeError, match="todos"):
+        check_db(empty)
+    with empty.connect() as conn:
+        assert conn.exec_driver_sql("SELECT count(*) FROM sqlite_master").scalar() == 0
+
+
+def test_concurrent_init_db():
+    """测试多个工作进程同时建表时不会因表已存在而失败"""
+    path = os.path.join(tempfile.mkdtemp(prefix="todos-server-"), "workers.db")
+    url = f"sqlite:///{path}"
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        pool.map(init_db_in_process, [url] * 8)
+
+    conn = sqlite3.connect(path)
+    triggers = conn.execute("SELECT count(*) FROM sqlite_master WHERE name = 'todos_version_insert'").fetchone()
+    conn.execute("INSERT INTO todos (title) VALUES ('任务')")
+    counts = conn.execute("SELECT owner_id, total_count, version FROM todo_owner_counts").fetchall()
+    conn.close()
+    assert triggers == (1,)
+    assert counts == [("default", 1, 1)]
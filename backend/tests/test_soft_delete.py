@@ -0,0 +1,159 @@
+"""
+软删除与后台清理测试用例
+"""
+import json
+import os
+import sqlite3
+import tempfile
+
+from alembic import command
+from alembic.config import Config
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from structlog.testing import capture_logs
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.events import todo_events
+from app.crud.todo import todo_crud
+from app.jobs import purge_deleted
+from app.main import app
+from app.models.todo import DEFAULT_OWNER, Todo, TodoTombstone
+
+from tests.test_indexes import ALEMBIC_INI, query_plans
+
+client = TestClient(app)
+
+
+def stored_rows() -> int:
+    """todos表中实际存储的记录数，包括已软删除的记录"""
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(Todo))
+
+
+def create_todos(count: int, completed: bool = False) -> list:
+    """创建指定数量的待办事项，返回ID列表"""
+    response = client.post(
+        "/api/v1/todos/batch", json=[{"title": f"清理任务{i}", "completed": completed} for i in range(count)]
+    )
+    return [result["id"] for result in response.json()["results"]]
+
+
+def test_delete_completed_hides_rows(query_counter):
+    """测试删除已完成的待办事项后，记录在清理前已不出现在任何读取结果中"""
+    create_todos(3, completed=True)
+    active = create_todos(2)
+    query_counter.clear()
+
+    response = client.delete("/api/v1/todos/completed")
+    assert response.status_code == 200
+    # 删除只是一条UPDATE语句，不在请求中执行DELETE
+    assert not any(statement.lstrip().upper().startswith("DELETE") for statement in query_counter)
+    assert stored_rows() == 5
+
+    assert [todo["id"] for todo in client.get("/api/v1/todos").json()] == active
+    assert client.get("/api/v1/todos?filter=completed").json() == []
+    assert [todo["id"] for todo in client.get("/api/v1/todos/search?q=清理任务").json()] == active
+    exported = [json.loads(line)["id"] for line in client.get("/api/v1/todos/export").text.splitlines()]
+    assert exported == active
+    assert client.get("/api/v1/todos/stats").json() == {"total": 2, "active": 2, "completed": 0}
+    assert [todo["id"] for todo in client.get("/api/v1/todos/changes").json()["todos"]] == active
+
+
+def test_deleted_todo_is_not_found():
+    """测试已软删除的待办事项不能再读取、修改或删除"""
+    todo_id = create_todos(1, completed=True)[0]
+    client.delete("/api/v1/todos")
+
+    assert client.get(f"/api/v1/todos/{todo_id}").status_code == 404
+    assert client.put(f"/api/v1/todos/{todo_id}", json={"title": "修改"}).status_code == 404
+    assert client.put(f"/api/v1/todos/{todo_id}/uncomplete").status_code == 404
+    assert client.delete(f"/api/v1/todos/{todo_id}").status_code == 404
+    response = client.patch("/api/v1/todos/batch", json=[{"id": todo_id, "completed": False}])
+    assert response.json()["results"][0]["status"] == "not_found"
+    # 重复删除不会再次计入
+    assert client.delete("/api/v1/todos").json()["message"] == client.delete("/api/v1/todos").json()["message"]
+
+
+def test_purge_removes_deleted_rows():
+    """测试后台清理删除已软删除的记录，不改变数据版本号、计数和删除记录"""
+    ids = create_todos(5)
+    client.delete("/api/v1/todos")
+    etag = client.get("/api/v1/todos").headers["ETag"]
+    with SessionLocal() as db:
+        tombstones = db.execute(select(TodoTombstone.id, TodoTombstone.change_version)).all()
+
+    with capture_logs() as logs:
+        assert purge_deleted() == 5
+    assert [log["event"] for log in logs] == ["todos_purged"]
+    assert stored_rows() == 0
+    assert client.get("/api/v1/todos").headers["ETag"] == etag
+    assert client.get("/api/v1/todos/stats").json() == {"total": 0, "active": 0, "completed": 0}
+    with SessionLocal() as db:
+        assert db.execute(select(TodoTombstone.id, TodoTombstone.change_version)).all() == tombstones
+    assert {tombstone.id for tombstone in tombstones} >= set(ids)
+
+    assert purge_deleted() == 0
+
+
+def test_purge_is_time_bounded(monkeypatch):
+    """测试单次清理用完时间后停止，剩余记录留到下一次运行"""
+    create_todos(5)
+    client.delete("/api/v1/todos")
+    monkeypatch.setattr(settings, "purge_batch_size", 2)
+    monkeypatch.setattr(settings, "purge_time_budget", 0)
+
+    assert purge_deleted() == 2
+    assert stored_rows() == 3
+    monkeypatch.setattr(settings, "purge_time_budget", 10)
+    assert purge_deleted() == 3
+    assert stored_rows() == 0
+
+
+def test_purge_uses_partial_index():
+    """测试清理通过只包含已删除记录的部分索引查找待清理的记录"""
+    plans = query_plans(lambda db: todo_crud.purge_deleted_todos(db, 10))
+    assert "ix_todos_deleted_at" in plans[0]
+
+
+def test_migration_adds_soft_delete():
+    """测试迁移为已有数据库添加软删除列，之后软删除和清理由触发器正确计数"""
+    path = os.path.join(tempfile.mkdtemp(prefix="todos-migration-"), "old.db")
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{path}")
+    command.upgrade(config, "0001")
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO todos (title, completed) VALUES (?, ?)", [("任务", 1), ("任务", 0), ("任务", 1)])
+    conn.commit()
+    conn.close()
+
+    command.upgrade(config, "head")
+
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE todos SET deleted_at = CURRENT_TIMESTAMP WHERE completed")
+    conn.execute("DELETE FROM todos WHERE deleted_at IS NOT NULL")
+    counts = conn.execute("SELECT total_count, completed_count, version FROM todo_owner_counts").fetchone()
+    tombstones = conn.execute("SELECT id, change_version FROM todo_tombstones ORDER BY id").fetchall()
+    conn.close()
+    assert counts == (1, 0, 3)
+    assert tombstones == [(1, 2), (3, 3)]
+
+
+
+def test_clear_in_batches(monkeypatch, query_counter):
+    """测试清空按clear_batch_size条一批分别提交，全部完成后只唤醒一次事件流中继"""
+    create_todos(5, completed=True)
+    active = create_todos(2)
+    monkeypatch.setattr(settings, "clear_batch_size", 2)
+    notified = []
+    monkeypatch.setattr(todo_events, "notify", notified.append)
+    query_counter.clear()
+
+    response = client.delete("/api/v1/todos/completed")
+    assert response.json()["message"] == "成功删除 5 个已完成的待办事项"
+    updates = [statement for statement in query_counter if statement.startswith("UPDATE todos")]
+    assert len(updates) == 3
+    assert notified == [DEFAULT_OWNER]
+    assert [todo["id"] for todo in client.get("/api/v1/todos").json()] == active
+    assert client.get("/api/v1/todos/stats").json() == {"total": 2, "active": 2, "completed": 0}
+    assert client.delete("/api/v1/todos").json()["message"] == "成功删除 2 个待办事项"
@@ -0,0 +1,149 @@
+"""
+列表排序测试用例
+"""
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.cache import todo_cache
+from app.core.database import SessionLocal, engine
+from app.crud.todo import todo_crud
+from app.main import app
+from app.schemas.todo import TodoCreate
+
+from tests.test_indexes import query_plans
+
+client = TestClient(app)
+
+SORTS = ["id", "created_at", "updated_at", "title"]
+
+
+def create_todos() -> list:
+    """
+    创建排序测试数据
+    标题、创建时间和更新时间的顺序各不相同，并包含排序值相同的记录和从未更新过的记录
+    """
+    titles = ["香蕉", "apple", "Cherry", "apple", "banana", "香蕉"]
+    with SessionLocal() as db:
+        rows = todo_crud.create_todos(
+            db, [TodoCreate(title=title, completed=i % 2 == 0) for i, title in enumerate(titles)]
+        )
+    ids = [row.id for row in rows]
+    times = [
+        (ids[0], "2026-01-03 08:00:00", None),
+        (ids[1], "2026-01-01 08:00:00", "2026-01-05 08:00:00"),
+        (ids[2], "2026-01-02 08:00:00", None),
+        (ids[3], "2026-01-01 08:00:00", "2026-01-02 08:00:00"),
+        (ids[4], "2026-01-04 08:00:00", "2026-01-04 09:00:00"),
+        (ids[5], "2026-01-02 08:00:00", "2026-01-03 08:00:00"),
+    ]
+    with engine.begin() as conn:
+        for todo_id, created_at, updated_at in times:
+            conn.exec_driver_sql(
+                "UPDATE todos SET created_at = ?, updated_at = ? WHERE id = ?", (created_at, updated_at, todo_id)
+            )
+    todo_cache.clear()
+    return ids
+
+
+def list_ids(**params) -> list:
+    """调用列表接口并返回ID"""
+    response = client.get("/api/v1/todos", params=params)
+    assert response.status_code == 200, response.text
+    return [todo["id"] for todo in response.json()]
+
+
+def expected_order(todos: list, sort: str, descending: bool) -> list:
+    """在内存中按相同规则排序，作为接口结果的对照"""
+    def key(todo):
+        value = todo["updated_at"] or todo["created_at"] if sort == "updated_at" else todo[sort]
+        return value, todo["id"]
+    return [todo["id"] for todo in sorted(todos, key=key, reverse=descending)]
+
+
+def test_sort_fields():
+    """测试按各字段升序和降序排序，排序值相同时按ID排序"""
+    ids = create_todos()
+
+    # 标题按二进制顺序比较，大写字母排在小写字母之前
+    assert list_ids(sort="title") == [ids[2], ids[1], ids[3], ids[4], ids[0], ids[5]]
+    assert list_ids(sort="title", order="desc") == [ids[5], ids[0], ids[4], ids[3], ids[1], ids[2]]
+    assert list_ids(sort="created_at") == [ids[1], ids[3], ids[2], ids[5], ids[0], ids[4]]
+    # 从未更新过的记录按创建时间参与排序
+    assert list_ids(sort="updated_at", order="desc") == [ids[1], ids[4], ids[5], ids[0], ids[3], ids[2]]
+    assert list_ids(sort="id", order="desc") == ids[::-1]
+
+
+def test_sort_with_filter():
+    """测试排序与完成状态筛选组合使用"""
+    ids = create_todos()
+
+    assert list_ids(sort="title", filter="completed") == [ids[2], ids[4], ids[0]]
+    assert list_ids(sort="created_at", order="desc", filter="active") == [ids[5], ids[3], ids[1]]
+
+
+@pytest.mark.parametrize("sort", SORTS)
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_sort_cursor_pagination(sort, order):
+    """测试每种排序按游标翻页的结果与一次取出的结果一致"""
+    create_todos()
+    todos = client.get("/api/v1/todos").json()
+
+    seen = []
+    params = {"sort": sort, "order": order, "limit": 2}
+    while True:
+        response = client.get("/api/v1/todos", params=params)
+        seen += [todo["id"] for todo in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    assert seen == expected_order(todos, sort, order == "desc")
+
+
+def test_sort_cursor_stable_under_writes():
+    """测试翻页期间新增和删除记录，后续页面不重复也不遗漏"""
+    ids = create_todos()
+
+    response = client.get("/api/v1/todos", params={"sort": "title", "limit": 3})
+    first_page = [todo["id"] for todo in response.json()]
+    # 新增排在当前页之前的记录，并删除当前页的最后一条记录
+    client.post("/api/v1/todos", json={"title": "aardvark"})
+    client.delete(f"/api/v1/todos/{first_page[-1]}")
+
+    cursor = response.headers["X-Next-Cursor"]
+    second_page = list_ids(sort="title", limit=3, cursor=cursor)
+    assert first_page + second_page == [ids[2], ids[1], ids[3], ids[4], ids[0], ids[5]]
+
+
+def test_sort_invalid_parameters():
+    """测试无效的排序参数和与排序参数不一致的游标"""
+    create_todos()
+
+    assert client.get("/api/v1/todos", params={"sort": "description"}).status_code == 422
+    assert client.get("/api/v1/todos", params={"order": "random"}).status_code == 422
+
+    cursor = client.get("/api/v1/todos", params={"sort": "title", "limit": 2}).headers["X-Next-Cursor"]
+    response = client.get("/api/v1/todos", params={"sort": "created_at", "cursor": cursor})
+    assert response.status_code == 400
+    response = client.get("/api/v1/todos", params={"sort": "title", "order": "desc", "cursor": cursor})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("sort", SORTS)
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("completed", [None, True])
+def test_sort_uses_index(sort, descending, completed):
+    """测试每种排序（包括筛选和游标翻页）都通过索引按顺序读取，无需额外排序"""
+    after_value = {"id": None, "title": "apple"}.get(sort, datetime(2026, 1, 2, 8))
+
+    for after_id in (None, 3):
+        plans = query_plans(lambda db: todo_crud.get_todo_rows(
+            db, completed=completed, after_id=after_id, sort=sort, descending=descending, after_value=after_value
+        ))
+        assert "TEMP B-TREE" not in plans[0], plans[0]
+        if sort != "id":
+            assert "INDEX ix_todos_" in plans[0], plans[0]
+        if after_id is not None and sort != "id":
+            # 游标条件用于在索引中定位，而不是从头扫描
+            assert ">?" in plans[0] or "<?" in plans[0], plans[0]
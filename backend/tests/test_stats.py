@@ -0,0 +1,140 @@
+"""
+待办事项计数测试用例
+"""
+import asyncio
+import os
+import sqlite3
+import tempfile
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from structlog.testing import capture_logs
+
+from app.core.database import SessionLocal, engine
+from app.core.tasks import PeriodicTask
+from app.jobs import reconcile_counts
+from app.main import app
+from app.models.todo import DEFAULT_OWNER, Todo, todo_not_deleted
+
+from tests.test_indexes import ALEMBIC_INI
+
+client = TestClient(app)
+
+
+def actual_stats() -> dict:
+    """直接统计todos表中未删除的记录，作为计数的对照"""
+    with SessionLocal() as db:
+        total = db.scalar(select(func.count()).where(todo_not_deleted))
+        completed = db.scalar(select(func.count()).where(todo_not_deleted, Todo.completed == True))
+    return {"total": total, "active": total - completed, "completed": completed}
+
+
+def test_stats_follow_writes():
+    """测试各种写操作之后计数与实际数据一致"""
+    assert client.get("/api/v1/todos/stats").json() == {"total": 0, "active": 0, "completed": 0}
+
+    ids = [client.post("/api/v1/todos", json={"title": f"任务{i}"}).json()["id"] for i in range(5)]
+    client.put(f"/api/v1/todos/{ids[0]}/complete")
+    client.put(f"/api/v1/todos/{ids[1]}", json={"completed": True})
+    client.put(f"/api/v1/todos/{ids[1]}", json={"title": "只修改标题"})
+    assert client.get("/api/v1/todos/stats").json() == {"total": 5, "active": 3, "completed": 2}
+
+    client.put(f"/api/v1/todos/{ids[0]}/uncomplete")
+    client.delete(f"/api/v1/todos/{ids[2]}")
+    client.post("/api/v1/todos/batch", json=[{"title": "批量", "completed": True}] * 3)
+    client.patch("/api/v1/todos/batch", json=[{"id": ids[3], "completed": True}])
+    client.post("/api/v1/todos/import", content='{"title": "导入", "completed": true}\n{"title": "导入"}\n'.encode("utf-8"))
+    assert client.get("/api/v1/todos/stats").json() == actual_stats()
+
+    client.delete("/api/v1/todos/completed")
+    assert client.get("/api/v1/todos/stats").json() == actual_stats()
+    client.delete("/api/v1/todos")
+    assert client.get("/api/v1/todos/stats").json() == {"total": 0, "active": 0, "completed": 0}
+
+
+def test_stats_do_not_scan_todos(query_counter):
+    """测试计数接口只读取所有者的计数行，不扫描todos表"""
+    client.post("/api/v1/todos/batch", json=[{"title": "任务"}] * 10)
+    query_counter.clear()
+
+    client.get("/api/v1/todos/stats")
+    assert len(query_counter) == 1
+    assert "todo_owner_counts" in query_counter[0]
+    assert "todos" not in query_counter[0].replace("todo_owner_counts", "")
+
+
+def test_reconcile_counts_fixes_drift():
+    """测试重新统计修正偏差的计数并记录警告日志"""
+    client.post("/api/v1/todos/batch", json=[{"title": "任务", "completed": i % 2 == 0} for i in range(4)])
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE todo_owner_counts SET total_count = 100, completed_count = 7 WHERE owner_id = 'default'")
+    version = client.get("/api/v1/todos").headers["ETag"]
+
+    with capture_logs() as logs:
+        result = reconcile_counts()
+    assert result == {"primary": [DEFAULT_OWNER]}
+    assert [log["event"] for log in logs] == ["todo_owner_counts_drift"]
+    assert client.get("/api/v1/todos/stats").json() == {"total": 4, "active": 2, "completed": 2}
+    # 修正计数不改变数据版本号
+    assert client.get("/api/v1/todos").headers["ETag"] == version
+
+    with capture_logs() as logs:
+        reconcile_counts()
+    assert logs == []
+
+
+def test_periodic_task():
+    """测试周期性任务按间隔运行，任务出错时记录日志并继续运行"""
+    calls = []
+
+    def job():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            raise RuntimeError("任务失败")
+
+    async def run():
+        task = PeriodicTask("test", job, 0.01)
+        task.start()
+        while len(calls) < 3:
+            await asyncio.sleep(0.01)
+        await task.stop()
+
+    with capture_logs() as logs:
+        asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert len(calls) >= 3
+    assert logs[0]["event"] == "task_failed"
+
+
+@pytest.mark.parametrize("interval", [0, -1])
+def test_periodic_task_disabled(interval):
+    """测试间隔不大于0时任务不启动"""
+    async def run():
+        task = PeriodicTask("test", lambda: None, interval)
+        task.start()
+        return task._task
+
+    assert asyncio.run(run()) is None
+
+
+def test_migration_counts_existing_todos():
+    """测试迁移统计已有的待办事项，之后的写入由触发器维护计数"""
+    path = os.path.join(tempfile.mkdtemp(prefix="todos-migration-"), "old.db")
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{path}")
+    command.upgrade(config, "0001")
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO todos (title, completed) VALUES (?, ?)", [("任务", 1), ("任务", 0), ("任务", 0)])
+    conn.commit()
+    conn.close()
+
+    command.upgrade(config, "head")
+
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE todos SET completed = 1 WHERE id = 2")
+    conn.execute("DELETE FROM todos WHERE id = 3")
+    counts = conn.execute("SELECT owner_id, total_count, completed_count, version FROM todo_owner_counts").fetchall()
+    conn.close()
+    assert counts == [(DEFAULT_OWNER, 2, 2, 3)]
@@ -0,0 +1,221 @@
+"""
+待办事项变更事件流测试用例
+"""
+import asyncio
+import json
+import threading
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.events import EventBroadcaster, todo_events
+from app.crud.todo import todo_crud
+from app.main import app
+from app.models.todo import DEFAULT_OWNER, Todo
+from app.schemas.todo import TodoCreate, TodoUpdate
+
+
+def parse_events(body: str) -> list:
+    """解析Server-Sent Events响应体，返回每条消息的字段"""
+    messages = []
+    for block in body.split("\n\n"):
+        fields = {}
+        for line in block.splitlines():
+            name, _, value = line.partition(": ")
+            fields[name] = value
+        if fields:
+            messages.append(fields)
+    return messages
+
+
+def wait_relayed(owner_id: str = DEFAULT_OWNER) -> None:
+    """等待中继任务发布所有者当前版本号之前的所有变更"""
+    with SessionLocal() as db:
+        version = todo_crud.get_version(db, owner_id)
+    deadline = time.monotonic() + 5
+    while todo_events.cursors().get(owner_id, version) < version and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def stream(action, **kwargs) -> list:
+    """
+    连接事件流，连接建立后在另一个线程中执行action，等待中继任务发布之后的变更后关闭事件流并返回收到的消息
+
+    Args:
+        action: 连接建立后执行的操作
+        kwargs: 传给client.get的参数
+    """
+    def run():
+        deadline = time.monotonic() + 5
+        while todo_events.subscriber_count == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        action()
+        wait_relayed()
+        todo_events.close()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    # 进入lifespan才会启动中继任务
+    with TestClient(app) as client:
+        response = client.get("/api/v1/todos/stream", **kwargs)
+    thread.join()
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return parse_events(response.text)
+
+
+def test_stream_write_events():
+    """测试CRUD的写操作推送对应的事件，事件ID为变更后的数据版本号"""
+    def writes():
+        with SessionLocal() as db:
+            todo = todo_crud.create_todo(db, TodoCreate(title="推送"))
+            wait_relayed()
+            todo_crud.update_todo(db, todo.id, TodoUpdate(completed=True))
+            wait_relayed()
+            todo_crud.create_todos(db, [TodoCreate(title="批量")])
+            wait_relayed()
+            todo_crud.delete_todo(db, todo.id)
+            wait_relayed()
+            # 没有已完成的记录可删除，数据版本号不变，不推送事件
+            todo_crud.delete_completed_todos(db)
+            todo_crud.import_todos(db, [TodoCreate(title="导入")])
+
+    messages = stream(writes)
+    # 第一条消息只包含事件ID，用于断线重连
+    assert set(messages[0]) == {"id"}
+    events = messages[1:]
+    assert [event["event"] for event in events] == ["created", "updated", "created", "deleted", "created"]
+    created = json.loads(events[0]["data"])
+    assert created["title"] == "推送"
+    assert set(created) == {"id", "title", "description", "completed", "created_at", "updated_at"}
+    assert json.loads(events[1]["data"])["completed"] is True
+    assert json.loads(events[3]["data"]) == {"id": created["id"]}
+    assert json.loads(events[4]["data"])["title"] == "导入"
+    versions = [int(message["id"]) for message in messages]
+    assert versions == sorted(set(versions))
+
+
+def test_stream_other_process_writes(monkeypatch):
+    """测试其他工作进程的写操作（不唤醒本进程的中继任务）在下一次轮询时推送"""
+    monkeypatch.setattr(todo_events, "poll_interval", 0.05)
+    with SessionLocal() as db:
+        todo_id = todo_crud.create_todo(db, TodoCreate(title="推送")).id
+
+    def write():
+        # 直接写入数据库，模拟另一个工作进程处理的写请求
+        with SessionLocal() as db:
+            db.execute(update(Todo).where(Todo.id == todo_id).values(title="其他进程"))
+            db.commit()
+
+    messages = stream(write)
+    assert [message.get("event") for message in messages] == [None, "updated"]
+    assert json.loads(messages[1]["data"])["title"] == "其他进程"
+
+
+def test_stream_resume_from_last_event_id():
+    """测试携带Last-Event-ID重连时从数据库补发之后的变更"""
+    with SessionLocal() as db:
+        todo_crud.create_todo(db, TodoCreate(title="第一条"))
+        first = todo_crud.get_version(db)
+        todo_crud.create_todo(db, TodoCreate(title="第二条"))
+        second = todo_crud.get_version(db)
+
+    messages = stream(lambda: None, headers={"Last-Event-ID": str(first)})
+    assert [message["id"] for message in messages] == [str(second)]
+    assert json.loads(messages[0]["data"])["title"] == "第二条"
+
+    messages = stream(lambda: None, params={"since": str(second)})
+    assert messages == []
+
+
+def test_stream_reset_for_unknown_event_id():
+    """测试事件ID无效或超过当前版本号时通知客户端重新获取列表"""
+    for last_event_id in ["00000000-1", "999999"]:
+        messages = stream(lambda: None, headers={"Last-Event-ID": last_event_id})
+        assert messages[0]["event"] == "reset"
+        assert json.loads(messages[0]["data"]) == {"reason": "expired"}
+
+
+def test_stream_reset_for_too_many_changes(monkeypatch):
+    """测试错过的变更超过stream_batch_limit条时通知客户端重新获取列表"""
+    monkeypatch.setattr(settings, "stream_batch_limit", 2)
+    with SessionLocal() as db:
+        todo_crud.create_todo(db, TodoCreate(title="第一条"))
+        since = todo_crud.get_version(db)
+        todo_crud.create_todos(db, [TodoCreate(title=f"批量{i}") for i in range(3)])
+        version = todo_crud.get_version(db)
+
+    messages = stream(lambda: None, headers={"Last-Event-ID": str(since)})
+    assert [(message["id"], message["event"]) for message in messages] == [(str(version), "reset")]
+
+
+def test_stream_keepalive(monkeypatch):
+    """测试没有事件时定期发送心跳注释"""
+    monkeypatch.setattr(settings, "stream_keepalive", 0.01)
+
+    messages = stream(lambda: time.sleep(0.1))
+    # 注释行以冒号开头，字段名为空
+    assert {"": "keepalive"} in messages
+
+
+def test_broadcaster_skips_replayed_events():
+    """测试订阅者跳过已从数据库补发的事件，只接收订阅的所有者的事件"""
+    async def run():
+        broadcaster = EventBroadcaster(queue_size=10)
+        subscription = broadcaster.subscribe("alice", after=0)
+        broadcaster.publish("created", {"id": 1}, "alice", 1)
+        broadcaster.publish("created", {"id": 2}, "bob", 2)
+        broadcaster.publish("created", {"id": 3}, "alice", 3)
+        await asyncio.sleep(0)
+        subscription.after = 1
+        event = await subscription.get(timeout=1)
+        assert (event.id, event.data) == ("3", '{"id":3}')
+        assert broadcaster.cursors() == {"alice": 3}
+        subscription.close()
+        assert broadcaster.cursors() == {}
+
+    asyncio.run(run())
+
+
+def test_broadcaster_disconnects_slow_subscriber():
+    """测试消费过慢的订阅者被断开，发布方不被阻塞，其他订阅者不受影响"""
+    async def run():
+        broadcaster = EventBroadcaster(queue_size=2)
+        slow = broadcaster.subscribe("alice", after=0)
+        fast = broadcaster.subscribe("alice", after=0)
+        received = []
+        for i in range(5):
+            broadcaster.publish("created", {"id": i}, "alice", i + 1)
+            await asyncio.sleep(0)
+            received.append(await fast.get(timeout=1))
+        assert [json.loads(event.data)["id"] for event in received] == list(range(5))
+        # 队列溢出后丢弃未发送的事件并结束，客户端重连后从最后收到的事件补发
+        assert slow.overflowed
+        assert await slow.get(timeout=1) is None
+        assert broadcaster.subscriber_count == 1
+
+    asyncio.run(run())
+
+
+def test_broadcaster_relay_woken_by_notify():
+    """测试写操作调用notify后立即运行中继任务，不等待轮询间隔"""
+    async def run():
+        broadcaster = EventBroadcaster(poll_interval=60)
+        calls = []
+        broadcaster.start(calls.append)
+        subscription = broadcaster.subscribe("alice", after=5)
+        thread = threading.Thread(target=broadcaster.notify, args=("alice",))
+        thread.start()
+        thread.join()
+        for _ in range(100):
+            if calls:
+                break
+            await asyncio.sleep(0.01)
+        assert calls == [{"alice": 5}]
+        subscription.close()
+        await broadcaster.stop()
+
+    asyncio.run(run())
@@ -6,6 +6,7 @@ from fastapi.testclient import TestClient
 from app.main import app
 from app.core.database import SessionLocal, engine
 from app.models.todo import Base
+from app.core.pagination import encode_cursor
 from app.crud.todo import todo_crud
 from app.schemas.todo import TodoCreate
 
@@ -210,3 +211,114 @@ class TestTodos:
         assert response.status_code == 200
         data = response.json()
         assert len(data) == 0
+    
+    def test_get_todos_cursor_pagination(self, db):
+        """测试使用游标分页获取待办事项列表"""
+        created_ids = [create_test_todo(db, f"任务{i}").id for i in range(5)]
+        
+        response = client.get("/api/v1/todos?limit=2")
+        assert response.status_code == 200
+        assert [todo["id"] for todo in response.json()] == created_ids[:2]
+        cursor = response.headers["X-Next-Cursor"]
+        
+        response = client.get(f"/api/v1/todos?limit=2&cursor={cursor}")
+        assert [todo["id"] for todo in response.json()] == created_ids[2:4]
+        cursor = response.headers["X-Next-Cursor"]
+        
+        # 最后一页未满，不再返回游标
+        response = client.get(f"/api/v1/todos?limit=2&cursor={cursor}")
+        assert [todo["id"] for todo in response.json()] == created_ids[4:]
+        assert "X-Next-Cursor" not in response.headers
+    
+    def test_get_todos_cursor_with_filter(self, db):
+        """测试游标分页与筛选条件组合使用"""
+        todos = [create_test_todo(db, f"任务{i}") for i in range(4)]
+        for todo in todos[1:]:
+            client.put(f"/api/v1/todos/{todo.id}/complete")
+        
+        response = client.get("/api/v1/todos?filter=completed&limit=2")
+        assert [todo["id"] for todo in response.json()] == [todos[1].id, todos[2].id]
+        cursor = response.headers["X-Next-Cursor"]
+        
+        response = client.get(f"/api/v1/todos?filter=completed&limit=2&cursor={cursor}")
+        assert [todo["id"] for todo in response.json()] == [todos[3].id]
+    
+    def test_get_todos_invalid_cursor(self):
+        """测试传入无效游标"""
+        response = client.get("/api/v1/todos?cursor=not-a-cursor")
+        assert response.status_code == 400
+    
+    def test_ids_out_of_range(self):
+        """测试超出数据库整数范围的ID返回客户端错误，不会带入查询"""
+        cursor = encode_cursor({"id": 10 ** 30})
+        assert client.get(f"/api/v1/todos?cursor={cursor}").status_code == 400
+        cursor = encode_cursor({"score": 1.0, "id": -10 ** 30})
+        assert client.get(f"/api/v1/todos/search?q=任务&cursor={cursor}").status_code == 400
+        response = client.request("DELETE", "/api/v1/todos/batch", json=[1, 2 ** 63])
+        assert response.status_code == 400
+        assert client.patch("/api/v1/todos/batch", json=[{"id": 2 ** 63, "title": "任务"}]).status_code == 422
+        assert client.get(f"/api/v1/todos/{10 ** 30}").status_code == 422
+        assert client.get(f"/api/v1/todos/changes?since={2 ** 63}").status_code == 422
+        assert client.get(f"/api/v1/todos/{2 ** 63 - 1}").status_code == 404
+    
+    def test_create_todos_batch(self):
+        """测试批量创建待办事项"""
+        todos_data = [{"title": f"批量任务{i}"} for i in range(3)] + [{"title": "已完成", "completed": True}]
+        response = client.post("/api/v1/todos/batch", json=todos_data)
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [result["status"] for result in results] == ["created"] * 4
+        assert [result["todo"]["title"] for result in results] == [todo["title"] for todo in todos_data]
+        assert results[3]["todo"]["completed"] is True
+        
+        response = client.get("/api/v1/todos")
+        assert len(response.json()) == 4
+    
+    def test_create_todos_batch_too_large(self):
+        """测试批量请求超过上限"""
+        from app.core.config import settings
+        todos_data = [{"title": "任务"}] * (settings.batch_max_size + 1)
+        response = client.post("/api/v1/todos/batch", json=todos_data)
+        assert response.status_code == 400
+    
+    def test_update_todos_batch(self, db):
+        """测试批量更新待办事项"""
+        todo1 = create_test_todo(db, "任务1")
+        todo2 = create_test_todo(db, "任务2")
+        
+        update_data = [
+            {"id": todo1.id, "completed": True},
+            {"id": 999, "title": "不存在"},
+            {"id": todo2.id, "title": "新标题"},
+        ]
+        response = client.patch("/api/v1/todos/batch", json=update_data)
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [result["status"] for result in results] == ["updated", "not_found", "updated"]
+        assert results[0]["todo"]["completed"] is True
+        assert results[0]["todo"]["title"] == "任务1"
+        assert results[2]["todo"]["title"] == "新标题"
+        assert results[2]["todo"]["completed"] is False
+    
+    def test_delete_todos_batch(self, db):
+        """测试批量删除待办事项"""
+        todo1 = create_test_todo(db, "任务1")
+        todo2 = create_test_todo(db, "任务2")
+        todo3 = create_test_todo(db, "任务3")
+        
+        response = client.request("DELETE", "/api/v1/todos/batch", json=[todo1.id, 999, todo3.id])
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [result["status"] for result in results] == ["deleted", "not_found", "deleted"]
+        
+        response = client.get("/api/v1/todos")
+        assert [todo["id"] for todo in response.json()] == [todo2.id]
+    
+    def test_list_matches_item_serialization(self, db):
+        """测试列表的快速序列化结果与单项接口的响应模型一致"""
+        todo = create_test_todo(db, "序列化任务")
+        client.put(f"/api/v1/todos/{todo.id}/complete")
+        
+        response = client.get("/api/v1/todos")
+        assert response.headers["content-type"] == "application/json"
+        assert response.json() == [client.get(f"/api/v1/todos/{todo.id}").json()]
@@ -7,6 +7,9 @@ import { Todo, CreateTodo, UpdateTodo, FilterType, TodoListResponse } from '../t
  */
 class ApiService {
   private api: AxiosInstance;
+  // 最近一次写操作的时间，后端配置只读副本时通过X-Last-Write响应头返回，
+  // 之后的请求原样带上，保证能读到自己刚写入的数据（跨域请求默认不发送Cookie）
+  private lastWrite: string | null = null;
 
   constructor() {
     this.api = axios.create({
@@ -16,6 +19,20 @@ class ApiService {
       },
       timeout: 10000, // 10秒超时
     });
+
+    this.api.interceptors.request.use((config) => {
+      if (this.lastWrite) {
+        config.headers['X-Last-Write'] = this.lastWrite;
+      }
+      return config;
+    });
+    this.api.interceptors.response.use((response) => {
+      const lastWrite = response.headers['x-last-write'];
+      if (lastWrite) {
+        this.lastWrite = lastWrite;
+      }
+      return response;
+    });
   }
 
   /**